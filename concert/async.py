@@ -6,13 +6,25 @@
 
 .. function:: async
 
-    A decorator for functions which are executed asynchronously.
+    A decorator for functions which are executed asynchronously. If asyncio is
+    enabled (:data:`.ENABLE_ASYNCIO`), coroutine functions are scheduled in one
+    event loop running in a separate thread and the returned futures can be
+    awaited.
+
+.. function:: queued
+
+    A decorator for methods which are executed asynchronously in the
+    :class:`.WorkQueue` of the object (its ``work_queue`` attribute), i.e.
+    serialized with respect to other queued calls on the same object. Objects
+    without a work queue and gevent are handled like by :func:`.async`.
 
 .. function:: threaded
 
     Threaded execution of a function *func*.
 
 """
+import collections
+import logging
 import time
 import functools
 import traceback
@@ -26,6 +38,9 @@ except ImportError:
     import queue
 
 
+LOG = logging.getLogger(__name__)
+
+
 # Patch futures so that they provide a join() and kill() method
 def _join(self, _timeout=None):
     try:
@@ -188,6 +203,10 @@ if concert.config.ENABLE_GEVENT:
             else:
                 return no_async(func)
 
+        # Greenlets do not contend for threads, no need to serialize them
+        queued = async
+        _spawn = gevent.spawn
+
         def threaded(func):
             @functools.wraps(func)
             def _inner(*args, **kwargs):
@@ -206,7 +225,7 @@ if not concert.config.ENABLE_GEVENT or not HAVE_GEVENT:
         import threading
 
         # Module-wide executor
-        EXECUTOR = ThreadPoolExecutor(max_workers=128)
+        EXECUTOR = ThreadPoolExecutor(max_workers=concert.config.MAX_WORKERS)
 
         # This is a stub exception that will never be raised.
         class KillException(Exception):
@@ -222,6 +241,22 @@ if not concert.config.ENABLE_GEVENT or not HAVE_GEVENT:
             else:
                 return no_async(func)
 
+        _spawn = EXECUTOR.submit
+
+        def queued(func):
+            if concert.config.ENABLE_ASYNC:
+                @functools.wraps(func)
+                def _inner(instance, *args, **kwargs):
+                    work_queue = getattr(instance, 'work_queue', None)
+                    if work_queue is None:
+                        return EXECUTOR.submit(func, instance, *args, **kwargs)
+
+                    return work_queue.submit(func, instance, *args, **kwargs)
+
+                return _inner
+            else:
+                return no_async(func)
+
         def threaded(func):
             @functools.wraps(func)
             def wrapper(*args, **kwargs):
@@ -234,6 +269,117 @@ if not concert.config.ENABLE_GEVENT or not HAVE_GEVENT:
             return wrapper
 
 
+HAVE_ASYNCIO = False
+
+if concert.config.ENABLE_ASYNCIO and not (concert.config.ENABLE_GEVENT and HAVE_GEVENT):
+    try:
+        import asyncio
+
+        HAVE_ASYNCIO = True
+
+        # One event loop for all coroutines
+        LOOP = asyncio.new_event_loop()
+        _loop_thread = threading.Thread(target=LOOP.run_forever)
+        _loop_thread.daemon = True
+        _loop_thread.start()
+
+        def _await(self):
+            return asyncio.wrap_future(self).__await__()
+
+        # Futures can be awaited in coroutines
+        Future.__await__ = _await
+
+        class LoopFuture(Future):
+
+            """Future of a coroutine running in the event loop. Cancelling it cancels the
+            coroutine, which gets :class:`asyncio.CancelledError` or is not started at all, and
+            the future raises :class:`.KillException` afterwards.
+            """
+
+            def __init__(self):
+                super(LoopFuture, self).__init__()
+                self._task = None
+                self._killed = False
+
+            def cancel(self):
+                """Cancel the coroutine, return False if it has already finished."""
+                with self._condition:
+                    if self.done():
+                        return False
+                    self._killed = True
+
+                task = self._task
+                if task is not None:
+                    LOOP.call_soon_threadsafe(task.cancel)
+                if self.cancel_operation:
+                    self.cancel_operation()
+
+                return True
+
+        def run_in_loop(coro):
+            """Run coroutine *coro* in the event loop and return a :class:`.LoopFuture`."""
+            future = LoopFuture()
+
+            def finished(task):
+                # A cancel() which returned True must make the future raise
+                with future._condition:
+                    if task.cancelled() or future._killed:
+                        # Translate the cancellation at the loop boundary
+                        future.set_exception(KillException())
+                    elif task.exception() is not None:
+                        future.set_exception(task.exception())
+                    else:
+                        future.set_result(task.result())
+
+            def start():
+                future.set_running_or_notify_cancel()
+                if future._killed:
+                    # Cancelled before it was started
+                    coro.close()
+                    future.set_exception(KillException())
+                    return
+                future._task = asyncio.ensure_future(coro, loop=LOOP)
+                if future._killed:
+                    future._task.cancel()
+                future._task.add_done_callback(finished)
+
+            LOOP.call_soon_threadsafe(start)
+
+            return future
+
+        def in_loop():
+            """Return True if called from the event loop thread."""
+            return threading.current_thread() is _loop_thread
+
+        _threaded_async = async
+
+        def async(func):
+            # Only coroutine functions run in the loop, blocking ones would stall it
+            if not asyncio.iscoroutinefunction(func):
+                return _threaded_async(func)
+
+            @functools.wraps(func)
+            def _inner(*args, **kwargs):
+                return run_in_loop(func(*args, **kwargs))
+
+            if concert.config.ENABLE_ASYNC:
+                return _inner
+            else:
+                @functools.wraps(func)
+                def _blocking(*args, **kwargs):
+                    return _inner(*args, **kwargs).result()
+
+                return no_async(_blocking)
+    except ImportError:
+        print("Asyncio is not available, falling back to threads")
+
+
+if not HAVE_ASYNCIO:
+    def in_loop():
+        """Return True if called from the event loop thread."""
+        return False
+
+
 def wait(futures):
     """Wait for the list of *futures* to finish and raise exceptions if
     happened."""
@@ -241,19 +387,267 @@ def wait(futures):
         future.join()
 
 
+class WorkQueue(object):
+
+    """An ordered queue of work items executed one after another by the module-wide executor
+    (or greenlets if gevent is enabled), which allows to serialize commands sent to one device
+    while different devices are served in parallel. A work item submitted from within a running
+    item of the same queue is executed immediately in order to prevent dead locks. *name* is used
+    for display purposes.
+
+    If asyncio is enabled and *blocking* is False, i.e. the items never block, they are executed
+    in the event loop thread instead of occupying a thread each. Items which have to wait for an
+    unfinished future given as their *wait_on* keyword argument are still executed by threads.
+
+    The queue keeps statistics about the executed items, see :attr:`.depth`, :attr:`.num_done`,
+    :attr:`.wait_time` and :attr:`.run_time`.
+    """
+
+    _local = threading.local()
+
+    def __init__(self, name=None, blocking=True):
+        self.name = name
+        self.blocking = blocking
+        self._items = collections.deque()
+        self._lock = threading.Lock()
+        self._running = False
+        self.reset_statistics()
+
+    def __repr__(self):
+        return self.info_table.get_string()
+
+    @property
+    def depth(self):
+        """Number of items waiting for execution."""
+        return len(self._items)
+
+    @property
+    def wait_time(self):
+        """Total time the executed items waited for execution."""
+        return self._wait_time * q.s
+
+    @property
+    def max_wait_time(self):
+        """Longest time an item waited for execution."""
+        return self._max_wait_time * q.s
+
+    @property
+    def mean_wait_time(self):
+        """Mean time between submitting an item and the start of its execution."""
+        return (self._wait_time / self.num_done if self.num_done else 0) * q.s
+
+    @property
+    def run_time(self):
+        """Total execution time of the items."""
+        return self._run_time * q.s
+
+    @property
+    def max_run_time(self):
+        """Longest execution time of an item."""
+        return self._max_run_time * q.s
+
+    @property
+    def mean_run_time(self):
+        """Mean execution time of an item."""
+        return (self._run_time / self.num_done if self.num_done else 0) * q.s
+
+    @property
+    def info_table(self):
+        from concert.session.utils import get_default_table
+        table = get_default_table(["attribute", "value"])
+        table.header = False
+        table.border = False
+        table.add_row(["name", self.name])
+        table.add_row(["depth", self.depth])
+        table.add_row(["max_depth", self.max_depth])
+        table.add_row(["num_done", self.num_done])
+        table.add_row(["mean_wait_time", self.mean_wait_time])
+        table.add_row(["max_wait_time", self.max_wait_time])
+        table.add_row(["mean_run_time", self.mean_run_time])
+        table.add_row(["max_run_time", self.max_run_time])
+        return table
+
+    def reset_statistics(self):
+        """Reset the execution statistics."""
+        self.max_depth = 0
+        self.num_done = 0
+        # Seconds, quantities are too slow to be updated by every item
+        self._wait_time = 0
+        self._max_wait_time = 0
+        self._run_time = 0
+        self._max_run_time = 0
+
+    def submit(self, func, *args, **kwargs):
+        """Schedule *func* to be executed with *args* and *kwargs* after all the previously
+        submitted items have finished and return a future.
+        """
+        future = Future()
+
+        if getattr(self._local, 'current', None) is self:
+            self._execute(future, func, args, kwargs, time.time())
+            return future
+
+        with self._lock:
+            self._items.append((future, func, args, kwargs, time.time()))
+            self.max_depth = max(self.max_depth, len(self._items))
+            if not self._running:
+                self._running = True
+                self._spawn_next()
+
+        return future
+
+    def _spawn_next(self):
+        """Start executing the first item, the lock must be held."""
+        if HAVE_ASYNCIO and not self.blocking:
+            wait_on = self._items[0][3].get('wait_on')
+            if wait_on is None or wait_on.done():
+                LOOP.call_soon_threadsafe(self._run_next)
+                return
+
+        _spawn(self._run_next)
+
+    def _run_next(self):
+        with self._lock:
+            future, func, args, kwargs, submitted = self._items.popleft()
+
+        self._local.current = self
+        try:
+            self._execute(future, func, args, kwargs, submitted)
+        finally:
+            self._local.current = None
+
+        with self._lock:
+            if self._items:
+                # Resubmit instead of looping in order to be fair to other queues
+                self._spawn_next()
+            else:
+                self._running = False
+
+    def _execute(self, future, func, args, kwargs, submitted):
+        if not future.set_running_or_notify_cancel():
+            return
+
+        start = time.time()
+        result = exception = None
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as exc:
+            exception = exc
+
+        # Update the statistics before the future is resolved and someone looks at them
+        wait_time = start - submitted
+        run_time = time.time() - start
+        self.num_done += 1
+        self._wait_time += wait_time
+        self._run_time += run_time
+        self._max_wait_time = max(self._max_wait_time, wait_time)
+        self._max_run_time = max(self._max_run_time, run_time)
+
+        if exception is None:
+            future.set_result(result)
+        else:
+            future.set_exception(exception)
+
+
+class Topic(object):
+
+    """Messages *message* sent by *sender* which are waiting for delivery by the
+    :class:`.Dispatcher` together with delivery statistics. If *maxsize* is given, at most that
+    many messages can wait, the *policy* for the ones which come when the topic is full is one of:
+
+        - 'block': :meth:`.Dispatcher.send` blocks until there is space,
+        - 'drop': the message is discarded,
+        - 'coalesce': the last waiting message is refreshed instead of adding a new one, its
+          delivery thus comes after the latest send and the subscribers are notified only once.
+    """
+
+    POLICIES = ('block', 'drop', 'coalesce')
+
+    def __init__(self, sender, message, maxsize=None, policy='drop'):
+        if policy not in self.POLICIES:
+            raise ValueError("Policy must be one of {}".format(self.POLICIES))
+        self.sender = sender
+        self.message = message
+        self.maxsize = maxsize
+        self.policy = policy
+        self.pending = collections.deque()
+        self.scheduled = False
+        self.num_sent = 0
+        self.num_delivered = 0
+        self.num_dropped = 0
+        self.num_coalesced = 0
+        self._latency = 0.0
+        self._max_latency = 0.0
+
+    @property
+    def depth(self):
+        """Number of messages waiting for delivery."""
+        return len(self.pending)
+
+    @property
+    def limited(self):
+        """True if the number of waiting messages is bounded."""
+        return self.maxsize is not None
+
+    @property
+    def latency(self):
+        """Total time between sending the messages and their delivery."""
+        return self._latency * q.s
+
+    @property
+    def max_latency(self):
+        """Maximum time between sending a message and its delivery."""
+        return self._max_latency * q.s
+
+    @property
+    def mean_latency(self):
+        """Mean time between sending a message and its delivery."""
+        return self.latency / self.num_delivered if self.num_delivered else 0 * q.s
+
+
 class Dispatcher(object):
 
-    """Core dispatcher"""
+    """Core dispatcher.
 
-    def __init__(self):
+    Messages are delivered by *num_workers* threads (:data:`concert.config.DISPATCHER_WORKERS` by
+    default). Messages of one topic, i.e. a *(sender, message)* pair, are delivered in the order
+    in which they were sent and a topic is served by at most one thread at a time, thus a slow
+    subscriber stalls only the topics it subscribes to. The number of waiting messages of a topic
+    can be bounded by :meth:`.limit`.
+    """
+
+    def __init__(self, num_workers=None):
+        if num_workers is None:
+            num_workers = concert.config.DISPATCHER_WORKERS
         self._subscribers = {}
-        self._messages = queue.Queue()
+        self._topics = {}
+        self._ready = queue.Queue()
         self._event_queues = {}
-        self._lock = threading.Lock()
-
-        server = threading.Thread(target=self._serve)
-        server.daemon = True
-        server.start()
+        self._lock = threading.Condition()
+        self.num_delivered = 0
+        self.num_dropped = 0
+        self._latency = 0.0
+        self._max_latency = 0.0
+
+        for i in range(num_workers):
+            server = threading.Thread(target=self._serve)
+            server.daemon = True
+            server.start()
+
+    @property
+    def latency(self):
+        """Total time between sending the messages and their delivery over all topics."""
+        return self._latency * q.s
+
+    @property
+    def max_latency(self):
+        """Maximum time between sending a message and its delivery over all topics."""
+        return self._max_latency * q.s
+
+    @property
+    def mean_latency(self):
+        """Mean time between sending a message and its delivery over all topics."""
+        return self.latency / self.num_delivered if self.num_delivered else 0 * q.s
 
     def subscribe(self, sender, message, handler):
         """Subscribe to a message sent by sender.
@@ -263,34 +657,112 @@ class Dispatcher(object):
 
         """
         tsm = sender, message
-        if tsm in self._subscribers:
-            self._subscribers[tsm].add(handler)
-        else:
-            self._subscribers[tsm] = set([handler])
+        with self._lock:
+            if tsm in self._subscribers:
+                self._subscribers[tsm].add(handler)
+            else:
+                self._subscribers[tsm] = set([handler])
 
     def unsubscribe(self, sender, message, handler):
         """Remove *handler* from the subscribers to *(sender, message)*."""
         tsm = sender, message
-        if tsm in self._subscribers:
-            self._subscribers[tsm].remove(handler)
+        with self._lock:
+            if tsm in self._subscribers:
+                self._subscribers[tsm].remove(handler)
+                if not self._subscribers[tsm]:
+                    del self._subscribers[tsm]
+
+    def limit(self, sender, message, maxsize, policy='drop'):
+        """Let at most *maxsize* messages *message* sent by *sender* wait for delivery, the
+        overflowing ones are handled based on *policy*, see :class:`.Topic`. If *maxsize* is None
+        the topic is unbounded.
+        """
+        if policy not in Topic.POLICIES:
+            raise ValueError("Policy must be one of {}".format(Topic.POLICIES))
+
+        with self._lock:
+            topic = self._get_topic((sender, message))
+            topic.maxsize = maxsize
+            topic.policy = policy
+            self._lock.notify_all()
+
+    def topic(self, sender, message):
+        """Return the :class:`.Topic` of *message* sent by *sender*, None if it is not known."""
+        return self._topics.get((sender, message))
 
     def send(self, sender, message):
         """Send message from sender."""
-        self._messages.put((sender, message))
+        tsm = sender, message
+
+        with self._lock:
+            if tsm not in self._subscribers and tsm not in self._event_queues and \
+                    tsm not in self._topics:
+                # Nobody is interested
+                return
+
+            topic = self._get_topic(tsm)
+            topic.num_sent += 1
+
+            while topic.limited and topic.depth >= topic.maxsize:
+                if topic.policy == 'block':
+                    self._lock.wait()
+                    continue
+                if topic.policy == 'coalesce' and topic.pending:
+                    # The waiting delivery happens after this send
+                    topic.pending[-1] = time.time()
+                    topic.num_coalesced += 1
+                else:
+                    topic.num_dropped += 1
+                    self.num_dropped += 1
+                return
+
+            topic.pending.append(time.time())
+            if not topic.scheduled:
+                topic.scheduled = True
+                self._ready.put(topic)
+
+    def _get_topic(self, tsm):
+        if tsm not in self._topics:
+            self._topics[tsm] = Topic(*tsm)
+
+        return self._topics[tsm]
 
     def _serve(self):
         while True:
-            tsm = self._messages.get()
-            sender, message = tsm
+            topic = self._ready.get()
+            tsm = topic.sender, topic.message
 
-            if tsm in self._subscribers:
-                for callback in self._subscribers[tsm]:
-                    callback(sender)
+            with self._lock:
+                sent = topic.pending.popleft()
+                callbacks = list(self._subscribers.get(tsm, ()))
+                # Make space for blocked senders
+                self._lock.notify_all()
+
+            latency = time.time() - sent
+
+            for callback in callbacks:
+                try:
+                    callback(topic.sender)
+                except Exception:
+                    LOG.exception("Error while delivering `{}'".format(topic.message))
 
             if tsm in self._event_queues:
                 self._event_queues[tsm].notify_and_clear()
 
-            self._messages.task_done()
+            with self._lock:
+                topic.num_delivered += 1
+                topic._latency += latency
+                topic._max_latency = max(topic._max_latency, latency)
+                self.num_delivered += 1
+                self._latency += latency
+                self._max_latency = max(self._max_latency, latency)
+
+                if topic.pending:
+                    self._ready.put(topic)
+                else:
+                    topic.scheduled = False
+                    if not topic.limited and tsm not in self._subscribers:
+                        del self._topics[tsm]
 
 
 dispatcher = Dispatcher()
@@ -317,17 +789,62 @@ class WaitError(Exception):
     pass
 
 
-def busy_wait(condition, sleep_time=1e-1 * q.s, timeout=None):
+class Notifier(object):
+
+    """Condition variable based notification of changes. Every :meth:`.notify` increases the
+    :attr:`.count` and wakes up all threads in :meth:`.wait`.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self.count = 0
+
+    def notify(self):
+        """Notify all waiting threads about a change."""
+        with self._condition:
+            self.count += 1
+            self._condition.notify_all()
+
+    def wait(self, count, timeout=None):
+        """Wait until there was a change since the :attr:`.count` was *count* or *timeout* in
+        seconds elapses. Return True if a change happened.
+        """
+        with self._condition:
+            if self.count == count:
+                self._condition.wait(timeout)
+
+            return self.count != count
+
+
+def busy_wait(condition, sleep_time=1e-1 * q.s, timeout=None, notifier=None):
     """Busy wait until a callable *condition* returns True. *sleep_time* is the time to sleep
     between consecutive checks of *condition*. If *timeout* is given and the *condition* doesn't
     return True within the time specified by it a :class:`.WaitingError` is raised.
+
+    If a :class:`.Notifier` *notifier* is given, the *condition* is checked every time it notifies
+    about a change. Changes might not be pushed by every source, thus the *condition* is also polled
+    with adaptive intervals, they start at 1 ms and double up to *sleep_time* until a change
+    notification comes.
     """
     sleep_time = sleep_time.to(q.s).magnitude
+    start = time.time()
     if timeout:
-        start = time.time()
         timeout = timeout.to(q.s).magnitude
-
-    while not condition():
-        if timeout and time.time() - start > timeout:
-            raise WaitError('Waiting timed out')
-        time.sleep(sleep_time)
+    interval = min(1e-3, sleep_time) if notifier else sleep_time
+
+    while True:
+        count = notifier.count if notifier else None
+        if condition():
+            return
+        if timeout:
+            remaining = timeout - (time.time() - start)
+            if remaining < 0:
+                raise WaitError('Waiting timed out')
+            interval = min(interval, remaining)
+        if notifier:
+            if notifier.wait(count, timeout=interval):
+                interval = min(1e-3, sleep_time)
+            else:
+                interval = min(2 * interval, sleep_time)
+        else:
+            time.sleep(interval)
@@ -1,13 +1,15 @@
 # -*- coding: utf-8 -*-
 """Core module Parameters"""
+import collections
 import numpy as np
 import logging
 import functools
 import inspect
+import time
 import types
 import threading
 from concert.helpers import hasattr_raise_exceptions, memoize
-from concert.async import async, wait, busy_wait
+from concert.async import queued, wait, busy_wait, dispatcher, Notifier, NoFuture
 from concert.quantities import q
 
 
@@ -30,6 +32,16 @@ def _is_compatible(unit, value):
         return False
 
 
+def _leq(a, b):
+    """Check magnitudes a <= b, NaN entries of vectors are ignored."""
+    if not hasattr(a, 'shape') or len(a.shape) == 0:
+        return a <= b
+
+    valid = np.invert(np.isnan(a)) & np.invert(np.isnan(b))
+
+    return np.all(a[valid] <= b[valid])
+
+
 def _getter_not_implemented(*args):
     raise AccessorNotImplementedError
 
@@ -50,37 +62,23 @@ def _execute_func(func, instance, *args, **kwargs):
     return result
 
 
-def _find_object_by_name(instance):
-    """Find variable name by *instance*. This is supposed to be used only in the
-    :meth:`.Parameter.__set__`.
+def register_names(namespace):
+    """Use the variable names in the *namespace* dictionary as logging names of the
+    :class:`.Parameterizable` objects and :class:`concert.devices.base.LazyDevice` proxies it
+    contains, e.g. ``register_names(globals())``. Objects which already have a name keep it.
+    Return the list of newly named objects' names.
     """
-    def _find_in_dict(dictionary):
-        for (obj_name, obj) in dictionary.items():
-            if obj == instance:
-                return obj_name
+    from concert.devices.base import LazyDevice
 
-    instance_name = None
+    named = []
 
-    frames = inspect.stack()
-    try:
-        # Skip us and Parameter.__set__
-        for i in range(2, len(frames)):
-            # First look in the globals
-            instance_name = _find_in_dict(frames[i][0].f_globals)
-            if not instance_name:
-                # If not found, look in the locals (e.g. devices instantiated in funcions)
-                instance_name = _find_in_dict(frames[i][0].f_locals)
-            # We can't know at which index of the stack is the correct name, e.g. if a device sets a
-            # parameter in a constructor we need to bump index by one. Thus, use blacklist names
-            # which won't be picked up because they are most probably used by concert or it's
-            # extensions internally.
-            if instance_name and instance_name not in ['instance', 'self']:
-                break
-    finally:
-        # Cleanup as python docs suggest
-        del frames
-
-    return instance_name
+    for (obj_name, obj) in namespace.items():
+        if (isinstance(obj, (Parameterizable, LazyDevice)) and not obj_name.startswith('_') and
+                obj.name_for_log is None):
+            obj.name_for_log = obj_name
+            named.append(obj_name)
+
+    return named
 
 
 class FSMError(Exception):
@@ -170,9 +168,19 @@ class LockError(Exception):
     pass
 
 
+def _set_state(instance, state):
+    """Set the software *state* of *instance* and notify the waiters on it."""
+    setattr(instance, '_state_value', state)
+    parameter_value = getattr(instance, '_params', {}).get('state')
+
+    if parameter_value is not None:
+        parameter_value.notify()
+
+
 def transition(immediate=None, target=None):
     """Change software state of a device to *immediate*. After the function
-    execution finishes change the state to *target*.
+    execution finishes change the state to *target*. Every change notifies the
+    waiters on the state parameter.
     """
     def wrapped(func):
         @functools.wraps(func)
@@ -184,13 +192,13 @@ def transition(immediate=None, target=None):
             target_state = target if target else instance.state
 
             if immediate:
-                setattr(instance, '_state_value', immediate)
+                _set_state(instance, immediate)
 
             try:
                 result = _execute_func(func, instance, *args, **kwargs)
-                setattr(instance, '_state_value', target_state)
+                _set_state(instance, target_state)
             except StateError as error:
-                setattr(instance, '_state_value', error.state)
+                _set_state(instance, error.state)
                 raise error
 
             return result
@@ -318,23 +326,53 @@ class Parameter(object):
         # the instance where we actually want the function to be called.
 
         try:
-            if self.fget:
-                value = self.fget(instance, *self.data_args)
-            else:
-                value = getattr(instance, self.getter_name())(*self.data_args)
+            parameter_value = getattr(instance, '_params', {}).get(self.name)
 
-            return value
+            if parameter_value is None:
+                return self._read(instance)
+
+            return parameter_value._cache.get(self._read, instance)
         except AccessorNotImplementedError:
             raise ReadAccessError(self.name)
         except KeyboardInterrupt:
             # do not scream
             LOG.debug("KeyboardInterrupt caught while getting `{}'".format(self.name))
 
+    def _read(self, instance):
+        if self.fget:
+            return self.fget(instance, *self.data_args)
+
+        return getattr(instance, self.getter_name())(*self.data_args)
+
+    def _check_value(self, instance, value):
+        """Check if *value* can be written to the parameter of *instance* and return the value
+        which is passed to the setter.
+        """
+        if instance[self.name].locked:
+            raise LockError("Parameter `{}' is locked for writing".format(self))
+
+        return value
+
+    def _convert_value(self, value):
+        """Convert *value* returned by the getter."""
+        return value
+
+    def _written(self, instance, value):
+        """Notify about and log *value* written to the parameter of *instance*."""
+        instance[self.name].notify()
+        name = instance.__class__.__name__
+        instance_name = getattr(instance, 'name_for_log', None)
+        if instance_name:
+            msg = "set {}::{}.{}='{}'"
+            LOG.info(msg.format(name, instance_name, self.name, value))
+        else:
+            msg = "set {}::{}='{}'"
+            LOG.info(msg.format(name, self.name, value))
+
     def __set__(self, instance, value):
-        try:
-            if instance[self.name].locked:
-                raise LockError("Parameter `{}' is locked for writing".format(self))
+        value = self._check_value(instance, value)
 
+        try:
             if self.fset:
                 self.fset(instance, value, *self.data_args)
             else:
@@ -353,19 +391,7 @@ class Parameter(object):
                 except AccessorNotImplementedError:
                     raise WriteAccessError(self.name)
 
-            name = instance.__class__.__name__
-            if hasattr(instance, 'name_for_log'):
-                instance_name = getattr(instance, 'name_for_log')
-            else:
-                instance_name = _find_object_by_name(instance)
-                if instance_name:
-                    setattr(instance, 'name_for_log', instance_name)
-            if instance_name:
-                msg = "set {}::{}.{}='{}'"
-                LOG.info(msg.format(name, instance_name, self.name, value))
-            else:
-                msg = "set {}::{}='{}'"
-                LOG.info(msg.format(name, self.name, value))
+            self._written(instance, value)
         except KeyboardInterrupt:
             cancel_name = '_cancel_' + self.name
             if hasattr(instance, cancel_name):
@@ -456,11 +482,11 @@ class Selection(Parameter):
         super(Selection, self).__init__(fget=fget, fset=fset, help=help)
         self.iterable = iterable
 
-    def __set__(self, instance, value):
+    def _check_value(self, instance, value):
         if value not in self.iterable:
             raise WriteAccessError('{} not in {}'.format(value, self.iterable))
 
-        super(Selection, self).__set__(instance, value)
+        return super(Selection, self)._check_value(instance, value)
 
 
 class Quantity(Parameter):
@@ -486,12 +512,59 @@ class Quantity(Parameter):
         self.external_lower_getter = external_lower_getter
         self.external_upper_getter = external_upper_getter
 
+    @property
+    def unit(self):
+        return self._unit
+
+    @unit.setter
+    def unit(self, unit):
+        self._unit = unit
+        self._units = getattr(unit, 'units', None)
+        self._is_delta = unit == "delta_degC"
+        # Factors converting magnitudes to the unit keyed by the units of the converted values
+        self._factors = {}
+
+    def _factor(self, value):
+        """Return the factor which converts the magnitude of *value* to :attr:`unit`. Return None
+        if the conversion must be done by pint because the conversion is not a multiplication or
+        *value* has no units. Raise ValueError if *value* is not compatible with :attr:`unit`.
+        """
+        if self._units is None or not hasattr(value, 'units'):
+            if not _is_compatible(self.unit, value):
+                raise ValueError
+            return None
+
+        key = frozenset(value.units.items())
+
+        try:
+            return self._factors[key]
+        except KeyError:
+            one = q.Quantity(1.0, value.units).to(self.unit).magnitude
+            zero = q.Quantity(0.0, value.units).to(self.unit).magnitude
+            # Offset units like degrees Celsius cannot be converted by a factor
+            factor = one if zero == 0 else None
+            self._factors[key] = factor
+
+            return factor
+
+    def _is_compatible(self, value):
+        try:
+            self._factor(value)
+            return True
+        except ValueError:
+            return False
+
     def convert(self, value):
-        if self.unit == "delta_degC":
+        if self._is_delta:
             return value
-        else:
+
+        factor = self._factor(value)
+
+        if factor is None:
             return value.to(self.unit)
 
+        return q.Quantity(value.magnitude * factor, self._units)
+
     def __get__(self, instance, owner):
         # If we would just call self.fset(value) we would call the method
         # defined in the base class. This is a hack (?) to call the function on
@@ -504,39 +577,30 @@ class Quantity(Parameter):
         except KeyboardInterrupt:
             LOG.debug("KeyboardInterrupt caught while getting `{}'".format(self.name))
 
-    def __set__(self, instance, value):
-        if not _is_compatible(self.unit, value):
+    def _convert_value(self, value):
+        return None if value is None else self.convert(value)
+
+    def _check_value(self, instance, value):
+        if not self._is_compatible(value):
             msg = "{} of {} can only receive values of unit {} but got {}"
             raise UnitError(
                 msg.format(self.name, type(instance), self.unit, value))
 
+        converted = self.convert(value)
         lower = instance[self.name].lower
         upper = instance[self.name].upper
 
-        def leq(a, b):
-            """check a <= b"""
-            if not hasattr(a, 'shape') or len(a.shape) == 0:
-                return a <= b
-            else:
-                # Vector data type
-                valid_a = np.invert(np.isnan(a.magnitude))
-                valid_b = np.invert(np.isnan(b.magnitude))
-                valid = valid_a & valid_b
-                test_a = a[valid]
-                test_b = b[valid]
-                return np.all(test_a.to_base_units().magnitude <= test_b.to_base_units().magnitude)
-
+        # Compare magnitudes in the parameter unit
         if lower is not None:
-            if not leq(lower, value):
+            if not _leq(self.convert(lower).magnitude, converted.magnitude):
                 msg = "{} is out of range [{}, {}]"
                 raise SoftLimitError(msg.format(value, lower, upper))
         if upper is not None:
-            if not leq(value, upper):
+            if not _leq(converted.magnitude, self.convert(upper).magnitude):
                 msg = "{} is out of range [{}, {}]"
                 raise SoftLimitError(msg.format(value, lower, upper))
 
-        converted = self.convert(value)
-        super(Quantity, self).__set__(instance, converted)
+        return super(Quantity, self)._check_value(instance, converted)
 
 
 def quantity(unit=None, lower=None, upper=None, data=None, check=None, help=None):
@@ -564,9 +628,73 @@ def quantity(unit=None, lower=None, upper=None, data=None, check=None, help=None
     return wrapper
 
 
+class _ReadCache(object):
+
+    """Value read by a function which is valid for :attr:`ttl` seconds or until it is
+    invalidated. Caching is disabled if :attr:`ttl` is None.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._time = None
+        self._value = None
+        self.ttl = None
+        self.hits = 0
+        self.misses = 0
+
+    def _valid(self):
+        return (self.ttl is not None and self._time is not None and
+                time.time() - self._time < self.ttl)
+
+    def lookup(self):
+        """Return a tuple *(value, valid)* of the cached value and its validity."""
+        with self._lock:
+            if self._valid():
+                self.hits += 1
+                return self._value, True
+
+        return None, False
+
+    def get(self, read, *args):
+        """Return the cached value if it is valid, otherwise call *read* with *args* and cache its
+        result.
+        """
+        if self.ttl is None:
+            return read(*args)
+
+        with self._lock:
+            if self._valid():
+                self.hits += 1
+                return self._value
+            generation = self._generation
+
+        value = read(*args)
+
+        with self._lock:
+            self.misses += 1
+            # Do not cache a value which might have been read before an invalidation
+            if generation == self._generation:
+                self._time = time.time()
+                self._value = value
+
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._time = None
+            self._value = None
+
+
 class ParameterValue(object):
 
-    """Value object of a :class:`.Parameter`."""
+    """Value object of a :class:`.Parameter`.
+
+    Reading the value can be cached for read-mostly parameters by setting :attr:`cache_ttl`. The
+    cache is invalidated when the parameter is set and by :meth:`notify`. Quantities with external
+    limits cache the limits in the same way.
+    """
 
     def __init__(self, instance, parameter):
         self._lock = threading.Lock()
@@ -574,6 +702,9 @@ class ParameterValue(object):
         self._instance = instance
         self._parameter = parameter
         self._saved = []
+        self._cache = _ReadCache()
+        self._caches = [self._cache]
+        self.notifier = Notifier()
 
     def __enter__(self):
         self._lock.acquire()
@@ -598,6 +729,9 @@ class ParameterValue(object):
         table.add_row(["info", self._parameter.help])
         table.add_row(["locked", locked])
         table.add_row(["target_readable", self.target_readable])
+        if self.cache_ttl is not None:
+            table.add_row(["cache_ttl", self.cache_ttl])
+            table.add_row(["cache_hits", self.cache_hits])
         if self.target_readable:
             table.add_row(["target_value", self.get_target().join().result])
         return table
@@ -625,20 +759,67 @@ class ParameterValue(object):
     def target(self):
         return self.get_target().join().result()
 
-    @async
+    @property
+    def work_queue(self):
+        """:class:`concert.async.WorkQueue` of the parameter's instance which serializes the
+        asynchronous access, None if the instance doesn't have one.
+        """
+        return getattr(self._instance, 'work_queue', None)
+
+    @property
+    def cache_ttl(self):
+        """Time for which a read value is cached, None if the value is not cached. Setting it
+        invalidates the cache.
+        """
+        return None if self._cache.ttl is None else self._cache.ttl * q.s
+
+    @cache_ttl.setter
+    def cache_ttl(self, ttl):
+        for cache in self._caches:
+            cache.ttl = None if ttl is None else ttl.to(q.s).magnitude
+
+        self.invalidate()
+
+    @property
+    def cache_hits(self):
+        """Number of reads served from the cache."""
+        return sum(cache.hits for cache in self._caches)
+
+    @property
+    def cache_misses(self):
+        """Number of reads which had to access the device while the cache was enabled."""
+        return sum(cache.misses for cache in self._caches)
+
+    def invalidate(self):
+        """Drop the cached value, the next read accesses the device."""
+        for cache in self._caches:
+            cache.invalidate()
+
     def get(self, wait_on=None):
         """
         Get concrete *value* of this object.
 
         If *wait_on* is not None, it must be a future on which this method
-        joins.
+        joins. A cached value is returned immediately without queueing,
+        otherwise the read is queued in the device's work queue and waits for
+        the running calls, e.g. the position of a motor is read after the
+        motor finishes moving.
         """
+        if wait_on is None:
+            value, valid = self._cache.lookup()
+            if valid:
+                return NoFuture(value)
+
+        return self._get(wait_on=wait_on)
+
+    @queued
+    def _get(self, wait_on=None):
         if wait_on:
             wait_on.join()
 
         return getattr(self._instance, self.name)
 
-    @async
+    @queued
     def get_target(self, wait_on=None):
         """
         Get target value of this object
@@ -660,14 +841,7 @@ class ParameterValue(object):
         If *wait_on* is not None, it must be a future on which this method
         joins.
         """
-        @async
-        def execute():
-            if wait_on:
-                wait_on.join()
-
-            setattr(self._instance, self.name, value)
-
-        future = execute()
+        future = self._set(value, wait_on=wait_on)
         cancel_name = '_cancel_' + self.name
 
         if hasattr(self._instance, cancel_name):
@@ -675,7 +849,14 @@ class ParameterValue(object):
 
         return future
 
-    @async
+    @queued
+    def _set(self, value, wait_on=None):
+        if wait_on:
+            wait_on.join()
+
+        setattr(self._instance, self.name, value)
+
+    @queued
     def stash(self):
         """Save the current value internally on a growing stack.
 
@@ -723,12 +904,22 @@ class ParameterValue(object):
         """Unlock parameter for writing."""
         self._locked = False
 
+    def notify(self):
+        """Notify waiters and the :data:`concert.async.dispatcher` subscribers of the `changed'
+        message that the value has changed. This happens automatically when the parameter is set,
+        devices which are informed about value changes by the hardware should call it as well.
+        """
+        self.invalidate()
+        self.notifier.notify()
+        dispatcher.send(self, 'changed')
+
     def wait(self, value, sleep_time=1e-1 * q.s, timeout=None):
-        """Wait until the parameter value is *value*. *sleep_time* is the time to sleep
-        between consecutive checks. *timeout* specifies the maximum waiting time.
+        """Wait until the parameter value is *value*. The value is checked on every change
+        notification and additionally polled with *sleep_time* being the maximum time between
+        consecutive checks. *timeout* specifies the maximum waiting time.
         """
         condition = lambda: self.get().result() == value
-        busy_wait(condition, sleep_time=sleep_time, timeout=timeout)
+        busy_wait(condition, sleep_time=sleep_time, timeout=timeout, notifier=self.notifier)
 
 
 class QuantityValue(ParameterValue):
@@ -740,6 +931,10 @@ class QuantityValue(ParameterValue):
         self._external_upper_getter = quantity.external_upper_getter
         self._external_lower_getter = quantity.external_lower_getter
         self._limits_locked = False
+        # External limits are cached along with the value
+        self._lower_cache = _ReadCache()
+        self._upper_cache = _ReadCache()
+        self._caches += [self._lower_cache, self._upper_cache]
 
     def lock_limits(self, permanent=False):
         """Lock limits, if *permanent* is True the limits cannot be unlocked anymore."""
@@ -813,14 +1008,14 @@ class QuantityValue(ParameterValue):
         if self._external_lower_getter is None:
             return None
         else:
-            return self._external_lower_getter()
+            return self._lower_cache.get(self._external_lower_getter)
 
     @property
     def upper_external(self):
         if self._external_upper_getter is None:
             return None
         else:
-            return self._external_upper_getter()
+            return self._upper_cache.get(self._external_upper_getter)
 
     @property
     def info_table(self):
@@ -842,7 +1037,8 @@ class QuantityValue(ParameterValue):
 
     def wait(self, value, eps=None, sleep_time=1e-1 * q.s, timeout=None):
         """Wait until the parameter value is *value*. *eps* is the allowed discrepancy between the
-        actual value and *value*. *sleep_time* is the time to sleep between consecutive checks.
+        actual value and *value*. The value is checked on every change notification and
+        additionally polled with *sleep_time* being the maximum time between consecutive checks.
         *timeout* specifies the maximum waiting time.
         """
         def eps_condition():
@@ -850,14 +1046,14 @@ class QuantityValue(ParameterValue):
             diff = np.abs((self.get().result() - value).to(eps.units))
             return diff < eps
 
-        condition = lambda: self.get().result() == value if eps is None else eps_condition
-        busy_wait(condition, sleep_time=sleep_time, timeout=timeout)
+        condition = (lambda: self.get().result() == value) if eps is None else eps_condition
+        busy_wait(condition, sleep_time=sleep_time, timeout=timeout, notifier=self.notifier)
 
     def _check_limit(self, value):
         """Common tasks for lower and upper before we set them."""
         if self._limits_locked:
             raise LockError('upper limit locked')
-        if not _is_compatible(self._parameter.unit, value):
+        if not self._parameter._is_compatible(value):
             raise UnitError("limit units must be compatible with `{}'".
                             format(self._parameter.unit))
 
@@ -910,8 +1106,15 @@ class Parameterizable(object):
 
         param.position = 0 * q.mm
         print param.position
+
+    Parameter changes are logged together with :attr:`name_for_log`. It can be set explicitly,
+    e.g. by a constructor, or by :func:`.register_names` which uses variable names, like the
+    session loader does for the session module.
     """
 
+    #: Name used in the log messages, None if the object is not named
+    name_for_log = None
+
     def __init__(self):
         if not hasattr(self, '_params'):
             self._params = {}
@@ -928,8 +1131,8 @@ class Parameterizable(object):
         table = get_default_table(["Parameter", "Value"])
         table.border = False
 
-        for param in self:
-            table.add_row([param.name, str(param.get().result())])
+        for name, value in self.get_many().result().items():
+            table.add_row([name, str(value)])
 
         return table.get_string(sortby="Parameter")
 
@@ -983,21 +1186,137 @@ class Parameterizable(object):
         if not hasattr(self, '_get_target_' + param.name):
             setattr(self, '_get_target_' + param.name, _getter_target_not_implemented)
 
-    @async
+    @queued
+    def get_many(self, names=None):
+        """Get the values of parameters with *names* (all parameters if None) and return a
+        dictionary mapping the names to the values.
+
+        If the object implements :meth:`._get_many` the values are read by one call to it,
+        otherwise the parameters are read one by one. The access is one item of the work queue,
+        the single reads are executed within it and do not need another thread.
+        """
+        names = list(self._params) if names is None else list(names)
+        # Raise ParameterError for unknown names before anything is read
+        params = [self[name] for name in names]
+        values = self._get_many_natively(names).result()
+
+        if values is None:
+            futures = [(param.name, param.get()) for param in params]
+            values = dict((name, future.result()) for name, future in futures)
+
+        return values
+
+    @queued
+    def set_many(self, values):
+        """Set parameters given by *values*, a dictionary mapping parameter names to the new
+        values. Use :class:`collections.OrderedDict` if the values must be written in a
+        particular order.
+
+        All values are checked (units, limits, locks) before anything is written. If the object
+        implements :meth:`._set_many` the values are written by one call to it, otherwise the
+        parameters are set one by one within the same work queue item.
+        """
+        checked = collections.OrderedDict()
+
+        for name, value in values.items():
+            checked[name] = self[name]._parameter._check_value(self, value)
+
+        if not self._set_many_natively(checked).result():
+            wait([self[name].set(value) for name, value in values.items()])
+
+    def _get_many(self, names):
+        """Read parameters with *names* at once and return a dictionary mapping the names to the
+        values. Parameters missing in the result are read one by one. Raise
+        :class:`.AccessorNotImplementedError` if the device cannot do that.
+        """
+        raise AccessorNotImplementedError
+
+    def _set_many(self, values):
+        """Write *values*, an ordered dictionary mapping parameter names to checked values, at
+        once. Raise :class:`.AccessorNotImplementedError` if the device cannot do that. State
+        checks of the single parameter setters do not apply, the implementation is responsible
+        for the state transitions.
+        """
+        raise AccessorNotImplementedError
+
+    @queued
+    def _get_many_natively(self, names):
+        try:
+            values = self._get_many(names)
+        except AccessorNotImplementedError:
+            return None
+
+        result = {}
+
+        for name in names:
+            if name in values:
+                result[name] = self[name]._parameter._convert_value(values[name])
+            else:
+                result[name] = getattr(self, name)
+
+        return result
+
+    @queued
+    def _set_many_natively(self, values):
+        try:
+            self._set_many(values)
+        except AccessorNotImplementedError:
+            return False
+
+        for name, value in values.items():
+            self[name]._parameter._written(self, value)
+
+        return True
+
+    @queued
     def stash(self):
         """
         Save all writable parameters that can be restored with
         :meth:`.Parameterizable.restore`.
 
         The values are stored on a stacked, hence subsequent saved states can
-        be restored one by one.
+        be restored one by one. Parameters without a target value are read by
+        :meth:`.get_many`.
         """
-        wait((param.stash() for param in self if param.writable))
+        params = [param for param in self if param.writable]
+        targets = [(param, param.get_target()) for param in params if param.target_readable]
+        current = self.get_many([param.name for param in params if not param.target_readable])
+
+        for param, future in targets:
+            param._saved.append(future.result())
 
-    @async
+        for name, value in current.result().items():
+            self[name]._saved.append(value)
+
+    @queued
     def restore(self):
-        """Restore all parameters saved with :meth:`.Parameterizable.stash`."""
-        wait((param.restore() for param in self if param.writable))
+        """Restore all parameters saved with :meth:`.Parameterizable.stash` by
+        :meth:`.set_many`. If that fails, e.g. because one parameter is locked, the
+        parameters are restored one by one and the first error is raised.
+        """
+        params = [param for param in self if param.writable and param._saved]
+        values = dict((param.name, param._saved[-1]) for param in params)
+
+        try:
+            self.set_many(values).join()
+        except Exception as error:
+            LOG.debug("Restoring `{}' one by one: {}".format(self.__class__.__name__, error))
+            futures = [(param, param.set(param._saved[-1])) for param in params]
+            errors = []
+
+            for param, future in futures:
+                try:
+                    future.join()
+                    param._saved.pop()
+                except Exception as error:
+                    errors.append(error)
+
+            if errors:
+                # Values which could not be restored stay saved
+                raise errors[0]
+        else:
+            for param in params:
+                param._saved.pop()
 
     def lock(self, permanent=False):
         """Lock all the parameters for writing. If *permanent* is True, the
@@ -0,0 +1,160 @@
+"""
+Reusable frame buffers which can be passed along a data pipeline without copying.
+
+A :class:`BufferPool` holds preallocated NumPy arrays. A producer gets a buffer by
+:meth:`BufferPool.get`, fills it and sends it to the consumers. Whoever holds a buffer owns a
+reference to it, the pool hands the buffer out again only after all references have been given
+back by :func:`release`. Consumers which need an item after their ``send`` returned, e.g. because
+they queue it, call :func:`retain` and :func:`release` once they are done::
+
+    pool = BufferPool((480, 640), np.uint16)
+
+    frame = pool.get()
+    camera_read_into(frame)
+    consumer.send(frame)
+    release(frame)
+
+:func:`retain` and :func:`release` can be called with any item, they do nothing if the item is
+not a pooled buffer or a view of one, so pipeline parts can use them unconditionally.
+"""
+import threading
+import weakref
+import numpy as np
+
+
+# Buffer id -> pool which owns the buffer
+_OWNERS = weakref.WeakValueDictionary()
+
+
+class BufferPool(object):
+
+    """
+    Pool of *size* preallocated arrays of *shape* and *dtype*. If all buffers are in use,
+    :meth:`get` waits for a released one if *block* is True, otherwise it returns a newly
+    allocated array which does not belong to the pool.
+    """
+
+    def __init__(self, shape, dtype=np.float32, size=16, block=False):
+        if size < 1:
+            raise ValueError('Pool size must be positive')
+
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.size = size
+        self.block = block
+        self.num_gets = 0
+        self.num_misses = 0
+        self._condition = threading.Condition()
+        self._buffers = {}
+        self._references = {}
+        self._free = []
+
+        for i in range(size):
+            buf = np.empty(self.shape, dtype=self.dtype)
+            self._buffers[id(buf)] = buf
+            self._references[id(buf)] = 0
+            self._free.append(buf)
+            _OWNERS[id(buf)] = self
+
+    def __repr__(self):
+        return "BufferPool(shape={}, dtype={}, size={}, free={})".format(
+            self.shape, self.dtype, self.size, self.num_free)
+
+    @property
+    def num_free(self):
+        """Number of buffers which are not in use."""
+        return len(self._free)
+
+    def get(self):
+        """Get a buffer with one reference owned by the caller."""
+        with self._condition:
+            self.num_gets += 1
+
+            if not self._free:
+                if not self.block:
+                    self.num_misses += 1
+                    return np.empty(self.shape, dtype=self.dtype)
+
+                while not self._free:
+                    self._condition.wait()
+
+            buf = self._free.pop()
+            self._references[id(buf)] = 1
+
+            return buf
+
+    def owns(self, array):
+        """Return True if *array* is a buffer of this pool."""
+        return self._buffers.get(id(array)) is array
+
+    def retain(self, array):
+        """Add a reference to the buffer *array*."""
+        with self._condition:
+            self._check(array)
+            self._references[id(array)] += 1
+
+    def release(self, array):
+        """Remove a reference from the buffer *array*, the buffer is reused if there are no
+        references left.
+        """
+        with self._condition:
+            self._check(array)
+            self._references[id(array)] -= 1
+
+            if not self._references[id(array)]:
+                self._free.append(array)
+                self._condition.notify()
+
+    def references(self, array):
+        """Return the number of references of the buffer *array*."""
+        return self._references[id(array)]
+
+    def _check(self, array):
+        if not self.owns(array):
+            raise ValueError('Array is not a buffer of this pool')
+        if not self._references[id(array)]:
+            raise ValueError('Buffer is not in use')
+
+
+def _find_buffer(item):
+    """Return tuple (pool, buffer) of *item* which is a pooled buffer or a view of one, (None,
+    None) otherwise.
+    """
+    while item is not None:
+        pool = _OWNERS.get(id(item))
+        if pool is not None and pool.owns(item):
+            return (pool, item)
+        item = getattr(item, 'base', None)
+
+    return (None, None)
+
+
+def is_pooled(item):
+    """Return True if *item* is a pooled buffer or a view of one."""
+    return _find_buffer(item)[0] is not None
+
+
+def retain(item):
+    """Add a reference to the buffer of *item* if it has one and return True in that case."""
+    pool, buf = _find_buffer(item)
+
+    if pool is None:
+        return False
+
+    pool.retain(buf)
+
+    return True
+
+
+def release(item):
+    """Remove a reference from the buffer of *item* if it has one and return True in that
+    case.
+    """
+    pool, buf = _find_buffer(item)
+
+    if pool is None:
+        return False
+
+    pool.release(buf)
+
+    return True
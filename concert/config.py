@@ -9,6 +9,26 @@
     Turn on gevent support. If geven is not available, fall back to
     ThreadPoolExecutor approach.
 
+.. data:: ENABLE_ASYNCIO
+
+    Turn on asyncio support, i.e. coroutine functions decorated by
+    :func:`concert.async.async` run in one event loop and the returned futures
+    can be awaited. Parameters of devices which are not blocking are accessed in
+    the event loop as well. Other functions are still executed by threads. If
+    asyncio is not available or gevent is used, fall back to ThreadPoolExecutor
+    approach.
+
+.. data:: MAX_WORKERS
+
+    Maximum number of threads executing asynchronous functions when gevent is not used. It must be
+    set before :mod:`concert.async` is imported.
+
+.. data:: DISPATCHER_WORKERS
+
+    Number of threads delivering messages of the global
+    :data:`concert.async.dispatcher`. It must be set before :mod:`concert.async`
+    is imported.
+
 .. data:: PROGRESS_BAR
 
     Turn on progress bar by long-lasting operations if tqdm package is present
@@ -16,6 +36,9 @@
 
 ENABLE_ASYNC = True
 ENABLE_GEVENT = False
+ENABLE_ASYNCIO = False
+MAX_WORKERS = 128
+DISPATCHER_WORKERS = 4
 # Prints the exception source by fake futures
 PRINT_NOASYNC_EXCEPTION = True
 PROGRESS_BAR = True
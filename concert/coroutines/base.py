@@ -1,16 +1,28 @@
 import functools
 
 
+# Active profilers, see concert.coroutines.profiling
+_PROFILERS = []
+
+
 def coroutine(func):
     """
     Start a coroutine automatically without the need to call
-    next() or send(None) first.
+    next() or send(None) first. Coroutines started while a
+    :class:`~concert.coroutines.profiling.Profiler` is active are
+    instrumented by it.
     """
     @functools.wraps(func)
     def start(*args, **kwargs):
         """Starts the generator."""
         gen = func(*args, **kwargs)
         next(gen)
+        if _PROFILERS:
+            name = func.__name__
+            if args and getattr(type(args[0]), name, None) is not None:
+                # Methods, e.g. sink objects
+                name = type(args[0]).__name__ + ('' if name == '__call__' else '.' + name)
+            gen = _PROFILERS[-1].wrap(gen, name)
         return gen
     return start
 
@@ -28,7 +40,9 @@ def broadcast(*consumers):
     """
     broadcast(*consumers)
 
-    Forward data to all *consumers*.
+    Forward data to all *consumers*. The same item is sent to all of them
+    without copying, consumers which keep it after processing must not modify it
+    and pooled buffers must be retained (see :mod:`concert.buffers`).
     """
     while True:
         item = yield
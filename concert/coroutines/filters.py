@@ -1,34 +1,50 @@
 from copy import deepcopy
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
 try:
     import Queue as queue_module
 except ImportError:
     import queue as queue_module
+import collections
 import logging
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
 import time
+import traceback
 import numpy as np
-import concert.config as cfg
 from concert.quantities import q
-from concert.imageprocessing import ramp_filter
+from concert.imageprocessing import Backprojector
 from concert.async import threaded
+from concert.buffers import is_pooled, release, retain
 from concert.imageprocessing import flat_correct as make_flat_correct
 from .base import coroutine
+from .profiling import record_wait
 
 
 LOG = logging.getLogger(__name__)
 
 
 @coroutine
-def downsize(consumer, x_slice=None, y_slice=None, z_slice=None):
+def downsize(consumer, x_slice=None, y_slice=None, z_slice=None, batched=False):
     """
-    downsize(consumer, x_slice=None, y_slice=None, z_slice=None)
+    downsize(consumer, x_slice=None, y_slice=None, z_slice=None, batched=False)
 
     Downsize images in 3D and send them to *consumer*. Every argument
     is either a tuple (start, stop, step). *x_slice* operates on
     image width, *y_slice* on its height and *z_slice* on the incoming
-    images, i.e. it creates the third time dimension.
+    images, i.e. it creates the third time dimension. If *batched* is True,
+    the incoming items are image stacks (see :func:`batch`) and the selected
+    images of every stack are sent as one stack.
 
     Note: the *start* index is included in the data and the *stop* index
-    is excluded.
+    is excluded. Views of pooled buffers (see :mod:`concert.buffers`) are sent
+    without copying.
     """
     def check_and_create(sl):
         if not sl:
@@ -43,91 +59,434 @@ def downsize(consumer, x_slice=None, y_slice=None, z_slice=None):
     k = 0
     while True:
         image = yield
+        if batched:
+            indices = np.arange(i, i + len(image))
+            in_range = (z_start <= indices) & (not z_stop or indices < z_stop)
+            selected = np.zeros(len(image), dtype=bool)
+            selected[in_range] = (k + np.arange(np.count_nonzero(in_range))) % z_step == 0
+            if selected.any():
+                consumer.send(image[selected, y_start:y_stop:y_step, x_start:x_stop:x_step])
+            k += np.count_nonzero(in_range)
+            i += len(image)
+            continue
+
         if z_start <= i and (not z_stop or i < z_stop):
             if k % z_step == 0:
-                consumer.send(np.copy(image[y_start:y_stop:y_step, x_start:x_stop:x_step]))
+                image = image[y_start:y_stop:y_step, x_start:x_stop:x_step]
+                consumer.send(image if is_pooled(image) else np.copy(image))
             k += 1
         i += 1
 
 
+class QueueStatistics(object):
+
+    """
+    Live statistics of a :func:`queue`. Pass an instance as its *statistics* argument and poll it
+    from the session while the data flows, e.g.::
+
+        stats = QueueStatistics()
+        acquire(queue(write(), maxsize=100, policy='spill', statistics=stats))
+        # From another thread
+        print(stats)
+
+    *depth* is the current number of queued items, *max_depth* the high-water mark, *bytes* and
+    *max_bytes* the same for the queued data size in memory. Spilled items count into the depth
+    but not into the bytes.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def __repr__(self):
+        return ("QueueStatistics(depth={}, max_depth={}, bytes={}, max_bytes={}, enqueued={}, "
+                "dequeued={}, dropped={}, spilled={})".format(
+                    self.depth, self.max_depth, self.bytes, self.max_bytes, self.num_enqueued,
+                    self.num_dequeued, self.num_dropped, self.num_spilled))
+
+    def reset(self):
+        """Reset all counters."""
+        self.depth = 0
+        self.max_depth = 0
+        self.bytes = 0
+        self.max_bytes = 0
+        self.num_enqueued = 0
+        self.num_dequeued = 0
+        self.num_dropped = 0
+        self.num_spilled = 0
+        self.start = None
+
+    @property
+    def enqueue_rate(self):
+        """Mean number of items put into the queue per second."""
+        return self._rate(self.num_enqueued)
+
+    @property
+    def dequeue_rate(self):
+        """Mean number of items taken from the queue per second."""
+        return self._rate(self.num_dequeued)
+
+    def _rate(self, num_items):
+        if self.start is None or time.time() == self.start:
+            return 0 / q.s
+
+        return num_items / (time.time() - self.start) / q.s
+
+
+def _nbytes(item):
+    """Size of *item* in bytes."""
+    nbytes = getattr(item, 'nbytes', None)
+
+    return sys.getsizeof(item) if nbytes is None else nbytes
+
+
+class _BoundedQueue(object):
+
+    """Queue used by :func:`queue`, see its documentation for the parameters."""
+
+    def __init__(self, maxsize, max_bytes, policy, spill_directory, statistics):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.stats = statistics
+        self._spill_directory = spill_directory
+        self._own_directory = False
+        # Tuples (item, nbytes, filename), spilled items have filename set and item None
+        self._items = collections.deque()
+        self._num_in_memory = 0
+        self._condition = threading.Condition()
+        self._closed = False
+        self.finished = False
+
+    def _full(self, nbytes):
+        if not self._num_in_memory:
+            # Always accept one item, no matter how big it is
+            return False
+
+        return ((self.maxsize is not None and self._num_in_memory >= self.maxsize) or
+                (self.max_bytes is not None and self.stats.bytes + nbytes > self.max_bytes))
+
+    def _append(self, item, nbytes, filename=None):
+        self._items.append((item, nbytes, filename))
+        self.stats.depth += 1
+        self.stats.num_enqueued += 1
+        self.stats.max_depth = max(self.stats.max_depth, self.stats.depth)
+        if filename is None:
+            self._num_in_memory += 1
+            self.stats.bytes += nbytes
+            self.stats.max_bytes = max(self.stats.max_bytes, self.stats.bytes)
+        self._condition.notify_all()
+
+    def _pop(self):
+        item, nbytes, filename = self._items.popleft()
+        self.stats.depth -= 1
+        if filename is None:
+            self._num_in_memory -= 1
+            self.stats.bytes -= nbytes
+        self._condition.notify_all()
+
+        return (item, filename)
+
+    def _discard(self, item, filename):
+        self.stats.num_dropped += 1
+        if filename is None:
+            release(item)
+        else:
+            os.remove(filename)
+
+    def _spill(self, item):
+        if self._spill_directory is None:
+            self._spill_directory = tempfile.mkdtemp(prefix='concert-queue-')
+            self._own_directory = True
+
+        handle, filename = tempfile.mkstemp(suffix='.pkl', dir=self._spill_directory)
+        with os.fdopen(handle, 'wb') as f:
+            pickle.dump(item, f, pickle.HIGHEST_PROTOCOL)
+        # The data is on disk, a pooled buffer can be reused
+        release(item)
+        self.stats.num_spilled += 1
+
+        return filename
+
+    def put(self, item):
+        """Put *item* into the queue and handle the overflow according to the policy."""
+        nbytes = _nbytes(item)
+        filename = None
+
+        with self._condition:
+            if self.stats.start is None:
+                self.stats.start = time.time()
+
+            if self._full(nbytes):
+                if self.policy == 'block':
+                    start = time.time()
+                    while self._full(nbytes) and not self.finished:
+                        self._condition.wait()
+                    record_wait(time.time() - start)
+                elif self.policy == 'drop-newest':
+                    self._discard(item, None)
+                    return
+                elif self.policy == 'drop-oldest':
+                    while self._full(nbytes):
+                        self._discard(*self._pop())
+
+            if self.finished:
+                release(item)
+                return
+
+            if not (self.policy == 'spill' and self._full(nbytes)):
+                self._append(item, nbytes)
+                return
+
+        # Write outside of the lock to keep the serve loop going, items are put by one producer,
+        # so they stay in order
+        filename = self._spill(item)
+
+        with self._condition:
+            if self.finished:
+                os.remove(filename)
+            else:
+                self._append(None, 0, filename=filename)
+
+    def get(self):
+        """Get the next item and a boolean which is False if the queue has been closed and there
+        are no more items.
+        """
+        with self._condition:
+            while not self._items and not self._closed:
+                self._condition.wait()
+            if not self._items:
+                return (None, False)
+            item, filename = self._pop()
+            self.stats.num_dequeued += 1
+
+        if filename is not None:
+            with open(filename, 'rb') as f:
+                item = pickle.load(f)
+            os.remove(filename)
+
+        return (item, True)
+
+    def close(self, discard=False):
+        """Let the serve loop stop once the queued items are consumed, drop them if *discard* is
+        True.
+        """
+        with self._condition:
+            self._closed = True
+            if discard:
+                self._discard_all()
+            self._condition.notify_all()
+
+    def finish(self):
+        """Mark the serve loop as stopped and clean up."""
+        with self._condition:
+            self.finished = True
+            self._discard_all()
+            self._condition.notify_all()
+
+        if self._own_directory:
+            shutil.rmtree(self._spill_directory, ignore_errors=True)
+
+    def join(self):
+        """Wait until the serve loop stops."""
+        with self._condition:
+            while not self.finished:
+                self._condition.wait()
+
+    def _discard_all(self):
+        while self._items:
+            self._discard(*self._pop())
+
+
+QUEUE_POLICIES = ('block', 'drop-oldest', 'drop-newest', 'spill')
+
+
 @coroutine
-def queue(consumer, process_all=True, block=False, make_deepcopy=True):
+def queue(consumer, process_all=True, block=False, make_deepcopy=True, maxsize=None,
+          max_bytes=None, policy='block', spill_directory=None, statistics=None):
     """
-    queue(consumer, process_all=True, block=False)
+    queue(consumer, process_all=True, block=False, make_deepcopy=True, maxsize=None,
+          max_bytes=None, policy='block', spill_directory=None, statistics=None)
 
     Store the incoming data in a queue and dispatch to the *consumer* in a separate thread which
     prevents the stalling on the "main" data stream. If *process_all* is True the serve loop may
     exit only when all items are sent to *consumer*. If *block* is True this coroutine blocks until
     all items in the serve loop are processed, *process_all* must be True as well for this to take
     effect. If *make_deepcopy* is True, insert a deep copy of an item into the queue, otherwise just
-    a reference.
-    """
-    from concert.async import HAVE_GEVENT
-    if cfg.ENABLE_GEVENT and HAVE_GEVENT:
-        from gevent.event import Event
-    else:
-        from threading import Event
+    a reference. Pooled buffers (see :mod:`concert.buffers`) are never copied, they are retained
+    until the *consumer* processes them.
 
+    The queue is unbounded by default. *maxsize* limits the number of items and *max_bytes* the
+    size of the items (``nbytes`` of arrays) held in memory, a single item is always accepted.
+    *policy* specifies what happens if a new item does not fit:
+
+    - ``'block'``: wait until the consumer takes items from the queue
+    - ``'drop-oldest'``: drop the oldest queued items
+    - ``'drop-newest'``: drop the new item
+    - ``'spill'``: pickle the item to *spill_directory* (a temporary directory if None) and load it
+      back when the consumer needs it
+
+    If *statistics* is a :class:`QueueStatistics` instance, it is reset and updated while the
+    queue works.
+    """
     if block and not process_all:
         raise ValueError('If block is True then process_all must be as well')
-    item_queue = queue_module.Queue()
+    if policy not in QUEUE_POLICIES:
+        raise ValueError("Policy must be one of {}".format(QUEUE_POLICIES))
+    if (maxsize is not None and maxsize < 1) or (max_bytes is not None and max_bytes < 1):
+        raise ValueError('Queue limits must be positive')
+
+    if statistics is None:
+        statistics = QueueStatistics()
+    statistics.reset()
+    item_queue = _BoundedQueue(maxsize, max_bytes, policy, spill_directory, statistics)
 
     @threaded
     def serve():
-        while True:
-            item = item_queue.get()
-            if item is not None:
-                consumer.send(item)
-            elif not process_all or item_queue.empty():
-                break
-            item_queue.task_done()
-        serve.stopped.set()
-        LOG.debug("queue's serve loop stopped")
+        try:
+            while True:
+                item, valid = item_queue.get()
+                if not valid:
+                    break
+                try:
+                    consumer.send(item)
+                finally:
+                    release(item)
+        finally:
+            item_queue.finish()
+            LOG.debug("queue's serve loop stopped")
 
-    serve.stopped = Event()
     serve()
 
     try:
         while True:
             item = yield
-            if make_deepcopy:
+            if not retain(item) and make_deepcopy:
                 item = deepcopy(item)
             item_queue.put(item)
     except GeneratorExit:
-        item_queue.put(None)
+        item_queue.close(discard=not process_all)
         if block:
-            serve.stopped.wait()
+            item_queue.join()
+    except BaseException:
+        # Do not keep the queued items (and their buffers) if the producer failed
+        item_queue.close(discard=True)
+        raise
+
+
+@coroutine
+def batch(size, consumer):
+    """
+    batch(size, consumer)
+
+    Collect *size* incoming images into a stack of shape (*size*, height,
+    width) and send it to *consumer*, so that the following filters can
+    process whole stacks by one NumPy call. The images are copied into the
+    stack, a stack which has not been filled yet is sent when the coroutine is
+    closed. Use :func:`unbatch` to get the single images back.
+    """
+    if size < 1:
+        raise ValueError('Batch size must be positive')
+
+    stack = None
+    i = 0
+
+    try:
+        while True:
+            item = yield
+            if stack is None:
+                stack = np.empty((size,) + item.shape, dtype=item.dtype)
+            stack[i] = item
+            i += 1
+            if i == size:
+                consumer.send(stack)
+                stack = None
+                i = 0
+    except GeneratorExit:
+        if i:
+            consumer.send(stack[:i])
 
 
 @coroutine
-def average_images(consumer):
+def unbatch(consumer):
+    """
+    unbatch(consumer)
+
+    Send the images of the incoming stacks one by one to *consumer*.
     """
-    average_images(consumer)
+    while True:
+        stack = yield
+        for item in stack:
+            consumer.send(item)
+
 
-    Average images as they come and send them to *consumer*.
+@coroutine
+def average_images(consumer, batched=False, in_place=False):
+    """
+    average_images(consumer, batched=False, in_place=False)
+
+    Average images as they come and send them to *consumer*. If *batched* is
+    True, the incoming items are image stacks (see :func:`batch`) and the
+    average is sent once per stack. A new array is sent every time unless
+    *in_place* is True, in which case the average is updated in place and the
+    same array is sent, copy it if you need to keep the intermediate results.
+    :class:`~concert.coroutines.sinks.RunningStatistics` computes more
+    statistics of the images.
     """
     average = None
+    delta = None
     i = 0
 
     while True:
         data = yield
+        count = len(data) if batched else 1
+        if batched:
+            data = data.sum(axis=0)
         if average is None:
             average = np.zeros_like(data, dtype=np.float32)
-        average = (average * i + data) / (i + 1)
-        consumer.send(average)
-        i += 1
+            delta = np.empty_like(average)
+        np.multiply(average, count, out=delta)
+        np.subtract(data, delta, out=delta)
+        delta *= 1. / (i + count)
+        average += delta
+        consumer.send(average if in_place else average.copy())
+        i += count
+
+
+class SinogramRows(object):
+
+    """Sinogram rows *start* to *stop* (excluded) of *volume* which have been updated by
+    :func:`sinograms`.
+    """
+
+    def __init__(self, volume, start, stop):
+        self.volume = volume
+        self.start = start
+        self.stop = stop
+
+    def __repr__(self):
+        return "SinogramRows(start={}, stop={})".format(self.start, self.stop)
+
+    @property
+    def rows(self):
+        """View of the updated rows of all sinograms."""
+        return self.volume[:, self.start:self.stop, :]
 
 
 @coroutine
-def sinograms(num_radiographs, consumer, sinograms_volume=None):
+def sinograms(num_radiographs, consumer, sinograms_volume=None, batched=False,
+              incremental=False):
     """
-    sinograms(num_radiographs, consumer, sinograms_volume=None)
+    sinograms(num_radiographs, consumer, sinograms_volume=None, batched=False, incremental=False)
 
     Convert *num_radiographs* into sinograms and send them to *consumer*.
     The sinograms are sent every time a new radiograph arrives. If there
     is more than *num_radiographs* radiographs, the sinograms are rewritten
     in a ring-buffer fashion. If *sinograms_volume* is given, it must be a 3D
-    array and it is used to store the sinograms.
+    array and it is used to store the sinograms. If *batched* is True, the
+    incoming items are radiograph stacks (see :func:`batch`) and the sinograms
+    are sent once per stack. If *incremental* is True, a :class:`SinogramRows`
+    with the updated rows is sent instead of the whole volume, so that the
+    consumers do not have to process all the sinograms for every radiograph.
     """
     i = 0
 
@@ -137,17 +496,35 @@ def sinograms(num_radiographs, consumer, sinograms_volume=None):
 
     while True:
         radiograph = yield
+        radio_shape = radiograph.shape[1:] if batched else radiograph.shape
 
         if sinograms_volume is None:
-            sinograms_volume = np.zeros((radiograph.shape[0], num_radiographs,
-                                        radiograph.shape[1]), dtype=radiograph.dtype)
-        if not is_compatible(radiograph.shape, sinograms_volume.shape):
+            sinograms_volume = np.zeros((radio_shape[0], num_radiographs,
+                                        radio_shape[1]), dtype=radiograph.dtype)
+        if not is_compatible(radio_shape, sinograms_volume.shape):
             raise ValueError("Incompatible radiograph shape")
 
-        sinograms_volume[:, i % num_radiographs, :] = radiograph
-        consumer.send(sinograms_volume)
-
-        i += 1
+        if batched:
+            # Write contiguous parts of the ring buffer at once
+            offset = 0
+            while offset < len(radiograph):
+                start = (i + offset) % num_radiographs
+                length = min(len(radiograph) - offset, num_radiographs - start)
+                part = radiograph[offset:offset + length]
+                sinograms_volume[:, start:start + length, :] = part.transpose(1, 0, 2)
+                offset += length
+                if incremental:
+                    consumer.send(SinogramRows(sinograms_volume, start, start + length))
+            i += len(radiograph)
+        else:
+            start = i % num_radiographs
+            sinograms_volume[:, start, :] = radiograph
+            i += 1
+            if incremental:
+                consumer.send(SinogramRows(sinograms_volume, start, start + 1))
+
+        if not incremental:
+            consumer.send(sinograms_volume)
 
 
 @coroutine
@@ -157,7 +534,8 @@ def flat_correct(flat, consumer, dark=None):
 
     Flat correcting corounte, which takes a *flat* field, a *dark* field (if
     given), calculates a flat corrected radiograph and forwards it to
-    *consumer*.
+    *consumer*. The incoming items can also be radiograph stacks (see
+    :func:`batch`).
     """
     flat = flat.astype(np.float32)
 
@@ -174,7 +552,8 @@ def absorptivity(consumer):
     Get the absorptivity from a flat corrected stream of images.  The intensity
     after the object is defined as :math:`I = I_0 \cdot e^{-\mu t}` and we
     extract the absorptivity :math:`\mu t` from the stream of flat corrected
-    images :math:`I / I_0`.
+    images :math:`I / I_0`. The incoming items can also be image stacks (see
+    :func:`batch`).
     """
     while True:
         frame = yield
@@ -207,71 +586,39 @@ def stall(consumer, per_shot=10, flush_at=None):
 
 
 @coroutine
-def backproject(center, consumer):
+def backproject(center, consumer, block_size=None, dtype=np.float32, num_threads=None):
     """
-    backproject(center, consumer)
+    backproject(center, consumer, block_size=None, dtype=np.float32, num_threads=None)
 
     Filtered backprojection filter. The filter receives a sinogram,
     filters it and based on *center* of rotation it backprojects it.
-    The slice is then sent to *consumer*.
+    The slice is then sent to *consumer*. If the filter receives a stack of
+    sinograms, the slices are reconstructed in parallel and sent as one
+    stack. The rest of the arguments are passed to
+    :class:`~concert.imageprocessing.Backprojector`.
     """
-    reco = None
-    angle_step = None
-
-    def reconstruct(sinogram, center, angle_step, x_indices, y_indices):
-        """Reconstruct the slice by backprojecting all the sinogram rows."""
-        width = x_indices.shape[0]
-        reco = np.zeros((width, width))
-
-        for i, phi in enumerate(np.arange(sinogram.shape[0]) * angle_step):
-            pos = np.sin(phi) * x_indices + np.cos(phi) * y_indices + center
-            reco += sinogram[i, pos.astype(np.int)]
-
-        return reco
-
-    def filter_sinogram(sinogram, start, filter_ft, width):
-        """High-pass 1D filtering of the sinogram rows."""
-        sinogram_ft = np.fft.fft(sinogram[:, start:start + width])
-        filtered = sinogram_ft * filter_ft
-        return np.fft.ifft(filtered).real.astype(np.float32)
+    backprojector = None
 
-    def get_indices(sinogram, center):
-        """
-        Get x and y indices which will be the base for rotation. The indices
-        are created around the *center* in a symmetrical way, so if there is
-        more space on one side it is cut away. This way we can mask out the
-        region beyond the inscribed circle of the index arrays. Then we can
-        be sure the rotated indices will always fall somewhere in the slice,
-        thus we don't need to cut indices which saves time.
-        """
-        half = min(center, sinogram.shape[1] - center)
-        y_indices, x_indices = np.mgrid[-half:half, -half:half]
-        mask = np.where(np.sqrt(x_indices ** 2 + y_indices ** 2) >= half)
-        x_indices[mask] = 0
-        y_indices[mask] = 0
-
-        return y_indices, x_indices
-
-    while True:
-        sinogram = yield
-
-        if reco is None:
-            if center >= sinogram.shape[1]:
-                template = 'Center {} must be less than sinogram width {}'
-                raise ValueError(template.format(center, sinogram.shape[1]))
-            y_indices, x_indices = get_indices(sinogram, center)
-            width = x_indices.shape[0]
-            ramp = ramp_filter(width)
-            angle_step = np.pi / sinogram.shape[0]
-            # We need to store the position where we crop the sinogram, that is
-            # based on the old center
-            start = center - width / 2
-            # Since we crop the indices the new center is always in the middle
-            center = width / 2
-
-        filtered = filter_sinogram(sinogram, start, ramp, width)
-        reco = reconstruct(filtered, center, angle_step, x_indices, y_indices)
-        consumer.send(reco)
+    try:
+        while True:
+            sinogram = yield
+            num_projections, width = sinogram.shape[-2:]
+
+            if (backprojector is None or backprojector.num_projections != num_projections or
+                    backprojector.width != width):
+                if backprojector is not None:
+                    backprojector.close()
+                backprojector = Backprojector(num_projections, width, center,
+                                              block_size=block_size, dtype=dtype,
+                                              num_threads=num_threads)
+
+            if sinogram.ndim == 3:
+                consumer.send(backprojector.reconstruct(sinogram))
+            else:
+                consumer.send(backprojector(sinogram))
+    finally:
+        if backprojector is not None:
+            backprojector.close()
 
 
 class PickSlice(object):
@@ -356,3 +703,184 @@ def process(func, consumer, *args, **kwargs):
     while True:
         item = yield
         consumer.send(func(item, *args, **kwargs))
+
+
+def _slot_array(slot, shape, dtype):
+    """Return an array of *shape* and *dtype* backed by the shared memory *slot*."""
+    dtype = np.dtype(dtype)
+    count = int(np.prod(shape)) * dtype.itemsize
+
+    return np.frombuffer(slot, dtype=np.uint8, count=count).view(dtype).reshape(shape)
+
+
+def _fits(item, slot_size):
+    return (isinstance(item, np.ndarray) and not item.dtype.hasobject and
+            item.nbytes <= slot_size)
+
+
+def _parallel_worker(func, slots, tasks, results):
+    """Apply *func* to the items from *tasks* and put the results into *results*."""
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        index, slot, data = task
+
+        try:
+            item = data if slot is None else _slot_array(slots[slot], *data)
+            result = func(item)
+
+            if slot is not None and _fits(result, len(slots[slot])):
+                if np.may_share_memory(result, item):
+                    result = np.copy(result)
+                _slot_array(slots[slot], result.shape, result.dtype)[...] = result
+                results.put((index, slot, (result.shape, result.dtype.str), True, None))
+            else:
+                results.put((index, slot, result, False, None))
+        except Exception:
+            results.put((index, slot, None, False, traceback.format_exc()))
+
+
+class _ProcessPool(object):
+
+    """Process pool used by :func:`parallel_process`. The worker processes and the shared memory
+    slots are created when the first item is submitted, the slot size is the size of that item.
+    """
+
+    def __init__(self, func, workers):
+        self.func = func
+        self.workers = workers
+        self.num_slots = 2 * workers
+        self._tasks = multiprocessing.Queue()
+        self._results = multiprocessing.Queue()
+        self._processes = []
+        self._slots = []
+        self._free = []
+        self._done = {}
+        self._num_submitted = 0
+        self._num_pending = 0
+        self._next = 0
+
+    def _start(self, item):
+        if _fits(item, item.nbytes if isinstance(item, np.ndarray) else 0):
+            self._slots = [multiprocessing.RawArray('B', max(item.nbytes, 1))
+                           for i in range(self.num_slots)]
+            self._free = list(range(self.num_slots))
+
+        for i in range(self.workers):
+            process = multiprocessing.Process(target=_parallel_worker,
+                                              args=(self.func, self._slots, self._tasks,
+                                                    self._results))
+            process.daemon = True
+            process.start()
+            self._processes.append(process)
+
+    def submit(self, item):
+        """Dispatch *item* to a worker, wait for results if all slots are in use."""
+        if not self._processes:
+            self._start(item)
+
+        start = time.time()
+        while self._num_pending >= self.num_slots:
+            self._receive()
+        record_wait(time.time() - start)
+
+        slot = None
+        data = item
+        if self._slots and _fits(item, len(self._slots[0])):
+            slot = self._free.pop()
+            _slot_array(self._slots[slot], item.shape, item.dtype)[...] = item
+            data = (item.shape, item.dtype.str)
+
+        self._tasks.put((self._num_submitted, slot, data))
+        self._num_submitted += 1
+        self._num_pending += 1
+
+    def _receive(self):
+        while True:
+            try:
+                index, slot, data, shared, error = self._results.get(timeout=0.1)
+                break
+            except queue_module.Empty:
+                if not all(process.is_alive() for process in self._processes):
+                    raise RuntimeError('Worker process died')
+
+        if shared:
+            data = np.copy(_slot_array(self._slots[slot], *data))
+        if slot is not None:
+            self._free.append(slot)
+        self._num_pending -= 1
+
+        if error:
+            raise RuntimeError('Processing item {} failed:\n{}'.format(index, error))
+
+        self._done[index] = data
+
+    def results(self, ordered, wait=False):
+        """Yield the processed items, in the order of submission if *ordered* is True. If *wait*
+        is True, wait for all submitted items.
+        """
+        while True:
+            while not self._results.empty():
+                self._receive()
+
+            if ordered:
+                if self._next in self._done:
+                    self._next += 1
+                    yield self._done.pop(self._next - 1)
+                    continue
+            elif self._done:
+                yield self._done.pop(min(self._done))
+                continue
+
+            if not (wait and self._num_pending):
+                break
+            self._receive()
+
+    def close(self):
+        """Stop the worker processes."""
+        for process in self._processes:
+            self._tasks.put(None)
+
+        for process in self._processes:
+            process.join(1)
+            if process.is_alive():
+                process.terminate()
+
+        self._tasks.close()
+        self._results.close()
+
+
+@coroutine
+def parallel_process(func, consumer, workers=None, ordered=True):
+    """
+    parallel_process(func, consumer, workers=None, ordered=True)
+
+    Like :func:`process`, but apply *func* in a pool of *workers* processes (as many as there are
+    CPUs if None), so that Python code working on the items runs on all cores. If *ordered* is
+    True, the results are sent to *consumer* in the order of the incoming items, otherwise as soon
+    as they are ready. The results are sent from the producer's thread when new items come and
+    when the coroutine is closed.
+
+    Arrays are passed to the workers and back through shared memory with the size of the first
+    item, other items and bigger arrays are pickled. *func* must be a module-level function if
+    the platform does not fork processes.
+    """
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if workers < 1:
+        raise ValueError('Number of workers must be positive')
+
+    pool = _ProcessPool(func, workers)
+
+    try:
+        while True:
+            item = yield
+            pool.submit(item)
+            for result in pool.results(ordered):
+                consumer.send(result)
+    except GeneratorExit:
+        for result in pool.results(ordered, wait=True):
+            consumer.send(result)
+    finally:
+        pool.close()
@@ -0,0 +1,317 @@
+"""
+Declarative coroutine pipelines. Instead of nesting filters and :func:`.broadcast` calls, a
+:class:`Graph` consists of named nodes connected by edges. A graph is callable and every call
+creates new coroutines, so that it can be used as a consumer of an
+:class:`~concert.experiments.base.Acquisition` and reused in every experiment run::
+
+    graph = Graph()
+    graph.add_filter('flat', flat_correct, flat)
+    graph.add_filter('absorptivity', absorptivity)
+    graph.add_sink('write', walker.write)
+    graph.add_tap('preview')
+    graph.chain('flat', 'absorptivity', 'write')
+    graph.connect('flat', 'preview')
+
+    acquisition = Acquisition('radios', produce, consumers=[graph])
+    graph.attach('preview', viewer)
+
+Filters are called with the coroutine of their downstream nodes as the *consumer* keyword
+argument, sinks are called without it. Nodes without upstream nodes get the incoming data. Equal
+filters, i.e. the same function with the same arguments, which get data from the same upstream
+node are fused and compute the result only once for all their downstream nodes. Taps are named
+places where consumers can be attached and detached between runs, a tap without consumers is
+removed from the running pipeline.
+"""
+import collections
+from .base import broadcast
+
+
+class GraphError(Exception):
+
+    """Raised on invalid graph definitions."""
+
+    pass
+
+
+class Node(object):
+
+    """
+    Node called *name* which creates its coroutine by calling *func* with *args* and *kwargs*.
+    *kind* is one of ``'filter'``, ``'sink'`` or ``'tap'``.
+    """
+
+    def __init__(self, name, kind, func=None, args=(), kwargs=None):
+        self.name = name
+        self.kind = kind
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.consumers = []
+
+    def __repr__(self):
+        return "Node({}, {})".format(self.name, self.kind)
+
+    @property
+    def key(self):
+        """Nodes with equal keys compute the same result from the same input. Unhashable
+        arguments are compared by identity, so that e.g. NumPy arrays are not compared
+        element-wise.
+        """
+        kwargs = tuple(sorted((name, _key(value)) for name, value in self.kwargs.items()))
+
+        return (self.func, tuple(_key(arg) for arg in self.args), kwargs)
+
+
+def _key(value):
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return ('id', id(value))
+
+
+class _Stage(object):
+
+    """Node of a compiled graph, which can represent several fused nodes."""
+
+    def __init__(self, node):
+        self.node = node
+        self.names = [node.name]
+        self.children = []
+
+
+class RunningGraph(object):
+
+    """Started coroutines of a :class:`Graph`, it is used like a coroutine."""
+
+    def __init__(self, root, coroutines):
+        self.root = root
+        self.coroutines = coroutines
+
+    def send(self, item):
+        """Send *item* to the graph."""
+        return self.root.send(item)
+
+    def close(self):
+        """Close the coroutines from the upstream to the downstream ones, so that buffering
+        filters can send their remaining data.
+        """
+        for coro in self.coroutines:
+            coro.close()
+
+
+class Graph(object):
+
+    """A graph of coroutine pipeline nodes."""
+
+    def __init__(self):
+        self.nodes = collections.OrderedDict()
+        self.edges = []
+        self._stages = None
+
+    def __call__(self):
+        """Create and start the coroutines and return a :class:`RunningGraph`."""
+        stages = self.compile()
+        if not stages:
+            raise GraphError('Graph has no sinks')
+
+        coroutines = {}
+        # Downstream coroutines are started before the upstream ones
+        started = []
+
+        def connect(consumers):
+            return consumers[0] if len(consumers) == 1 else broadcast(*consumers)
+
+        def start(stage):
+            if stage not in coroutines:
+                consumers = [start(child) for child in stage.children]
+                node = stage.node
+
+                if node.kind == 'tap':
+                    attached = [consumer() for consumer in node.consumers]
+                    started.extend(attached)
+                    coro = connect(consumers + attached)
+                elif node.kind == 'sink':
+                    coro = node.func(*node.args, **node.kwargs)
+                else:
+                    coro = node.func(*node.args, consumer=connect(consumers), **node.kwargs)
+                coroutines[stage] = coro
+                started.append(coro)
+
+            return coroutines[stage]
+
+        root = connect([start(stage) for stage in stages])
+
+        return RunningGraph(root, started[::-1])
+
+    def _add(self, node):
+        if node.name in self.nodes:
+            raise GraphError("Node `{}' already exists".format(node.name))
+        self.nodes[node.name] = node
+        self._stages = None
+
+        return node.name
+
+    def add_filter(self, name, func, *args, **kwargs):
+        """Add filter *func* called *name*, *args* and *kwargs* are passed to *func* together with
+        the *consumer* keyword argument.
+        """
+        return self._add(Node(name, 'filter', func, args, kwargs))
+
+    def add_sink(self, name, func, *args, **kwargs):
+        """Add sink *func* called *name* with *args* and *kwargs*."""
+        return self._add(Node(name, 'sink', func, args, kwargs))
+
+    def add_tap(self, name):
+        """Add a tap called *name*, see :meth:`.attach`."""
+        return self._add(Node(name, 'tap'))
+
+    def remove(self, name):
+        """Remove node *name* and its edges."""
+        self._check_names(name)
+        del self.nodes[name]
+        self.edges = [edge for edge in self.edges if name not in edge]
+        self._stages = None
+
+    def connect(self, upstream, downstream):
+        """Send the output of node *upstream* to node *downstream*."""
+        self._check_names(upstream, downstream)
+        if self.nodes[upstream].kind == 'sink':
+            raise GraphError("Sink `{}' cannot have downstream nodes".format(upstream))
+        if (upstream, downstream) in self.edges:
+            raise GraphError("Edge `{}' -> `{}' already exists".format(upstream, downstream))
+        if upstream == downstream or upstream in self.downstream(downstream, recursive=True):
+            raise GraphError("Edge `{}' -> `{}' would create a cycle".format(upstream,
+                                                                             downstream))
+        self.edges.append((upstream, downstream))
+        self._stages = None
+
+    def chain(self, *names):
+        """Connect the nodes *names* one after another."""
+        for upstream, downstream in zip(names[:-1], names[1:]):
+            self.connect(upstream, downstream)
+
+    def attach(self, tap, consumer):
+        """Attach *consumer* to *tap*, *consumer* is a callable with no arguments which returns a
+        coroutine.
+        """
+        self._check_tap(tap)
+        self.nodes[tap].consumers.append(consumer)
+        self._stages = None
+
+    def detach(self, tap, consumer):
+        """Detach *consumer* from *tap*."""
+        self._check_tap(tap)
+        self.nodes[tap].consumers.remove(consumer)
+        self._stages = None
+
+    def upstream(self, name):
+        """Return the names of the nodes which send data to node *name*."""
+        return [up for (up, down) in self.edges if down == name]
+
+    def downstream(self, name, recursive=False):
+        """Return the names of the nodes which get data from node *name*, all of them down to the
+        sinks if *recursive* is True.
+        """
+        direct = [down for (up, down) in self.edges if up == name]
+
+        if not recursive:
+            return direct
+
+        result = []
+        for down in direct:
+            for other in [down] + self.downstream(down, recursive=True):
+                if other not in result:
+                    result.append(other)
+
+        return result
+
+    def validate(self):
+        """Check that every filter has a downstream node and raise :class:`GraphError` if not."""
+        for node in self.nodes.values():
+            if node.kind == 'filter' and not self.downstream(node.name):
+                raise GraphError("Filter `{}' has no downstream node".format(node.name))
+
+    @property
+    def fused(self):
+        """List of lists of node names which are computed together."""
+        return [stage.names for stage in self._all_stages() if len(stage.names) > 1]
+
+    def compile(self):
+        """Validate the graph, fuse equal filters and return the root stages. The result is cached
+        until the graph changes.
+        """
+        if self._stages is None:
+            self.validate()
+            stages = {}
+
+            def make_stage(name):
+                if name not in stages:
+                    stage = _Stage(self.nodes[name])
+                    stages[name] = stage
+                    stage.children = [make_stage(down) for down in self._active_downstream(name)]
+
+                return stages[name]
+
+            roots = [make_stage(name) for name in self.nodes
+                     if not self.upstream(name) and self._is_active(name)]
+            self._stages = self._fuse(roots)
+
+        return self._stages
+
+    def _fuse(self, siblings):
+        """Fuse equal filters in *siblings* and their children, return the new siblings."""
+        result = []
+        filters = {}
+
+        for stage in siblings:
+            node = stage.node
+            # Nodes with more upstream nodes would get the data from the others as well
+            if node.kind != 'filter' or len(self.upstream(node.name)) > 1:
+                result.append(stage)
+            elif node.key in filters:
+                fused = filters[node.key]
+                fused.names += stage.names
+                fused.children += [child for child in stage.children
+                                   if child not in fused.children]
+            else:
+                filters[node.key] = stage
+                result.append(stage)
+
+        for stage in result:
+            stage.children = self._fuse(stage.children)
+
+        return result
+
+    def _all_stages(self):
+        result = []
+        todo = list(self.compile())
+
+        while todo:
+            stage = todo.pop(0)
+            if stage not in result:
+                result.append(stage)
+                todo += stage.children
+
+        return result
+
+    def _is_active(self, name):
+        """Taps without consumers and nodes which send data only to them are left out."""
+        node = self.nodes[name]
+        if node.kind == 'sink' or (node.kind == 'tap' and node.consumers):
+            return True
+
+        return bool(self._active_downstream(name))
+
+    def _active_downstream(self, name):
+        return [down for down in self.downstream(name) if self._is_active(down)]
+
+    def _check_names(self, *names):
+        for name in names:
+            if name not in self.nodes:
+                raise GraphError("Node `{}' does not exist".format(name))
+
+    def _check_tap(self, tap):
+        self._check_names(tap)
+        if self.nodes[tap].kind != 'tap':
+            raise GraphError("Node `{}' is not a tap".format(tap))
@@ -0,0 +1,231 @@
+"""
+Instrumentation of coroutine pipelines. A :class:`Profiler` wraps every coroutine which is started
+while the profiler is active, no matter if it is a filter, a sink or a :func:`.broadcast`::
+
+    profiler = Profiler()
+
+    with profiler:
+        pipeline = broadcast(writer(), queue(flat_correct(flat, reconstruct())))
+
+    camera.stream(pipeline)
+    print(profiler)
+    profiler.dump('profile.json')
+
+For every stage the profiler counts the items and measures the time spent in the stage itself
+and in the stages it sends the items to in the same thread (*downstream* time). The stage with
+the largest self time per item limits the throughput of the pipeline. Time a stage spends waiting
+for a full queue is reported separately.
+"""
+import json
+import threading
+import time
+from concert.quantities import q
+from . import base
+
+
+_LOCAL = threading.local()
+
+
+def _stack():
+    """Stack of the stages running in the current thread."""
+    if not hasattr(_LOCAL, 'stack'):
+        _LOCAL.stack = []
+
+    return _LOCAL.stack
+
+
+def record_wait(duration):
+    """Add *duration* in seconds to the wait time of the stage which runs in the current thread.
+    Blocking data structures like queues call this after they waited for space.
+    """
+    stack = _stack()
+
+    if stack:
+        stack[-1].wait += duration
+
+
+class StageStatistics(object):
+
+    """Measurements of one pipeline stage called *name*."""
+
+    def __init__(self, name):
+        self.name = name
+        self.reset()
+
+    def reset(self):
+        """Reset the measurements."""
+        self.num_items = 0
+        self.num_bytes = 0
+        self.total = 0.0
+        self.downstream = 0.0
+        self.wait = 0.0
+        self.first = None
+        self.last = None
+
+    @property
+    def total_time(self):
+        """Time spent in the stage including the downstream stages."""
+        return self.total * q.s
+
+    @property
+    def self_time(self):
+        """Time spent in the stage itself."""
+        return (self.total - self.downstream) * q.s
+
+    @property
+    def downstream_time(self):
+        """Time spent in the stages called by this stage in the same thread."""
+        return self.downstream * q.s
+
+    @property
+    def wait_time(self):
+        """Time spent waiting for full queues."""
+        return self.wait * q.s
+
+    @property
+    def item_rate(self):
+        """Items per second between the first and the last item."""
+        return self._rate(self.num_items)
+
+    @property
+    def byte_rate(self):
+        """Bytes per second between the first and the last item."""
+        return self._rate(self.num_bytes)
+
+    def _rate(self, count):
+        duration = self.last - self.first if self.num_items > 1 else self.total
+
+        return (count / duration if duration else 0.0) / q.s
+
+    def as_dict(self):
+        """Return the measurements as a dictionary with times in seconds."""
+        return {'name': self.name,
+                'items': self.num_items,
+                'bytes': self.num_bytes,
+                'total_time': self.total,
+                'self_time': self.total - self.downstream,
+                'downstream_time': self.downstream,
+                'wait_time': self.wait,
+                'items_per_second': self.item_rate.magnitude,
+                'bytes_per_second': self.byte_rate.magnitude}
+
+
+class ProfiledCoroutine(object):
+
+    """Coroutine *coro* which records its sends in *statistics*."""
+
+    def __init__(self, coro, statistics):
+        self.coro = coro
+        self.statistics = statistics
+
+    def send(self, item):
+        stats = self.statistics
+        stack = _stack()
+        parent = stack[-1] if stack else None
+        stack.append(stats)
+        start = time.time()
+
+        try:
+            return self.coro.send(item)
+        finally:
+            end = time.time()
+            stack.pop()
+            stats.total += end - start
+            stats.num_items += 1
+            stats.num_bytes += getattr(item, 'nbytes', 0)
+            if stats.first is None:
+                stats.first = start
+            stats.last = end
+            if parent is not None:
+                parent.downstream += end - start
+
+    def close(self):
+        return self.coro.close()
+
+    def throw(self, *args):
+        return self.coro.throw(*args)
+
+    def __next__(self):
+        return self.send(None)
+
+    next = __next__
+
+    def __iter__(self):
+        return self
+
+
+class Profiler(object):
+
+    """
+    Pipeline profiler. Coroutines started in its ``with`` block are wrapped by it, other
+    coroutines can be wrapped explicitly by :meth:`.wrap`. The results are in :attr:`.stages`, a
+    list of :class:`StageStatistics` in the order in which the stages have been started.
+    """
+
+    def __init__(self):
+        self.stages = []
+
+    def __enter__(self):
+        base._PROFILERS.append(self)
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        base._PROFILERS.remove(self)
+
+    def __str__(self):
+        return self.table().get_string()
+
+    def wrap(self, coro, name):
+        """Instrument coroutine *coro* as a stage called *name*, if there is already a stage with
+        that name, a number is appended.
+        """
+        names = set(stage.name for stage in self.stages)
+        unique = name
+        i = 2
+
+        while unique in names:
+            unique = '{}-{}'.format(name, i)
+            i += 1
+
+        stats = StageStatistics(unique)
+        self.stages.append(stats)
+
+        return ProfiledCoroutine(coro, stats)
+
+    def reset(self):
+        """Reset the measurements but keep the stages."""
+        for stage in self.stages:
+            stage.reset()
+
+    def report(self):
+        """Return the measurements as a list of dictionaries, see :meth:`StageStatistics.as_dict`.
+        """
+        return [stage.as_dict() for stage in self.stages]
+
+    def dump(self, filename=None):
+        """Return the JSON report and write it into *filename* if it is given."""
+        text = json.dumps({'stages': self.report()}, indent=2, sort_keys=True)
+
+        if filename:
+            with open(filename, 'w') as f:
+                f.write(text)
+
+        return text
+
+    def table(self):
+        """Return a table with the measurements for the session."""
+        from concert.session.utils import get_default_table
+
+        table = get_default_table(['Stage', 'Items', 'Self', 'Downstream', 'Wait', 'Items/s',
+                                   'MB/s'])
+
+        for stage in self.stages:
+            table.add_row([stage.name, stage.num_items,
+                           '{:.3f} s'.format(stage.total - stage.downstream),
+                           '{:.3f} s'.format(stage.downstream),
+                           '{:.3f} s'.format(stage.wait),
+                           '{:.1f}'.format(stage.item_rate.magnitude),
+                           '{:.1f}'.format(stage.byte_rate.magnitude / 2. ** 20)])
+
+        return table
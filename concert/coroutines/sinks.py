@@ -1,3 +1,5 @@
+import os
+from concert.buffers import release, retain
 from .base import coroutine
 
 
@@ -5,7 +7,8 @@ class Result(object):
     """
     The object is callable and when called it becomes a coroutine which accepts
     items and stores them in a variable which allows the user to obtain the
-    last stored item at any time point.
+    last stored item at any time point. Pooled buffers are retained until the
+    next item comes.
     """
     def __init__(self):
         self.result = None
@@ -19,7 +22,10 @@ class Result(object):
         can be recovered later.
         """
         while True:
-            self.result = yield
+            item = yield
+            retain(item)
+            release(self.result)
+            self.result = item
 
 
 @coroutine
@@ -35,6 +41,7 @@ def null():
 
 class Accumulate(object):
     """Accumulate items in a list or a numpy array if *shape* is given, *dtype* is the data type.
+    Pooled buffers in the list are retained until the next accumulation starts.
     """
 
     def __init__(self, shape=None, dtype=None):
@@ -57,10 +64,13 @@ class Accumulate(object):
     def _process(self):
         """Stack data into a list."""
         # Clear results from possible previous execution but keep the list in the same place
+        for item in self.items:
+            release(item)
         del self.items[:]
 
         while True:
             item = yield
+            retain(item)
             self.items.append(item)
 
     @coroutine
@@ -72,3 +82,230 @@ class Accumulate(object):
             item = yield
             self.items[i] = item
             i += 1
+
+
+class RunningStatistics(object):
+
+    """
+    Per-pixel statistics of the incoming images, which are updated in place by Welford's algorithm
+    without allocating memory per image. The accumulators have data type *dtype*, use
+    ``np.float64`` for long series or data with a large offset. If *median* is True, the median
+    is approximated as well, which costs about as much as the other statistics together::
+
+        darks = RunningStatistics()
+        inject(frames(100, camera), darks())
+        dark = darks.mean
+        noise = darks.std
+
+    .. py:attribute:: count
+
+        Number of processed images.
+
+    .. py:attribute:: mean
+
+    .. py:attribute:: minimum
+
+    .. py:attribute:: maximum
+
+    .. py:attribute:: median
+
+        Approximation of the median by stochastic gradient steps, it is None if *median* is
+        False.
+
+    The arrays are None until the first image comes and they are updated in place, a new
+    accumulation (calling the object) resets them.
+    """
+
+    def __init__(self, dtype=None, median=False):
+        import numpy as np
+
+        self.dtype = np.float32 if dtype is None else dtype
+        self.compute_median = median
+        self.count = 0
+        self.mean = self.minimum = self.maximum = self.median = None
+        self._m2 = None
+        self._buffers = None
+
+    @property
+    def variance(self):
+        """Unbiased per-pixel variance."""
+        if self._m2 is None:
+            return None
+
+        return self._m2 / max(self.count - 1, 1)
+
+    @property
+    def std(self):
+        """Per-pixel standard deviation."""
+        import numpy as np
+
+        variance = self.variance
+
+        return None if variance is None else np.sqrt(variance)
+
+    def _allocate(self, shape):
+        import numpy as np
+
+        if self.mean is None or self.mean.shape != shape:
+            self.mean, self.minimum, self.maximum, self._m2, delta, scratch = \
+                [np.empty(shape, dtype=self.dtype) for i in range(6)]
+            self.median = np.empty(shape, dtype=self.dtype) if self.compute_median else None
+            self._buffers = (delta, scratch)
+
+        self.mean.fill(0)
+        self._m2.fill(0)
+
+    def _update(self, item):
+        import numpy as np
+
+        if self.count == 0:
+            self._allocate(item.shape)
+            self.minimum[...] = item
+            self.maximum[...] = item
+            if self.median is not None:
+                self.median[...] = item
+        else:
+            np.minimum(self.minimum, item, out=self.minimum)
+            np.maximum(self.maximum, item, out=self.maximum)
+
+        self.count += 1
+        delta, scratch = self._buffers
+        np.subtract(item, self.mean, out=delta)
+        np.multiply(delta, 1. / self.count, out=scratch)
+        self.mean += scratch
+        np.subtract(item, self.mean, out=scratch)
+        scratch *= delta
+        self._m2 += scratch
+
+        if self.median is not None and self.count > 1:
+            # Robbins-Monro step towards the median, scaled by the current standard deviation
+            np.multiply(self._m2, 1. / (self.count - 1), out=delta)
+            np.sqrt(delta, out=delta)
+            delta *= 1. / self.count
+            np.subtract(item, self.median, out=scratch)
+            np.sign(scratch, out=scratch)
+            scratch *= delta
+            self.median += scratch
+
+    @coroutine
+    def __call__(self):
+        """
+        __call__(self)
+
+        Coroutine interface for processing in a pipeline.
+        """
+        self.count = 0
+
+        while True:
+            item = yield
+            self._update(item)
+
+
+class SinogramWriter(object):
+
+    """
+    Write incoming radiographs as sinograms into a NumPy file *filename* of shape (height,
+    *num_radiographs*, width), which is memory-mapped, so that the sinograms can be bigger than
+    the memory. *dtype* is the data type of the sinograms, the one of the first radiograph if
+    None. The radiographs are collected in blocks of *block_size* which are transposed into the
+    file at once, that way the file is written in contiguous pieces instead of one short row per
+    sinogram and radiograph. If there are more than *num_radiographs* radiographs, the sinograms
+    are rewritten in a ring-buffer fashion like by :func:`~concert.coroutines.filters.sinograms`.
+    The last block is written when the coroutine is closed, call :meth:`.flush` to write it
+    earlier. The writer can be used for more runs, the file is created again if the radiographs
+    of a run, the *num_radiographs* or the *dtype* differ from the previous run. Radiographs of
+    one run must have the same shape. Afterwards, the sinograms can be read by::
+
+        np.load(filename, mmap_mode='r')
+
+    .. py:attribute:: volume
+
+        The memory-mapped sinograms, None before the first radiograph comes.
+    """
+
+    def __init__(self, filename, num_radiographs, dtype=None, block_size=32):
+        if block_size < 1:
+            raise ValueError('Block size must be positive')
+
+        self.filename = filename
+        self.num_radiographs = num_radiographs
+        self.dtype = dtype
+        self.block_size = block_size
+        self.volume = None
+        self._block = None
+        self._num_buffered = 0
+        self._num_written = 0
+
+    def flush(self):
+        """Write the collected radiographs and flush the file."""
+        self._write()
+
+        if self.volume is not None:
+            self.volume.flush()
+
+    def _write(self):
+        """Transpose the collected radiographs into the file."""
+        if not self._num_buffered:
+            return
+
+        block = self._block[:self._num_buffered]
+        self._num_buffered = 0
+        offset = 0
+
+        while offset < len(block):
+            start = (self._num_written + offset) % self.num_radiographs
+            length = min(len(block) - offset, self.num_radiographs - start)
+            part = block[offset:offset + length]
+            # Go through the rows in chunks which fit into the cache
+            step = max(1, 2 ** 20 // max(part[0, 0].nbytes * length, 1))
+            for row in range(0, part.shape[1], step):
+                self.volume[row:row + step, start:start + length] = \
+                    part[:, row:row + step].transpose(1, 0, 2)
+            offset += length
+
+        self._num_written += len(block)
+
+    def _open(self, radiograph):
+        """Create the file for sinograms made of radiographs like *radiograph* unless the current
+        one fits them.
+        """
+        import numpy as np
+
+        dtype = np.dtype(radiograph.dtype if self.dtype is None else self.dtype)
+        shape = (radiograph.shape[0], self.num_radiographs, radiograph.shape[1])
+        if (self.volume is not None and self.volume.shape == shape and
+                self.volume.dtype == dtype and len(self._block) == self.block_size):
+            return
+
+        if self.volume is not None:
+            # Views of the old volume keep mapping the removed file instead of a truncated one
+            self.volume = None
+            os.remove(self.filename)
+        self.volume = np.lib.format.open_memmap(self.filename, mode='w+', dtype=dtype,
+                                                shape=shape)
+        self._block = np.empty((self.block_size,) + radiograph.shape, dtype=dtype)
+
+    @coroutine
+    def __call__(self):
+        """
+        __call__(self)
+
+        Coroutine interface for processing in a pipeline.
+        """
+        self._num_buffered = 0
+        self._num_written = 0
+
+        try:
+            while True:
+                radiograph = yield
+                if not (self._num_buffered or self._num_written):
+                    self._open(radiograph)
+                elif radiograph.shape != self._block.shape[1:]:
+                    raise ValueError('Radiograph shape {} differs from {}'.format(
+                                     radiograph.shape, self._block.shape[1:]))
+                self._block[self._num_buffered] = radiograph
+                self._num_buffered += 1
+                if self._num_buffered == self.block_size:
+                    self._write()
+        except GeneratorExit:
+            self.flush()
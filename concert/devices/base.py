@@ -1,7 +1,9 @@
 import threading
 import logging
-from concert.async import async
+import time
+from concert.async import async, WorkQueue
 from concert.base import Parameterizable
+from concert.quantities import q
 
 
 LOG = logging.getLogger(__name__)
@@ -20,13 +22,26 @@ class Device(Parameterizable):
             ...
 
         # device is unlocked again
+
+    Asynchronous parameter access is serialized by the device's :attr:`work_queue`, a
+    :class:`concert.async.WorkQueue`, so that commands are sent to the hardware one after another
+    while different devices are accessed in parallel.
+
+    .. py:attribute:: blocking
+
+        False if the accessors of the device never block, e.g. because they work only with
+        memory. The queued access is then executed in the event loop if asyncio is enabled (see
+        :class:`concert.async.WorkQueue`).
     """
 
+    blocking = True
+
     def __init__(self):
         # We have to create the lock early on because it will be accessed in
         # any add_parameter calls, especially those in the Parameterizable base
         # class
         self._lock = threading.Lock()
+        self.work_queue = WorkQueue(name=self.__class__.__name__, blocking=self.blocking)
         super(Device, self).__init__()
 
     def __enter__(self):
@@ -46,6 +61,98 @@ class Device(Parameterizable):
         pass
 
 
+class LazyDevice(object):
+
+    """
+    Proxy of a device which is constructed by calling *factory* with *args* and *kwargs* when it
+    is used for the first time. Sessions can declare devices which are rarely used this way in
+    order to start quickly::
+
+        camera = LazyDevice(UcaCamera, 'pco')
+
+        # The camera is constructed here
+        camera.exposure_time = 10 * q.ms
+
+    Until the device is constructed the proxy is not considered a :class:`.Device`, thus e.g.
+    :func:`concert.session.utils.dstate` and :func:`concert.session.utils.abort` skip it.
+    """
+
+    def __init__(self, factory, *args, **kwargs):
+        self.__dict__.update(_factory=factory, _args=args, _kwargs=kwargs, _device=None,
+                             _name=None, _lock=threading.RLock(), construction_time=None)
+
+    @property
+    def __class__(self):
+        device = self.__dict__['_device']
+
+        return LazyDevice if device is None else device.__class__
+
+    @property
+    def constructed(self):
+        """True if the device has been constructed."""
+        return self._device is not None
+
+    @property
+    def device(self):
+        """The device, it is constructed on first access."""
+        with self._lock:
+            if self._device is None:
+                start = time.time()
+                device = self._factory(*self._args, **self._kwargs)
+                self.__dict__['construction_time'] = (time.time() - start) * q.s
+                if self._name is not None and device.name_for_log is None:
+                    device.name_for_log = self._name
+                self.__dict__['_device'] = device
+                LOG.info("Constructed {} in {:.3f~}".format(self._name or self._factory.__name__,
+                                                            self.construction_time))
+
+        return self._device
+
+    @property
+    def name_for_log(self):
+        """Name of the device used in the log messages, it can be set before the device is
+        constructed.
+        """
+        return self._name if self._device is None else self._device.name_for_log
+
+    @name_for_log.setter
+    def name_for_log(self, name):
+        self.__dict__['_name'] = name
+
+        if self._device is not None:
+            self._device.name_for_log = name
+
+    def __getattr__(self, name):
+        return getattr(self.device, name)
+
+    def __setattr__(self, name, value):
+        if name == 'name_for_log':
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.device, name, value)
+
+    def __getitem__(self, param):
+        return self.device[param]
+
+    def __iter__(self):
+        return iter(self.device)
+
+    def __enter__(self):
+        return self.device.__enter__()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self.device.__exit__(exc_type, exc_value, traceback)
+
+    def __str__(self):
+        return str(self.device)
+
+    def __repr__(self):
+        if self._device is None:
+            return '<LazyDevice of {}, not constructed>'.format(self._factory.__name__)
+
+        return repr(self._device)
+
+
 def abort(devices):
     """Abort all actions related with parameters on all *devices*."""
     futures = []
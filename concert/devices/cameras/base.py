@@ -59,10 +59,22 @@ frame. The callable is applied to the frame and the converted one is returned by
     camera.convert = np.fliplr
     # The frame is left-right flipped
     camera.grab()
+
+Frames can be grabbed into reusable buffers of a :class:`concert.buffers.BufferPool` by setting
+:attr:`Camera.buffers`. The caller of :meth:`Camera.grab` then owns the frame and must give it back
+to the pool by :func:`concert.buffers.release` once it is not needed anymore::
+
+    from concert.buffers import BufferPool, release
+
+    camera.buffers = BufferPool((480, 640), np.uint16)
+    frame = camera.grab()
+    process(frame)
+    release(frame)
 """
 import contextlib
 from concert.base import AccessorNotImplementedError, Parameter, Quantity, State, check, identity
 from concert.async import async
+from concert.buffers import is_pooled, release
 from concert.quantities import q
 from concert.helpers import Bunch
 from concert.devices.base import Device
@@ -81,6 +93,11 @@ class Camera(Device):
     .. py:attribute:: frame-rate
 
         Frame rate of acquisition in q.count per time unit.
+
+    .. py:attribute:: buffers
+
+        A :class:`concert.buffers.BufferPool` the frames are grabbed into, None if every frame is
+        a new array.
     """
 
     trigger_sources = Bunch(['AUTO', 'SOFTWARE', 'EXTERNAL'])
@@ -92,6 +109,7 @@ class Camera(Device):
     def __init__(self):
         super(Camera, self).__init__()
         self.convert = identity
+        self.buffers = None
 
     @check(source='standby', target='recording')
     def start_recording(self):
@@ -134,8 +152,28 @@ class Camera(Device):
         self._trigger_real()
 
     def grab(self):
-        """Return a NumPy array with data of the current frame."""
-        return self.convert(self._grab_real())
+        """Return a NumPy array with data of the current frame. If :attr:`buffers` is set, the
+        frame is a pooled buffer (or a view of it) and the caller must release it.
+        """
+        if self.buffers is None:
+            return self.convert(self._grab_real())
+
+        frame = self.buffers.get()
+
+        try:
+            if self._grab_real_into(frame) is None:
+                release(frame)
+                return None
+            converted = self.convert(frame)
+        except BaseException:
+            release(frame)
+            raise
+
+        if not is_pooled(converted):
+            # Conversion created a new array, the buffer is not used anymore
+            release(frame)
+
+        return converted
 
     @async
     def grab_async(self):
@@ -153,7 +191,9 @@ class Camera(Device):
         self.start_recording()
 
         while self.state == 'recording':
-            consumer.send(self.grab())
+            frame = self.grab()
+            consumer.send(frame)
+            release(frame)
 
     def _get_trigger_source(self):
         raise AccessorNotImplementedError
@@ -173,6 +213,20 @@ class Camera(Device):
     def _grab_real(self):
         raise AccessorNotImplementedError
 
+    def _grab_real_into(self, out):
+        """Grab a frame into the array *out* and return it, return None if there is no frame.
+        The default grabs the frame by :meth:`_grab_real` and copies it into *out*, cameras which
+        can fill the array directly should override this.
+        """
+        frame = self._grab_real()
+
+        if frame is None:
+            return None
+
+        out[...] = frame
+
+        return out
+
 
 class BufferedMixin(Device):
 
@@ -6,6 +6,7 @@ import numpy as np
 from concert.quantities import q
 from concert.base import transition, Quantity
 from concert.devices.cameras import base
+from concert.readers import Prefetcher
 from concert.storage import read_image
 
 
@@ -138,10 +139,11 @@ class FileCamera(Base):
     the files inside are read, or it can be a pattern and only the matching files will be read. If
     *reset_on_start* is True the files are read from the beginning when the recording starts.
     *start_index* specifies the index of the first read image (not file index, in case the files are
-    multi-page).
+    multi-page). If *prefetch* is not zero, a :class:`concert.readers.Prefetcher` reads that many
+    files ahead in the background, it is accessible as :attr:`prefetcher`.
     """
 
-    def __init__(self, pattern, reset_on_start=True, start_index=0):
+    def __init__(self, pattern, reset_on_start=True, start_index=0, prefetch=0):
         # Let users change the directory
         self.pattern = pattern
         super(FileCamera, self).__init__()
@@ -150,6 +152,10 @@ class FileCamera(Base):
         self.index = 0
         self._image_index = 0
         self.reset_on_start = reset_on_start
+        self.prefetch = prefetch
+        self.prefetcher = None
+        self._prefetched = None
+        self._prefetch_index = None
         if os.path.isdir(pattern):
             self.filenames = [os.path.join(pattern, file_name) for file_name in
                               sorted(os.listdir(pattern))]
@@ -174,7 +180,10 @@ class FileCamera(Base):
 
     def _read_next_file(self):
         if self.index < len(self.filenames):
-            self._image = read_image(self.filenames[self.index])
+            if self.prefetch:
+                self._image = self._next_prefetched()
+            else:
+                self._image = read_image(self.filenames[self.index])
             self._image_index = 0
             self.index += 1
             if self._image.ndim == 2:
@@ -183,6 +192,21 @@ class FileCamera(Base):
         else:
             self._image = None
 
+    def _next_prefetched(self):
+        if self._prefetch_index != self.index:
+            # Start reading ahead from the current file
+            if self._prefetched is not None:
+                self._prefetched.close()
+            self.prefetcher = Prefetcher(self._read_file, range(self.index, len(self.filenames)),
+                                         num_ahead=self.prefetch)
+            self._prefetched = iter(self.prefetcher)
+        self._prefetch_index = self.index + 1
+
+        return next(self._prefetched)
+
+    def _read_file(self, index):
+        return read_image(self.filenames[index])
+
     def _fastforward(self):
         image_index = self._image.shape[0]
         while image_index <= self._start_index:
@@ -197,14 +221,29 @@ class FileCamera(Base):
         if self._image is None:
             result = None
         else:
-            y_region = self.roi_y0 + self.roi_height
-            x_region = self.roi_x0 + self.roi_width
-            result = self._image[self._image_index,
-                                 self.roi_y0.magnitude:y_region.magnitude,
-                                 self.roi_x0.magnitude:x_region.magnitude]
-            self._image_index += 1
-            if self._image_index == self._image.shape[0]:
-                self._read_next_file()
+            result = self._next_roi()
+
+        return result
+
+    def _grab_real_into(self, out):
+        if self._image is None:
+            return None
+
+        # Copy the region of interest straight from the image into the buffer
+        np.copyto(out, self._next_roi())
+
+        return out
+
+    def _next_roi(self):
+        """Return a view of the region of interest of the current image and advance."""
+        y_0 = int(self.roi_y0.magnitude)
+        x_0 = int(self.roi_x0.magnitude)
+        result = self._image[self._image_index,
+                             y_0:y_0 + int(self.roi_height.magnitude),
+                             x_0:x_0 + int(self.roi_width.magnitude)]
+        self._image_index += 1
+        if self._image_index == self._image.shape[0]:
+            self._read_next_file()
 
         return result
 
@@ -53,6 +53,9 @@ class LinearMotor(base.LinearMotor, _PositionMixin):
 
     """A linear step motor dummy."""
 
+    # State is kept in memory
+    blocking = False
+
     def __init__(self, position=None):
         super(LinearMotor, self).__init__()
         _PositionMixin.__init__(self)
@@ -89,6 +92,9 @@ class RotationMotor(base.RotationMotor, _PositionMixin):
 
     """A rotational step motor dummy."""
 
+    # State is kept in memory
+    blocking = False
+
     def __init__(self):
         super(RotationMotor, self).__init__()
         _PositionMixin.__init__(self)
@@ -2,11 +2,10 @@
 the acquired data, e.g. write images to disk, do tomographic reconstruction etc.
 """
 import logging
-import numpy as np
 from concert.async import threaded
 from concert.coroutines.base import broadcast, coroutine
 from concert.coroutines.filters import queue
-from concert.coroutines.sinks import Accumulate, Result
+from concert.coroutines.sinks import Accumulate, Result, RunningStatistics
 
 
 LOG = logging.getLogger(__name__)
@@ -202,8 +201,9 @@ class OnlineReconstruction(Addon):
 
     @threaded
     def _average_images(self, queue, im_type):
+        statistics = RunningStatistics()
+        accumulate = statistics()
         average = None
-        i = 0
         while True:
             image = queue.get()
             if image is None:
@@ -216,10 +216,8 @@ class OnlineReconstruction(Addon):
                 break
 
             if self.process_normalization:
-                if average is None:
-                    average = np.zeros_like(image, dtype=np.float32)
-                average = (average * i + image) / (i + 1)
-                i += 1
+                accumulate.send(image)
+                average = statistics.mean
             else:
                 average = image
 
@@ -3,10 +3,14 @@ An experiment can be run multiple times. The base :py:class:`.Experiment` takes
 care of proper logging structure.
 """
 
+import collections
 import logging
 import os
+import threading
 import time
-from concert.async import async
+from concert.async import async, threaded
+from concert.buffers import release, retain
+from concert.coroutines.profiling import record_wait
 from concert.progressbar import wrap_iterable
 from concert.base import Parameterizable, Parameter, Selection, State, check
 
@@ -14,6 +18,135 @@ from concert.base import Parameterizable, Parameter, Selection, State, check
 LOG = logging.getLogger(__name__)
 
 
+class ConsumerQueue(object):
+
+    """
+    A bounded queue which feeds a consumer in a separate thread. *consumer* is a callable with no
+    arguments which returns a coroutine, it is called in the thread. *maxsize* is the maximum
+    number of queued items and *policy* specifies what happens if an item is put into a full
+    queue:
+
+    - ``'block'``: wait until the consumer takes an item from the queue
+    - ``'drop-oldest'``: drop the oldest queued item
+    - ``'drop-newest'``: drop the new item
+
+    The queue counts the queued, dropped and consumed items and keeps the maximum depth. If the
+    consumer raises an exception the queue stops and the exception is raised by :meth:`.put` and
+    :meth:`.join`. Pooled buffers (see :mod:`concert.buffers`) are retained while they are queued.
+    """
+
+    POLICIES = ('block', 'drop-oldest', 'drop-newest')
+
+    def __init__(self, consumer, maxsize=16, policy='block'):
+        if policy not in self.POLICIES:
+            raise ValueError("Policy must be one of {}".format(self.POLICIES))
+        if maxsize < 1:
+            raise ValueError('Queue size must be positive')
+
+        self.consumer = consumer
+        self.maxsize = maxsize
+        self.policy = policy
+        self.error = None
+        self.num_queued = 0
+        self.num_dropped = 0
+        self.num_consumed = 0
+        self.max_depth = 0
+        self._items = collections.deque()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._finished = False
+        self._serve()
+
+    def __repr__(self):
+        return ("ConsumerQueue(policy={}, queued={}, dropped={}, consumed={}, "
+                "max_depth={})".format(self.policy, self.num_queued, self.num_dropped,
+                                       self.num_consumed, self.max_depth))
+
+    @property
+    def depth(self):
+        """Current number of queued items."""
+        return len(self._items)
+
+    def put(self, item):
+        """Put *item* into the queue and handle the overflow according to the policy."""
+        with self._condition:
+            if self.policy == 'block':
+                start = time.time()
+                while len(self._items) >= self.maxsize and self.error is None:
+                    self._condition.wait()
+                record_wait(time.time() - start)
+            elif len(self._items) >= self.maxsize:
+                self.num_dropped += 1
+                if self.policy == 'drop-newest':
+                    return
+                release(self._items.popleft())
+
+            if self.error is not None:
+                raise self.error
+
+            retain(item)
+            self._items.append(item)
+            self.num_queued += 1
+            self.max_depth = max(self.max_depth, len(self._items))
+            self._condition.notify_all()
+
+    def close(self, discard=False):
+        """Stop the consumer once the queued items are consumed. If *discard* is True, drop the
+        items which are still queued.
+        """
+        with self._condition:
+            self._closed = True
+            if discard:
+                self._drop_all()
+            self._condition.notify_all()
+
+    def join(self):
+        """Wait until the consumer stops and raise its exception if there was one."""
+        with self._condition:
+            while not self._finished:
+                self._condition.wait()
+
+        if self.error is not None:
+            raise self.error
+
+    def _drop_all(self):
+        self.num_dropped += len(self._items)
+
+        for item in self._items:
+            release(item)
+
+        self._items.clear()
+
+    @threaded
+    def _serve(self):
+        try:
+            consumer = self.consumer()
+
+            while True:
+                with self._condition:
+                    while not self._items and not self._closed:
+                        self._condition.wait()
+                    if not self._items:
+                        break
+                    item = self._items.popleft()
+                    self._condition.notify_all()
+
+                try:
+                    consumer.send(item)
+                finally:
+                    release(item)
+                self.num_consumed += 1
+        except Exception as error:
+            LOG.exception("Consumer {} failed".format(self.consumer))
+            with self._condition:
+                self.error = error
+                self._drop_all()
+        finally:
+            with self._condition:
+                self._finished = True
+                self._condition.notify_all()
+
+
 class Acquisition(object):
 
     """
@@ -32,19 +165,54 @@ class Acquisition(object):
 
         a callable which acquires the data, takes no arguments, can be None.
 
+    .. py:attribute:: fan_out
+
+        if True, every consumer runs in a separate thread and gets the data through its own
+        :class:`.ConsumerQueue` with *queue_size* items and overflow *policy*, which can be
+        changed for particular consumers by :meth:`.set_overflow`. Otherwise the data is sent to
+        the consumers one after another in the producer's thread.
+
+    .. py:attribute:: queues
+
+        the :class:`.ConsumerQueue` objects of the last run in the fan-out mode with the
+        statistics of the dropped and queued items.
+
     """
 
-    def __init__(self, name, producer, consumers=None, acquire=None):
+    def __init__(self, name, producer, consumers=None, acquire=None, fan_out=False,
+                 queue_size=16, policy='block'):
+        if policy not in ConsumerQueue.POLICIES:
+            raise ValueError("Policy must be one of {}".format(ConsumerQueue.POLICIES))
+
         self.name = name
         self.producer = producer
         self.consumers = [] if consumers is None else consumers
         # Don't bother with checking this for None later
         self.acquire = acquire if acquire else lambda: None
+        self.fan_out = fan_out
+        self.queue_size = queue_size
+        self.policy = policy
+        self.queues = []
+        self._overflow = {}
         self._aborted = False
 
+    def set_overflow(self, consumer, queue_size=None, policy=None):
+        """Set the *queue_size* and overflow *policy* of *consumer* in the fan-out mode. None
+        means the acquisition default.
+        """
+        if policy is not None and policy not in ConsumerQueue.POLICIES:
+            raise ValueError("Policy must be one of {}".format(ConsumerQueue.POLICIES))
+
+        self._overflow[consumer] = (queue_size, policy)
+
     def connect(self):
         """Connect producer with consumers."""
         self._aborted = False
+
+        if self.fan_out:
+            self._connect_queues()
+            return
+
         started = []
         for not_started in self.consumers:
             started.append(not_started())
@@ -56,6 +224,29 @@ class Acquisition(object):
             for consumer in started:
                 consumer.send(item)
 
+    def _connect_queues(self):
+        self.queues = []
+
+        for consumer in self.consumers:
+            queue_size, policy = self._overflow.get(consumer, (None, None))
+            self.queues.append(ConsumerQueue(consumer,
+                                             maxsize=queue_size or self.queue_size,
+                                             policy=policy or self.policy))
+
+        try:
+            for item in self.producer():
+                if self._aborted:
+                    LOG.info("Acquisition '%s' aborted", self.name)
+                    break
+                for queue in self.queues:
+                    queue.put(item)
+        finally:
+            for queue in self.queues:
+                queue.close(discard=self._aborted)
+
+        for queue in self.queues:
+            queue.join()
+
     @async
     def abort(self):
         self._aborted = True
@@ -120,12 +120,16 @@ class ImagingFileExperiment(Experiment):
     .. py:attribute:: roi_height
 
         Number of read rows
+
+    .. py:attribute:: prefetch
+
+        Number of files read ahead in the background
     """
 
     def __init__(self, directory, num_darks, num_flats, num_radios, darks_pattern='darks',
                  flats_pattern='flats', radios_pattern='projections', roi_x0=None, roi_width=None,
                  roi_y0=None, roi_height=None, walker=None, separate_scans=True,
-                 name_fmt='scan_{:>04}'):
+                 name_fmt='scan_{:>04}', prefetch=0):
         self.directory = directory
         self.num_darks = num_darks
         self.num_flats = num_flats
@@ -137,13 +141,14 @@ class ImagingFileExperiment(Experiment):
         self.roi_width = roi_width
         self.roi_y0 = roi_y0
         self.roi_height = roi_height
+        self.prefetch = prefetch
         darks = Acquisition('darks', self.take_darks)
         flats = Acquisition('flats', self.take_flats)
         radios = Acquisition('radios', self.take_radios)
         super(ImagingFileExperiment, self).__init__([darks, flats, radios], walker=walker)
 
     def _produce_images(self, pattern, num):
-        camera = FileCamera(os.path.join(self.directory, pattern))
+        camera = FileCamera(os.path.join(self.directory, pattern), prefetch=self.prefetch)
         if self.roi_x0 is not None:
             camera.roi_x0 = self.roi_x0
         if self.roi_width is not None:
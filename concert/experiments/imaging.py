@@ -1,12 +1,14 @@
 """Imaging experiments usually conducted at synchrotrons."""
 import numpy as np
+from concert.buffers import release
 from concert.quantities import q
 
 
 def frames(num_frames, camera, callback=None):
     """
     A generator which takes *num_frames* using *camera*. *callback* is called
-    after every taken frame.
+    after every taken frame. If the camera grabs into a buffer pool, a frame is
+    released when the next one is requested.
     """
     if camera.state == 'recording':
         camera.stop_recording()
@@ -18,7 +20,11 @@ def frames(num_frames, camera, callback=None):
         with camera.recording():
             for i in range(num_frames):
                 camera.trigger()
-                yield camera.grab()
+                frame = camera.grab()
+                try:
+                    yield frame
+                finally:
+                    release(frame)
                 if callback:
                     callback()
     finally:
@@ -6,6 +6,8 @@ sets. It uses NeXpy_ to interface with NeXus.
 
 .. _NeXpy: http://wiki.nexusformat.org/NeXpy
 """
+import time
+import numpy as np
 from logging import StreamHandler
 from concert.storage import Walker, StorageError
 from concert.coroutines.base import coroutine
@@ -20,10 +22,21 @@ class Hdf5Walker(Walker):
 
     """An HDF5 file walker implementation."""
 
-    def __init__(self, hdf5, dsetname='frames', log=None, log_name='log'):
+    def __init__(self, hdf5, dsetname='frames', log=None, log_name='log', chunks=None,
+                 compression=None, compression_opts=None, num_images=None, block_size=16,
+                 flush_interval=None):
         """
         *hdf5* is a writeable h5py.File file. *fname* is the dataset name that the
         sequence is stored in.
+
+        Data sets are stored in chunks of *chunks* shape, one frame per chunk if it is None and
+        chosen by h5py if it is True. *compression* is an h5py filter, e.g. ``'gzip'`` or
+        ``'lzf'``, with options *compression_opts*. If the number of frames is known in advance,
+        set *num_images* and the data sets are allocated at once, otherwise they grow in steps
+        which double their size and are truncated to the number of written frames at the end.
+        Frames are collected and written in blocks of *block_size*. The file is flushed every
+        *flush_interval* seconds and when writing is finished. All frames of a data set must have
+        the shape of the first one.
         """
         log_handler = None
         if log:
@@ -36,6 +49,12 @@ class Hdf5Walker(Walker):
             log_handler = StreamHandler(stream=Hdf5Stream(log_dset))
 
         super(Hdf5Walker, self).__init__(hdf5, dsetname=dsetname, log=log, log_handler=log_handler)
+        self.chunks = chunks
+        self.compression = compression
+        self.compression_opts = compression_opts
+        self.num_images = num_images
+        self.block_size = block_size
+        self.flush_interval = flush_interval
 
     def _descend(self, name):
         if self.exists(name):
@@ -53,25 +72,55 @@ class Hdf5Walker(Walker):
     @coroutine
     def _write_coroutine(self, dsetname=None):
         """Write frames to data set *dsetname*."""
-        data = yield
-        shape = (1, ) + data.shape
-        maxshape = (None, ) + data.shape
         dsetname = dsetname or self.dsetname
 
         if dsetname in self._current:
             raise StorageError("`{}' is not empty".format(self._current.name + '/' + dsetname))
 
-        dset = self._current.create_dataset(dsetname, shape, maxshape=maxshape, dtype=data.dtype)
-
-        dset[0, :, :] = data[:, :]
-        i = 1
-
-        while True:
-            data = yield
-            shape = (i + 1, ) + shape[1:]
-            dset.resize(shape)
-            dset[i, :, :] = data[:, :]
-            i += 1
+        data = yield
+        chunks = (1,) + data.shape if self.chunks is None else self.chunks
+        size = max(self.num_images or self.block_size, 1)
+        dset = self._current.create_dataset(dsetname, (size,) + data.shape,
+                                            maxshape=(None,) + data.shape, dtype=data.dtype,
+                                            chunks=chunks, compression=self.compression,
+                                            compression_opts=self.compression_opts)
+        block = np.empty((max(self.block_size, 1),) + data.shape, dtype=data.dtype)
+        num_buffered = 0
+        written = 0
+        last_flush = time.time()
+
+        try:
+            while True:
+                if data.shape != block.shape[1:]:
+                    raise ValueError('Frame shape {} differs from {}'.format(data.shape,
+                                                                             block.shape[1:]))
+                block[num_buffered] = data
+                num_buffered += 1
+
+                if num_buffered == len(block):
+                    if written + num_buffered > size:
+                        size = max(2 * size, written + num_buffered)
+                        dset.resize(size, axis=0)
+                    dset[written:written + num_buffered] = block
+                    written += num_buffered
+                    num_buffered = 0
+
+                    if (self.flush_interval is not None and
+                            time.time() - last_flush >= self.flush_interval):
+                        dset.file.flush()
+                        last_flush = time.time()
+
+                data = yield
+        finally:
+            # Keep the frames written so far
+            if written + num_buffered > size:
+                dset.resize(written + num_buffered, axis=0)
+            if num_buffered:
+                dset[written:written + num_buffered] = block[:num_buffered]
+                written += num_buffered
+            if written != dset.shape[0]:
+                dset.resize(written, axis=0)
+            dset.file.flush()
 
 
 class Hdf5Stream(object):
@@ -30,3 +30,17 @@ class EnableGevent(nose.plugins.Plugin):
     def configure(self, options, conf):
         concert.config.ENABLE_GEVENT = options.enable_gevent
         super(EnableGevent, self).configure(options, conf)
+
+
+class EnableAsyncio(nose.plugins.Plugin):
+    name = 'enable_asyncio'
+
+    def options(self, parser, env=os.environ):
+        parser.add_option('--enable-asyncio', action='store_true',
+                          default=False, dest='enable_asyncio',
+                          help="Enable asyncio.")
+        super(EnableAsyncio, self).options(parser, env=env)
+
+    def configure(self, options, conf):
+        concert.config.ENABLE_ASYNCIO = options.enable_asyncio
+        super(EnableAsyncio, self).configure(options, conf)
@@ -3,10 +3,10 @@ Image processing module for manipulating image data, e.g. filtered
 backprojection, flat field correction and other operations on images.
 """
 
+import collections
 import numpy as np
 import logging
-from scipy import ndimage
-from scipy.signal import fftconvolve
+import threading
 from concert.quantities import q
 
 
@@ -35,6 +35,170 @@ def ramp_filter(width):
     return np.fft.fftshift(np.abs(base)) * 2.0 / width
 
 
+# Geometry -> (backprojection tables, their size in bytes) in the order of use, see Backprojector
+_BACKPROJECTION_TABLES = collections.OrderedDict()
+_BACKPROJECTION_TABLES_LOCK = threading.Lock()
+
+# Maximum size of the cached backprojection tables of all geometries in bytes
+BACKPROJECTION_CACHE_SIZE = 2 ** 28
+
+
+def _nbytes(tables):
+    """Return the size of the arrays in backprojection *tables* in bytes."""
+    arrays = [value for value in tables.values() if isinstance(value, np.ndarray)]
+
+    return sum(array.nbytes for array in arrays + (tables['blocks'] or []))
+
+
+class Backprojector(object):
+
+    """
+    Filtered backprojection of parallel beam sinograms with *num_projections* rows of *width*
+    pixels acquired over 180 degrees with the rotation axis at *center*. The slice size is 2 *
+    min(*center*, *width* - *center*) and the region outside of the inscribed circle is zero.
+
+    The projections are linearly interpolated to a grid which is *oversampling* times finer
+    than the pixels, so that every slice pixel needs only one look-up per angle. The angles are
+    backprojected in blocks of *block_size* (chosen by the slice size if None) and the
+    computation is done in *dtype*. The sine and cosine tables and, if they are smaller than
+    :data:`BACKPROJECTION_CACHE_SIZE`, the look-up indices are computed once per geometry and
+    shared by all backprojectors. The tables of the least recently used geometries are dropped
+    when they all take more than :data:`BACKPROJECTION_CACHE_SIZE` bytes. :meth:`reconstruct`
+    reconstructs more slices at once in *num_threads* threads (as many as there are CPUs if None),
+    they are stopped by :meth:`close`.
+    """
+
+    def __init__(self, num_projections, width, center, block_size=None, dtype=np.float32,
+                 num_threads=None, oversampling=8):
+        if not 0 < center < width:
+            raise ValueError('Center {} must be less than sinogram width {}'.format(center, width))
+
+        self.num_projections = num_projections
+        self.width = width
+        self.center = center
+        self.dtype = np.dtype(dtype)
+        self.oversampling = oversampling
+        self.half = int(min(center, width - center))
+        self.size = 2 * self.half
+        if block_size is None:
+            # Keep the temporary arrays small enough for the cache
+            block_size = max(1, 2 ** 18 // self.size ** 2)
+        self.block_size = block_size
+        self.num_threads = num_threads
+        self.ramp = ramp_filter(width)[:width // 2 + 1]
+        self._pool = None
+        self._tables = self._get_tables()
+
+    def _get_tables(self):
+        key = (self.num_projections, self.width, self.center, self.block_size, self.dtype.str,
+               self.oversampling)
+
+        with _BACKPROJECTION_TABLES_LOCK:
+            if key in _BACKPROJECTION_TABLES:
+                # Mark as the most recently used
+                tables, nbytes = _BACKPROJECTION_TABLES.pop(key)
+                _BACKPROJECTION_TABLES[key] = (tables, nbytes)
+                return tables
+
+        angles = np.arange(self.num_projections) * np.pi / self.num_projections
+        coordinates = np.arange(-self.half, self.half).astype(self.dtype)
+        mask = coordinates[:, np.newaxis] ** 2 + coordinates ** 2 < self.half ** 2
+        # Left neighbours and weights of the oversampled grid points
+        grid = np.arange(self.width * self.oversampling) / float(self.oversampling)
+        left = np.clip(grid.astype(np.intp), 0, self.width - 2)
+        tables = {'sin': np.sin(angles).astype(self.dtype),
+                  'cos': np.cos(angles).astype(self.dtype),
+                  'coordinates': coordinates, 'mask': mask, 'left': left,
+                  'weights': (grid - left).astype(self.dtype), 'blocks': None}
+
+        if self.num_projections * self.size ** 2 * 8 <= BACKPROJECTION_CACHE_SIZE:
+            tables['blocks'] = [self._indices(tables, start) for start in
+                                range(0, self.num_projections, self.block_size)]
+        nbytes = _nbytes(tables)
+
+        with _BACKPROJECTION_TABLES_LOCK:
+            _BACKPROJECTION_TABLES.pop(key, None)
+            total = sum(size for (cached, size) in _BACKPROJECTION_TABLES.values())
+            while _BACKPROJECTION_TABLES and total + nbytes > BACKPROJECTION_CACHE_SIZE:
+                total -= _BACKPROJECTION_TABLES.popitem(last=False)[1][1]
+            if nbytes <= BACKPROJECTION_CACHE_SIZE:
+                _BACKPROJECTION_TABLES[key] = (tables, nbytes)
+
+        return tables
+
+    def _indices(self, tables, start):
+        """Return the indices into the oversampled projections of the block of angles starting
+        at *start* from the geometry *tables*.
+        """
+        stop = min(start + self.block_size, self.num_projections)
+        factor = self.dtype.type(self.oversampling)
+        coordinates = tables['coordinates'] * factor
+        # The positions are separable, x only contributes along rows and y along columns, 0.5
+        # makes the truncation round
+        rows = tables['cos'][start:stop, np.newaxis] * coordinates + \
+            self.dtype.type(self.center * self.oversampling + 0.5)
+        columns = tables['sin'][start:stop, np.newaxis] * coordinates
+        positions = rows[:, :, np.newaxis] + columns[:, np.newaxis, :]
+        indices = positions.astype(np.intp)
+        # Outside of the inscribed circle the positions may be out of the sinogram, the slice is
+        # masked there in the end
+        np.clip(indices, 0, self.width * self.oversampling - 1, out=indices)
+        if stop - start > 1:
+            offsets = np.arange(stop - start) * self.width * self.oversampling
+            indices += offsets[:, np.newaxis, np.newaxis]
+
+        return indices
+
+    def _oversample(self, sinogram):
+        """Linearly interpolate the rows of *sinogram* to the oversampled grid."""
+        left = self._tables['left']
+        result = sinogram[:, left + 1] - sinogram[:, left]
+        result *= self._tables['weights']
+        result += sinogram[:, left]
+
+        return result
+
+    def filter(self, sinogram):
+        """High-pass filter the rows of *sinogram*."""
+        filtered = np.fft.irfft(np.fft.rfft(sinogram) * self.ramp, n=self.width)
+
+        return filtered.astype(self.dtype, copy=False)
+
+    def backproject(self, sinogram):
+        """Backproject filtered *sinogram* and return the slice."""
+        sinogram = self._oversample(np.asarray(sinogram, dtype=self.dtype))
+        result = np.zeros((self.size, self.size), dtype=self.dtype)
+        blocks = self._tables['blocks']
+
+        for i, start in enumerate(range(0, self.num_projections, self.block_size)):
+            indices = blocks[i] if blocks else self._indices(self._tables, start)
+            values = sinogram[start:start + self.block_size].ravel().take(indices)
+            result += values.sum(axis=0) if len(values) > 1 else values[0]
+
+        result[~self._tables['mask']] = 0
+
+        return result
+
+    def __call__(self, sinogram):
+        """Filter and backproject *sinogram*."""
+        return self.backproject(self.filter(sinogram))
+
+    def reconstruct(self, sinograms):
+        """Reconstruct the slices from a stack of *sinograms* in parallel."""
+        if self._pool is None:
+            from multiprocessing.pool import ThreadPool
+            self._pool = ThreadPool(processes=self.num_threads)
+
+        return np.array(self._pool.map(self, sinograms))
+
+    def close(self):
+        """Stop the threads of :meth:`reconstruct`."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+
 def needle_tips(images):
     """Get sample tips from images."""
     tips = []
@@ -59,6 +223,8 @@ def _segment(image):
     the sample. The sample must be highly absorbing. The baseline
     for the background is taken from the top row of the image.
     """
+    from scipy import ndimage
+
     thr = 0.5
     image[image < thr] = 0
     image[image >= thr] = 1
@@ -148,6 +314,8 @@ def _get_axis_intersection(p_1, p_2, shape):
 
 def _get_sample_tip(image):
     """Extract sample tip from the labeled *image*."""
+    from scipy import ndimage
+
     # First check if the sample tip is in the FOV. If not, there are no
     # objects or the sample splits the image in half.
     if ndimage.label(image.max() - image)[1] != 1:
@@ -232,6 +400,8 @@ def _get_ellipse_point(image):
 
 def _get_biggest_region(image):
     """Get the region with the biggest area in the *image*."""
+    from scipy import ndimage
+
     labels, features = ndimage.label(image)
     sizes = ndimage.sum(image, labels, range(features + 1))
     max_feature = np.argmax(sizes)
@@ -256,6 +426,8 @@ def _get_boundary_regions(labels):
 
 def _get_regions(image):
     """Extract regions from the binary *image* which are not too small."""
+    from scipy import ndimage
+
     labels, features = ndimage.label(image)
     sizes = ndimage.sum(image, labels, range(features + 1))
 
@@ -299,6 +471,8 @@ def compute_rotation_axis(first_projection, last_projection):
     *first_projection* is the projection at 0 deg, *last_projection* is the projection
     at 180 deg.
     """
+    from scipy.signal import fftconvolve
+
     width = first_projection.shape[1]
     first_projection = first_projection - first_projection.mean()
     last_projection = last_projection - last_projection.mean()
@@ -1,7 +1,6 @@
 from itertools import product
 import numpy as np
 import logging
-from scipy.ndimage.filters import gaussian_filter
 from concert.async import async, wait
 from concert.quantities import q
 from concert.measures import rotation_axis
@@ -364,6 +363,7 @@ def find_beam(cam, xmotor, zmotor, pixelsize, xborder, zborder,
     *pixelsize*.
     Optional argument *thres* will be past to beam_visible().
     """
+    from scipy.ndimage.filters import gaussian_filter
 
     def beam_visible(img, thres):
         """
@@ -539,6 +539,8 @@ def drift_to_beam(cam, xmotor, zmotor, pixelsize, tolerance=5,
     *pixelsize* (scalar or 2-element array-like, e.g. [4*q.um, 5*q.um]) is
     needed.
     """
+    from scipy.ndimage.filters import gaussian_filter
+
     def take_frame():
         cam.trigger()
         return gaussian_filter(cam.grab().astype(np.float32), 40.0)
@@ -1,25 +1,59 @@
 """Image readers for convenient work with multi-page image sequences."""
+try:
+    import Queue as queue_module
+except ImportError:
+    import queue as queue_module
+import bisect
+import collections
 import glob
+import json
+import logging
 import os
+import sys
+import threading
+import time
+import numpy as np
+
+
+LOG = logging.getLogger(__name__)
+
+if sys.version_info[0] < 3:
+    exec("def _reraise(exc_type, exc_value, exc_traceback):\n"
+         "    raise exc_type, exc_value, exc_traceback\n")
+else:
+    def _reraise(exc_type, exc_value, exc_traceback):
+        raise exc_value.with_traceback(exc_traceback)
 
 
 class FileSequenceReader(object):
 
-    """Image sequence reader optimized for reading consecutive images. One multi-page image file is
-    not closed after an image is read so that it does not have to be re-opened for reading the next
-    image. The :func:`.close` function must be called explicitly in order to close the last opened
-    image.
+    """Image sequence reader optimized for random access. The reader keeps an index of the first
+    image of every file, so that an image is found by a binary search, and up to *max_open* files
+    open, the least recently used one is closed when another one is opened. The :func:`.close`
+    function must be called explicitly in order to close the open files.
+
+    The index is built as far as the files are read, finding out the number of images requires
+    to open every file. If *index_file* is given, the number of images of every file is stored
+    there as JSON on :meth:`.close` and used next time for files which have not changed since.
     """
 
-    def __init__(self, file_prefix, ext=''):
+    def __init__(self, file_prefix, ext='', max_open=16, index_file=None):
         if os.path.isdir(file_prefix):
             file_prefix = os.path.join(file_prefix, '*' + ext)
         self._filenames = sorted(glob.glob(file_prefix))
         if not self._filenames:
             raise SequenceReaderError("No files matching `{}' found".format(file_prefix))
-        self._lengths = {}
+        if max_open < 1:
+            raise ValueError('At least one file must be open')
+        self.max_open = max_open
+        self.index_file = index_file
+        # Index of the first image of a file and after the last one
+        self._offsets = [0]
+        self._handles = collections.OrderedDict()
         self._file = None
         self._filename = None
+        self._cached = self._load_index()
+        self._index_changed = False
 
     def __enter__(self):
         return self
@@ -29,48 +63,123 @@ class FileSequenceReader(object):
 
     @property
     def num_images(self):
-        num = 0
-        for filename in self._filenames:
-            num += self._get_num_images_in_file(filename)
+        self._build_index(len(self._filenames))
 
-        return num
+        return self._offsets[-1]
 
     def read(self, index):
         if index < 0:
             # Enables negative indexing
             index += self.num_images
-        file_index = 0
-        while index >= 0:
-            if file_index >= len(self._filenames):
+        if index < 0:
+            raise SequenceReaderError('image index out of range')
+
+        while index >= self._offsets[-1]:
+            if len(self._offsets) > len(self._filenames):
                 raise SequenceReaderError('image index greater than sequence length')
-            index -= self._get_num_images_in_file(self._filenames[file_index])
-            file_index += 1
+            self._build_index(len(self._offsets))
 
-        file_index -= 1
-        index += self._lengths[self._filenames[file_index]]
+        file_index = bisect.bisect_right(self._offsets, index) - 1
         self._open(self._filenames[file_index])
 
-        return self._read_real(index)
+        return self._read_real(index - self._offsets[file_index])
+
+    def read_range(self, start=0, stop=None, step=1):
+        """Read images from *start* to *stop* by *step* like a slice and return them stacked in one
+        array.
+        """
+        indices = range(*slice(start, stop, step).indices(self.num_images))
+        if not len(indices):
+            raise SequenceReaderError('Empty range')
+
+        first = self.read(indices[0])
+        result = np.empty((len(indices),) + first.shape, dtype=first.dtype)
+        result[0] = first
+        for i, index in enumerate(indices[1:]):
+            result[i + 1] = self.read(index)
+
+        return result
+
+    def prefetch(self, start=0, stop=None, step=1, num_ahead=8):
+        """Return a :class:`Prefetcher` which reads the images from *start* to *stop* by *step*
+        up to *num_ahead* images ahead. Do not use the reader otherwise until the iteration is
+        finished.
+        """
+        return Prefetcher(self.read, range(*slice(start, stop, step).indices(self.num_images)),
+                          num_ahead=num_ahead)
+
+    def _build_index(self, num_files):
+        """Extend the index to the first *num_files* files."""
+        for filename in self._filenames[len(self._offsets) - 1:num_files]:
+            self._offsets.append(self._offsets[-1] + self._get_num_images_in_file(filename))
 
     def _open(self, filename):
         if self._filename != filename:
-            if self._filename:
-                self.close()
-            self._file = self._open_real(filename)
+            handle = self._handles.pop(filename, None)
+            if handle is None:
+                handle = self._open_real(filename)
+            # The most recently used file is the last one
+            self._handles[filename] = handle
+            self._file = handle
             self._filename = filename
 
-    def close(self):
-        if self._filename:
+            while len(self._handles) > self.max_open:
+                self._close_handle(self._handles.popitem(last=False)[1])
+
+    def _close_handle(self, handle):
+        current = self._file
+        self._file = handle
+        try:
             self._close_real()
-            self._file = None
-            self._filename = None
+        finally:
+            self._file = current
+
+    def close(self):
+        while self._handles:
+            self._close_handle(self._handles.popitem()[1])
+        self._file = None
+        self._filename = None
+        self._save_index()
 
     def _get_num_images_in_file(self, filename):
-        if filename not in self._lengths:
-            self._open(filename)
-            self._lengths[filename] = self._get_num_images_in_file_real()
+        stat = os.stat(filename)
+        key = self._index_key(filename)
+        cached = self._cached.get(key)
+
+        if cached and cached[:2] == [stat.st_size, stat.st_mtime]:
+            return cached[2]
+
+        self._open(filename)
+        num = self._get_num_images_in_file_real()
+        self._cached[key] = [stat.st_size, stat.st_mtime, num]
+        self._index_changed = True
+
+        return num
+
+    def _index_key(self, filename):
+        if self.index_file:
+            filename = os.path.relpath(filename, os.path.dirname(os.path.abspath(self.index_file)))
+
+        return filename
 
-        return self._lengths[filename]
+    def _load_index(self):
+        if self.index_file and os.path.exists(self.index_file):
+            try:
+                with open(self.index_file) as f:
+                    return json.load(f)
+            except ValueError:
+                LOG.warn("Ignoring invalid index file `{}'".format(self.index_file))
+
+        return {}
+
+    def _save_index(self):
+        if self.index_file and self._index_changed:
+            # Write a new file first, so that readers never see an incomplete index
+            tmp_name = self.index_file + '.tmp'
+            with open(tmp_name, 'w') as f:
+                json.dump(self._cached, f)
+            os.rename(tmp_name, self.index_file)
+            self._index_changed = False
 
     def _open_real(self, filename):
         """Returns an open file."""
@@ -87,8 +196,16 @@ class FileSequenceReader(object):
 
 
 class TiffSequenceReader(FileSequenceReader):
-    def __init__(self, file_prefix, ext='.tif'):
-        super(TiffSequenceReader, self).__init__(file_prefix, ext=ext)
+
+    """Reader of TIFF files. If *memmap* is True, images which are stored uncompressed and
+    contiguously are returned as read-only memory-mapped views instead of being copied into
+    memory, other images are read as usual.
+    """
+
+    def __init__(self, file_prefix, ext='.tif', max_open=16, index_file=None, memmap=False):
+        super(TiffSequenceReader, self).__init__(file_prefix, ext=ext, max_open=max_open,
+                                                 index_file=index_file)
+        self.memmap = memmap
 
     def _open_real(self, filename):
         import tifffile
@@ -101,7 +218,141 @@ class TiffSequenceReader(FileSequenceReader):
         return len(self._file.pages)
 
     def _read_real(self, index):
-        return self._file.pages[index].asarray()
+        page = self._file.pages[index]
+        if self.memmap and page.is_memmappable:
+            return page.asarray(out='memmap')
+
+        return page.asarray()
+
+
+class RawSequenceReader(FileSequenceReader):
+
+    """Reader of files written by :class:`.writers.RawWriter`. The files are memory-mapped, so that
+    :meth:`.read` returns a read-only view of an image without copying it. The number of images is
+    taken from the header, which the writer updates while it writes, so that images are not read
+    from the unwritten rest of a preallocated file.
+    """
+
+    def __init__(self, file_prefix, ext='.npy', max_open=16, index_file=None):
+        super(RawSequenceReader, self).__init__(file_prefix, ext=ext, max_open=max_open,
+                                                index_file=index_file)
+
+    def _open_real(self, filename):
+        with open(filename, 'rb') as f:
+            try:
+                if np.lib.format.read_magic(f) != (1, 0):
+                    raise ValueError
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            except ValueError:
+                raise SequenceReaderError("`{}' is not a raw file".format(filename))
+            offset = f.tell()
+
+        num_images = shape[0]
+        if not num_images:
+            return np.empty((0,) + shape[1:], dtype=dtype)
+
+        return np.memmap(filename, dtype=dtype, mode='r', offset=offset,
+                         shape=(num_images,) + shape[1:], order='F' if fortran_order else 'C')
+
+    def _close_real(self):
+        # Images returned by read() are views, so the map is closed when all of them are gone
+        pass
+
+    def _get_num_images_in_file_real(self):
+        return len(self._file)
+
+    def _read_real(self, index):
+        return self._file[index]
+
+
+class Prefetcher(object):
+
+    """
+    Iterate over the images returned by *read* for all *indices*, while a background thread reads
+    up to *num_ahead* images ahead. *read* is a callable which takes an index, e.g.
+    :meth:`FileSequenceReader.read`. Memory-mapped images are copied by the background thread,
+    so that it is the one which waits for the disk::
+
+        reader = TiffSequenceReader('/data/radios', memmap=True)
+        prefetcher = reader.prefetch(num_ahead=16)
+        for image in prefetcher:
+            process(image)
+        print(prefetcher.throughput)
+
+    An exception raised by *read* is raised by the iteration with its original traceback.
+    """
+
+    def __init__(self, read, indices, num_ahead=8):
+        if num_ahead < 1:
+            raise ValueError('Number of prefetched images must be positive')
+
+        self.read = read
+        self.indices = indices
+        self.num_ahead = num_ahead
+        self.num_images = 0
+        self.num_bytes = 0
+        self.read_time = 0.0
+
+    def __repr__(self):
+        return "Prefetcher(images={}, bytes={}, throughput={:.1f} MB/s)".format(
+            self.num_images, self.num_bytes, self.throughput)
+
+    @property
+    def throughput(self):
+        """Read bandwidth in MB/s, i.e. the read bytes divided by the time spent in *read* and in
+        copying memory-mapped images. The time the consumer needs is not counted.
+        """
+        return self.num_bytes / 2. ** 20 / self.read_time if self.read_time else 0.0
+
+    def __iter__(self):
+        items = queue_module.Queue(maxsize=self.num_ahead)
+        stop = threading.Event()
+        thread = threading.Thread(target=self._work, args=(items, stop))
+        thread.daemon = True
+        thread.start()
+
+        try:
+            while True:
+                kind, item = items.get()
+                if kind == 'end':
+                    break
+                if kind == 'error':
+                    _reraise(*item)
+                yield item
+        finally:
+            # Let the thread finish if the iteration is stopped early
+            stop.set()
+            thread.join()
+
+    def _work(self, items, stop):
+        self.num_images = 0
+        self.num_bytes = 0
+        self.read_time = 0.0
+
+        try:
+            for index in self.indices:
+                start = time.time()
+                image = self.read(index)
+                if isinstance(image, np.memmap):
+                    image = np.array(image)
+                self.read_time += time.time() - start
+                self.num_images += 1
+                self.num_bytes += image.nbytes
+                if not self._put(items, ('image', image), stop):
+                    return
+            self._put(items, ('end', None), stop)
+        except Exception:
+            self._put(items, ('error', sys.exc_info()), stop)
+
+    def _put(self, items, item, stop):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue_module.Full:
+                pass
+
+        return False
 
 
 class SequenceReaderError(Exception):
@@ -2,10 +2,18 @@
 
 A session is an ordinary Python module that is stored in a per-user
 directory."""
+import __future__
+import ast
+import hashlib
+import logging
+import marshal
 import os
 import sys
 import imp
 import shutil
+import time
+
+LOG = logging.getLogger(__name__)
 
 _CACHED_PATH = None
 
@@ -88,11 +96,13 @@ def remove(session):
     """Remove a *session*."""
     if exists(session):
         os.unlink(path(session))
+        _remove_cache(path(session))
 
 
 def move(source, target):
     """Move *source* to *target*."""
     os.rename(path(source), path(target))
+    _remove_cache(path(source))
 
 
 def copy(source, target):
@@ -100,12 +110,127 @@ def copy(source, target):
     shutil.copy(path(source), path(target))
 
 
+def cache_path(filename):
+    """Get absolute path of the compiled code cache of the session in *filename*."""
+    digest = hashlib.md5(os.path.abspath(filename).encode('utf-8')).hexdigest()
+
+    return os.path.join(path(), 'cache', digest)
+
+
+def _remove_cache(filename):
+    """Remove the compiled code cache of the session in *filename*."""
+    try:
+        os.unlink(cache_path(filename))
+    except OSError:
+        pass
+
+
+def _compile(filename):
+    """Compile the module in *filename* to a list of code objects, one per top-level statement.
+    The code is cached and compiled again only if the source changes.
+    """
+    cached = cache_path(filename)
+
+    with open(filename) as source_file:
+        stat = os.fstat(source_file.fileno())
+        key = (imp.get_magic(), stat.st_mtime, stat.st_size)
+
+        try:
+            with open(cached, 'rb') as cache_file:
+                cached_key, codes = marshal.load(cache_file)
+                if tuple(cached_key) == key:
+                    return codes
+        except (IOError, OSError, EOFError, ValueError, TypeError):
+            pass
+
+        tree = ast.parse(source_file.read(), filename)
+
+    codes = []
+    flags = 0
+
+    for i, node in enumerate(tree.body):
+        if i > 0 and isinstance(node, ast.Expr) and isinstance(node.value, ast.Str):
+            # A string statement has no effect but it would become the docstring
+            continue
+
+        if isinstance(node, ast.ImportFrom) and node.module == '__future__':
+            for alias in node.names:
+                flags |= getattr(__future__, alias.name).compiler_flag
+
+        statement = ast.Module(body=[node])
+        statement.type_ignores = []
+        codes.append(compile(statement, filename, 'exec', flags, True))
+
+    try:
+        if not os.path.exists(os.path.dirname(cached)):
+            os.makedirs(os.path.dirname(cached))
+
+        with open(cached + '.tmp', 'wb') as cache_file:
+            marshal.dump((key, codes), cache_file)
+
+        os.rename(cached + '.tmp', cached)
+    except (IOError, OSError) as error:
+        LOG.debug("Cannot cache compiled session: {}".format(error))
+
+    return codes
+
+
+def _execute(codes, namespace):
+    """Execute *codes* in *namespace* and return a list of tuples (names, duration), where *names*
+    are the variable names of devices created by one statement and *duration* the time it took.
+    """
+    from concert.devices.base import Device
+    from concert.quantities import q
+
+    missing = object()
+    times = []
+
+    for code in codes:
+        before = dict(namespace)
+        start = time.time()
+        exec(code, namespace)
+        duration = (time.time() - start) * q.s
+        names = sorted(name for (name, value) in namespace.items()
+                       if isinstance(value, Device) and before.get(name, missing) is not value)
+
+        if names:
+            times.append((', '.join(names), duration))
+
+    return times
+
+
 def load(session, from_file=False):
-    """Load *session* and return the module."""
+    """Load *session* and return the module. The devices found in the module are named for logging
+    by their variable names.
+
+    The compiled session is cached. The time it took to construct the devices is logged and stored
+    in the ``_device_times`` module attribute as a list of (names, duration) tuples. Devices
+    declared by :class:`concert.devices.base.LazyDevice` are constructed on first use.
+    """
+    from concert.base import register_names
+
     if not from_file:
-        return imp.load_source(session, path(session))
+        name, filename = session, path(session)
+    else:
+        name, filename = 'somename', os.path.abspath(session)
+
+    module = imp.new_module(name)
+    module.__file__ = filename
+    sys.modules[name] = module
+
+    try:
+        module._device_times = _execute(_compile(filename), vars(module))
+    except BaseException:
+        # Do not leave a half-loaded module behind, not even on KeyboardInterrupt
+        del sys.modules[name]
+        raise
+
+    for (names, duration) in module._device_times:
+        LOG.info("Constructed {} in {:.3f~}".format(names, duration))
+
+    register_names(vars(module))
 
-    return imp.load_source('somename', os.path.abspath(session))
+    return module
 
 
 def get_existing():
@@ -35,8 +35,8 @@ def _get_param_value_table(device):
     table.border = False
     table.header = False
 
-    for param in device:
-        table.add_row([param.name, str(param.get().result())])
+    for name, value in sorted(device.get_many().result().items()):
+        table.add_row([name, str(value)])
 
     if hasattr(device, 'state'):
         table.add_row(['state', device.state])
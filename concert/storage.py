@@ -1,8 +1,16 @@
 """Storage implementations."""
+try:
+    import Queue as queue_module
+except ImportError:
+    import queue as queue_module
 import os
 import logging
-import tifffile
+import pkgutil
+import threading
+import time
+from copy import deepcopy
 from logging import FileHandler, Formatter
+from concert.buffers import release, retain
 from concert.coroutines.base import coroutine, inject
 from concert.writers import TiffWriter
 
@@ -24,6 +32,8 @@ def read_image(filename):
 
 def read_tiff(file_name):
     """Read tiff file from disk by :py:mod:`tifffile` module."""
+    import tifffile
+
     with tifffile.TiffFile(file_name) as f:
         return f.asarray(out='memmap')
 
@@ -31,18 +41,20 @@ def read_tiff(file_name):
 READERS = {".tif": read_tiff,
            ".tiff": read_tiff}
 
-try:
+
+def read_edf_via_fabio(filename):
+    """Read EDF file from disk by :py:mod:`fabio` module."""
     import fabio
 
-    def read_edf_via_fabio(filename):
-        edf = fabio.edfimage.edfimage()
-        edf.read(filename)
-        return edf.data
+    edf = fabio.edfimage.edfimage()
+    edf.read(filename)
+    return edf.data
+
 
+# Register the reader without importing fabio which takes long
+if pkgutil.find_loader('fabio') is not None:
     for ext in ('.edf', '.edf.gz'):
         READERS[ext] = read_edf_via_fabio
-except ImportError:
-    pass
 
 
 def write_tiff(file_name, data):
@@ -50,6 +62,8 @@ def write_tiff(file_name, data):
     The default TIFF writer which uses :py:mod:`tifffile` module.
     Return the written file name.
     """
+    import tifffile
+
     tifffile.imsave(file_name, data)
 
     return file_name
@@ -76,26 +90,29 @@ def create_directory(directory, rights=0o0750):
 
 
 @coroutine
-def write_images(writer=TiffWriter, prefix="image_{:>05}.tif", start_index=0, bytes_per_file=0):
+def write_images(writer=TiffWriter, prefix="image_{:>05}.tif", start_index=0, bytes_per_file=0,
+                 compression=None):
     """
-    write_images(writer=TiffWriter, prefix="image_{:>05}.tif", start_index=0, bytes_per_file=0)
+    write_images(writer=TiffWriter, prefix="image_{:>05}.tif", start_index=0, bytes_per_file=0,
+                 compression=None)
 
     Write images on disk with specified *writer* and file name *prefix*. Write to one file until the
     *bytes_per_file* bytes has been written. If it is 0, then one file per image is created.
     *writer* is a subclass of :class:`.writers.ImageWriter`. *start_index* specifies the number in
     the first file name, e.g. for the default *prefix* and *start_index* 100, the first file name
     will be image_00100.tif. If *prefix* is not formattable images are appended to the filename
-    specified by *prefix*. Make sure you call close() on this coroutine to make sure GeneratorExit
-    is called and files are closed.
+    specified by *prefix*. *compression* is passed to the *writer* if it is given. Make sure you
+    call close() on this coroutine to make sure GeneratorExit is called and files are closed.
     """
     im_writer = None
     file_index = 0
     written = 0
     dir_name = os.path.dirname(prefix)
+    kwargs = {} if compression is None else {'compression': compression}
     # If there is no formatting user wants just one file, in which case we append
     append = prefix.format(0) == prefix
     if append:
-        im_writer = writer(prefix, bytes_per_file, append=True)
+        im_writer = writer(prefix, bytes_per_file, append=True, **kwargs)
 
     if dir_name and not os.path.exists(dir_name):
         create_directory(dir_name)
@@ -106,7 +123,8 @@ def write_images(writer=TiffWriter, prefix="image_{:>05}.tif", start_index=0, by
             if not append and (not im_writer or written + image.nbytes > bytes_per_file):
                 if im_writer:
                     im_writer.close()
-                im_writer = writer(prefix.format(start_index + file_index), bytes_per_file)
+                im_writer = writer(prefix.format(start_index + file_index), bytes_per_file,
+                                   **kwargs)
                 file_index += 1
                 written = 0
             im_writer.write(image)
@@ -116,6 +134,156 @@ def write_images(writer=TiffWriter, prefix="image_{:>05}.tif", start_index=0, by
             im_writer.close()
 
 
+class ParallelImageWriter(object):
+
+    """
+    Write images by *num_workers* threads, so that compression and disk access do not limit the
+    acquisition. The arguments are the same as for :func:`write_images`, but *prefix* must be
+    formattable. The images are collected into chunks of as many images as fit into
+    *bytes_per_file* (one image if it is 0) and every chunk is written into its own file by one of
+    the workers, the file names follow the image order. At most *queue_size* chunks (twice the
+    number of workers if None) wait for a worker, then the producer blocks. Pooled buffers are
+    retained until they are written. Other images are copied if *make_deepcopy* is True, which is
+    necessary when the producer reuses its arrays, e.g. :func:`.average_images` with *in_place*::
+
+        writer = ParallelImageWriter(prefix='/data/frame_{:>06}.tif', compression='zlib')
+        inject(frames(1000, camera), writer())
+        print(writer.throughput)
+
+    An exception raised by a worker is raised by the next :meth:`send` or when the coroutine is
+    closed.
+    """
+
+    def __init__(self, writer=TiffWriter, prefix="image_{:>05}.tif", start_index=0,
+                 bytes_per_file=0, compression=None, num_workers=4, queue_size=None,
+                 make_deepcopy=True):
+        if prefix.format(0) == prefix:
+            raise ValueError("prefix `{}' must be formattable".format(prefix))
+        if num_workers < 1:
+            raise ValueError('Number of workers must be positive')
+        # Files are opened by the workers, report unsupported compression right away
+        writer.check_compression(compression)
+
+        self.writer = writer
+        self.prefix = prefix
+        self.start_index = start_index
+        self.bytes_per_file = bytes_per_file
+        self.compression = compression
+        self.num_workers = num_workers
+        self.queue_size = 2 * num_workers if queue_size is None else queue_size
+        self.make_deepcopy = make_deepcopy
+        self._reset()
+
+    def __repr__(self):
+        return ("ParallelImageWriter(images={}, files={}, bytes={}, "
+                "throughput={:.1f} MB/s)".format(self.num_images, self.num_files, self.num_bytes,
+                                                 self.throughput))
+
+    def _reset(self):
+        self.num_images = 0
+        self.num_files = 0
+        self.num_bytes = 0
+        self.start = None
+        self.stop = None
+        self.error = None
+
+    @property
+    def throughput(self):
+        """Sustained writing speed in MB/s from the first image until all images are written."""
+        if self.start is None:
+            return 0.0
+        duration = (self.stop or time.time()) - self.start
+
+        return self.num_bytes / 2. ** 20 / duration if duration else 0.0
+
+    def _work(self, chunks, condition, running):
+        kwargs = {} if self.compression is None else {'compression': self.compression}
+
+        try:
+            while True:
+                chunk = chunks.get()
+                if chunk is None:
+                    break
+                index, images = chunk
+                try:
+                    if self.error is None:
+                        im_writer = self.writer(self.prefix.format(index), self.bytes_per_file,
+                                                **kwargs)
+                        try:
+                            for image in images:
+                                im_writer.write(image)
+                        finally:
+                            im_writer.close()
+                        with condition:
+                            self.num_files += 1
+                            self.num_images += len(images)
+                            self.num_bytes += sum(image.nbytes for image in images)
+                except Exception as error:
+                    LOG.exception("Writing `{}' failed".format(self.prefix.format(index)))
+                    self.error = error
+                finally:
+                    for image in images:
+                        release(image)
+        finally:
+            with condition:
+                running.remove(threading.current_thread())
+                condition.notify_all()
+
+    @coroutine
+    def __call__(self):
+        """
+        __call__(self)
+
+        Coroutine interface for processing in a pipeline.
+        """
+        self._reset()
+        dir_name = os.path.dirname(self.prefix)
+        if dir_name and not os.path.exists(dir_name):
+            create_directory(dir_name)
+
+        chunks = queue_module.Queue(maxsize=self.queue_size)
+        condition = threading.Condition()
+        running = []
+        for i in range(self.num_workers):
+            thread = threading.Thread(target=self._work, args=(chunks, condition, running))
+            thread.daemon = True
+            running.append(thread)
+            thread.start()
+
+        index = self.start_index
+        images = []
+        images_per_file = None
+
+        try:
+            while True:
+                image = yield
+                if self.error is not None:
+                    raise self.error
+                if self.start is None:
+                    self.start = time.time()
+                    images_per_file = max(1, self.bytes_per_file // image.nbytes)
+                if not retain(image) and self.make_deepcopy:
+                    image = deepcopy(image)
+                images.append(image)
+                if len(images) == images_per_file:
+                    chunks.put((index, images))
+                    index += 1
+                    images = []
+        except GeneratorExit:
+            if images:
+                chunks.put((index, images))
+        finally:
+            for i in range(self.num_workers):
+                chunks.put(None)
+            with condition:
+                while running:
+                    condition.wait()
+            self.stop = time.time()
+
+        if self.error is not None:
+            raise self.error
+
+
 class Walker(object):
 
     """
@@ -232,11 +400,14 @@ class DirectoryWalker(Walker):
     """
 
     def __init__(self, writer=TiffWriter, dsetname='frame_{:>06}.tif', start_index=0,
-                 bytes_per_file=0, root=None, log=None, log_name='experiment.log'):
+                 bytes_per_file=0, root=None, log=None, log_name='experiment.log',
+                 compression=None, num_workers=None):
         """
         Use *writer* to write data to files with filenames with a template from *dsetname*.
         *start_index* specifies the number in the first file name, e.g. for the default *dsetname*
-        and *start_index* 100, the first file name will be frame_000100.tif.
+        and *start_index* 100, the first file name will be frame_000100.tif. *compression* is
+        passed to the *writer*. If *num_workers* is given, the files are written by that many
+        threads by a :class:`ParallelImageWriter`.
         """
         if not root:
             root = os.getcwd()
@@ -251,9 +422,12 @@ class DirectoryWalker(Walker):
 
         super(DirectoryWalker, self).__init__(root, dsetname=dsetname,
                                               log=log, log_handler=log_handler)
+        writer.check_compression(compression)
         self._writer = writer
         self._bytes_per_file = bytes_per_file
         self._start_index = start_index
+        self._compression = compression
+        self._num_workers = num_workers
 
     def _descend(self, name):
         new = os.path.join(self._current, name)
@@ -279,9 +453,17 @@ class DirectoryWalker(Walker):
             raise StorageError("`{}' is not empty".format(dset_path))
 
         prefix = os.path.join(self._current, dsetname)
+        if self._num_workers:
+            return ParallelImageWriter(writer=self._writer, prefix=prefix,
+                                       start_index=self._start_index,
+                                       bytes_per_file=self._bytes_per_file,
+                                       compression=self._compression,
+                                       num_workers=self._num_workers)()
+
         return write_images(writer=self._writer, prefix=prefix,
                             start_index=self._start_index,
-                            bytes_per_file=self._bytes_per_file)
+                            bytes_per_file=self._bytes_per_file,
+                            compression=self._compression)
 
     def _dset_exists(self, dsetname):
         """Check if *dsetname* exists on the current level."""
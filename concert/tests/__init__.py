@@ -13,6 +13,17 @@ def slow(func):
     return func
 
 
+def benchmark(func):
+    """Mark a test method as a benchmark.
+
+    Benchmarks are slow and their results depend on the machine, hence they
+    are skipped by ``make check`` and run with ``make benchmark``.
+    """
+    func.slow = 1
+    func.benchmark = 1
+    return func
+
+
 def suppressed_logging(func):
     """Decorator for test functions."""
     def test_wrapper(*args, **kwargs):
@@ -0,0 +1,39 @@
+import time
+from concert.coroutines.base import coroutine
+from concert.experiments.base import Acquisition
+from concert.tests import TestCase, benchmark
+from concert.tests.util.benchmark import report
+
+
+NUM_ITEMS = 200
+
+
+def produce():
+    for i in range(NUM_ITEMS):
+        yield i
+
+
+@coroutine
+def consume():
+    while True:
+        yield
+        time.sleep(1e-3)
+
+
+class TestAcquisitionThroughput(TestCase):
+
+    def run_acquisition(self, fan_out):
+        acquisition = Acquisition('foo', produce, consumers=[consume, consume], fan_out=fan_out)
+        start = time.time()
+        acquisition.connect()
+
+        return NUM_ITEMS / (time.time() - start)
+
+    @benchmark
+    def test_fan_out(self):
+        sequential = self.run_acquisition(False)
+        fan_out = self.run_acquisition(True)
+        report('sequential consumers', sequential, unit='items/s')
+        report('fan-out consumers', fan_out, unit='items/s')
+
+        self.assertGreater(fan_out, 1.5 * sequential)
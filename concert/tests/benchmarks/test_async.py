@@ -0,0 +1,72 @@
+import imp
+import subprocess
+import sys
+from concert.tests import TestCase, benchmark
+from concert.tests.util.benchmark import report
+
+
+NUM_MOTORS = 200
+
+# Backends cannot be switched at run-time, every one needs a new interpreter
+SCRIPT = """
+import threading
+import time
+import concert.config
+concert.config.ENABLE_GEVENT = {gevent}
+concert.config.ENABLE_ASYNCIO = {asyncio}
+from concert.async import wait
+from concert.quantities import q
+from concert.devices.motors.dummy import LinearMotor
+
+# Count the threads started by the moves
+num_threads = [0]
+start_thread = threading.Thread.start
+
+
+def count_start(thread):
+    num_threads[0] += 1
+    start_thread(thread)
+
+
+threading.Thread.start = count_start
+motors = [LinearMotor() for i in range({num_motors})]
+start = time.time()
+for i in range(10):
+    wait([motor.set_position(i * q.mm) for motor in motors])
+print("{{}} {{}}".format(10 * len(motors) / (time.time() - start), num_threads[0]))
+"""
+
+
+def has_module(name):
+    try:
+        imp.find_module(name)
+        return True
+    except ImportError:
+        return False
+
+
+class TestBackends(TestCase):
+
+    def move_motors(self, name, gevent=False, asyncio=False):
+        """Report the motor moves per second and the number of threads of the backend *name*."""
+        script = SCRIPT.format(gevent=gevent, asyncio=asyncio, num_motors=NUM_MOTORS)
+        rate, num_threads = subprocess.check_output([sys.executable, '-c', script]).split()[-2:]
+        report(name + ' motor moves', float(rate))
+        report(name + ' started threads', float(num_threads), unit='')
+
+        return int(num_threads)
+
+    @benchmark
+    def test_threads(self):
+        self.move_motors('threads')
+
+    @benchmark
+    def test_gevent(self):
+        if has_module('gevent'):
+            self.move_motors('gevent', gevent=True)
+
+    @benchmark
+    def test_asyncio(self):
+        if has_module('asyncio'):
+            # Dummy motors do not block, their moves run in the event loop thread
+            self.assertEqual(self.move_motors('asyncio', asyncio=True), 0)
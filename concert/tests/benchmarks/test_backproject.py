@@ -0,0 +1,63 @@
+import time
+import numpy as np
+from concert.imageprocessing import Backprojector, ramp_filter
+from concert.tests import TestCase, benchmark
+from concert.tests.util.benchmark import report
+from concert.tests.util.phantom import disks_sinogram
+
+
+NUM_PROJECTIONS = 512
+WIDTH = 512
+NUM_SLICES = 8
+DISKS = [(100, -50, 40), (-80, 30, 60), (0, 0, 20)]
+
+
+def nearest_backproject(sinogram, center):
+    """The former per-angle backprojection with nearest-neighbour lookups."""
+    half = min(center, sinogram.shape[1] - center)
+    y_indices, x_indices = np.mgrid[-half:half, -half:half]
+    mask = np.where(np.sqrt(x_indices ** 2 + y_indices ** 2) >= half)
+    x_indices[mask] = 0
+    y_indices[mask] = 0
+    width = x_indices.shape[0]
+    start = center - width // 2
+    filtered = np.fft.fft(sinogram[:, start:start + width]) * ramp_filter(width)
+    filtered = np.fft.ifft(filtered).real.astype(np.float32)
+    angle_step = np.pi / sinogram.shape[0]
+    reco = np.zeros((width, width))
+
+    for i, phi in enumerate(np.arange(sinogram.shape[0]) * angle_step):
+        pos = np.sin(phi) * x_indices + np.cos(phi) * y_indices + width // 2
+        reco += filtered[i, pos.astype(np.int)]
+
+    return reco
+
+
+class TestBackproject(TestCase):
+
+    @benchmark
+    def test_vectorized_vs_nearest(self):
+        sinogram = disks_sinogram(NUM_PROJECTIONS, WIDTH, WIDTH // 2, DISKS)
+        sinograms = np.array([sinogram] * NUM_SLICES)
+
+        start = time.time()
+        for i in range(NUM_SLICES):
+            nearest_backproject(sinogram, WIDTH // 2)
+        nearest = NUM_SLICES / (time.time() - start)
+
+        backprojector = Backprojector(NUM_PROJECTIONS, WIDTH, WIDTH // 2)
+        start = time.time()
+        for i in range(NUM_SLICES):
+            backprojector(sinogram)
+        vectorized = NUM_SLICES / (time.time() - start)
+
+        start = time.time()
+        backprojector.reconstruct(sinograms)
+        threaded = NUM_SLICES / (time.time() - start)
+        backprojector.close()
+
+        report('nearest-neighbour backprojection', nearest, unit='slices/s')
+        report('vectorized backprojection', vectorized, unit='slices/s')
+        report('vectorized backprojection in threads', threaded, unit='slices/s')
+
+        self.assertGreater(vectorized, nearest)
@@ -0,0 +1,33 @@
+import time
+import numpy as np
+from concert.coroutines.base import inject
+from concert.coroutines.filters import absorptivity, batch, flat_correct
+from concert.coroutines.sinks import null
+from concert.tests import TestCase, benchmark
+from concert.tests.util.benchmark import report
+
+
+SHAPE = (32, 32)
+NUM_FRAMES = 10000
+
+
+class TestBatch(TestCase):
+
+    def run_pipeline(self, make_pipeline):
+        frame = np.ones(SHAPE, dtype=np.uint16)
+        flat = np.ones(SHAPE) * 2
+        dark = np.ones(SHAPE) / 2
+        start = time.time()
+        inject((frame for i in range(NUM_FRAMES)),
+               make_pipeline(flat_correct(flat, absorptivity(null()), dark=dark)))
+
+        return NUM_FRAMES / (time.time() - start)
+
+    @benchmark
+    def test_batched_vs_single(self):
+        single = self.run_pipeline(lambda consumer: consumer)
+        batched = self.run_pipeline(lambda consumer: batch(64, consumer))
+        report('single small frames', single, unit='frames/s')
+        report('batches of 64 small frames', batched, unit='frames/s')
+
+        self.assertGreater(batched, single)
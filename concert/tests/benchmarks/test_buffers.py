@@ -0,0 +1,44 @@
+import time
+import numpy as np
+from concert.buffers import BufferPool, release
+from concert.coroutines.base import inject
+from concert.coroutines.filters import queue
+from concert.coroutines.sinks import null
+from concert.tests import TestCase, benchmark
+from concert.tests.util.benchmark import report
+
+
+SHAPE = (2048, 2048)
+NUM_FRAMES = 100
+
+
+class TestQueueThroughput(TestCase):
+
+    def run_queue(self, produce):
+        start = time.time()
+        inject(produce(), queue(null(), block=True))
+
+        return NUM_FRAMES * np.prod(SHAPE) * 2 / 2. ** 20 / (time.time() - start)
+
+    @benchmark
+    def test_pooled_vs_copied(self):
+        frame = np.ones(SHAPE, dtype=np.uint16)
+        pool = BufferPool(SHAPE, dtype=np.uint16, size=16, block=True)
+
+        def produce_copies():
+            for i in range(NUM_FRAMES):
+                yield frame
+
+        def produce_pooled():
+            for i in range(NUM_FRAMES):
+                buf = pool.get()
+                buf[...] = frame
+                yield buf
+                release(buf)
+
+        copied = self.run_queue(produce_copies)
+        pooled = self.run_queue(produce_pooled)
+        report('queue with copies', copied, unit='MB/s')
+        report('queue with pooled buffers', pooled, unit='MB/s')
+
+        self.assertGreater(pooled, copied)
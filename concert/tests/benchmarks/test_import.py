@@ -0,0 +1,29 @@
+from concert.tests import TestCase, benchmark
+from concert.tests.util.benchmark import import_times, report
+
+
+MODULES = ['concert.base', 'concert.imageprocessing', 'concert.processes.common',
+           'concert.storage', 'concert.coroutines.filters', 'concert.session.utils',
+           'concert.ext.viewers']
+
+# Modules which are imported only when they are used
+DEFERRED = ['scipy', 'tifffile', 'fabio', 'matplotlib']
+
+
+class TestImport(TestCase):
+
+    @benchmark
+    def test_deferred_imports(self):
+        for module in MODULES:
+            loaded = import_times(module)[1]
+            for name in DEFERRED:
+                self.assertNotIn(name, loaded, msg='{} imports {}'.format(module, name))
+
+    @benchmark
+    def test_import_times(self):
+        for module in MODULES:
+            times = import_times(module)[0]
+            report('import ' + module, times['total'], unit='s')
+            slowest = sorted(times.items(), key=lambda item: item[1], reverse=True)[1:6]
+            for name, duration in slowest:
+                report('    ' + name, duration, unit='s')
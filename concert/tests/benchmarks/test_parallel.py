@@ -0,0 +1,32 @@
+import time
+import numpy as np
+from concert.coroutines.base import inject
+from concert.coroutines.filters import parallel_process, process
+from concert.coroutines.sinks import null
+from concert.tests import TestCase, benchmark
+from concert.tests.util.benchmark import report
+
+
+NUM_FRAMES = 64
+
+
+def python_heavy(frame):
+    """Per-row Python processing which holds the GIL."""
+    return np.array([sorted(row) for row in frame.tolist()])
+
+
+class TestParallelProcess(TestCase):
+
+    def run_filter(self, make_filter):
+        frames = (np.random.random((256, 256)) for i in range(NUM_FRAMES))
+        start = time.time()
+        inject(frames, make_filter())
+
+        return NUM_FRAMES / (time.time() - start)
+
+    @benchmark
+    def test_parallel_vs_serial(self):
+        serial = self.run_filter(lambda: process(python_heavy, null()))
+        parallel = self.run_filter(lambda: parallel_process(python_heavy, null(), workers=4))
+        report('serial process', serial, unit='frames/s')
+        report('parallel_process with 4 workers', parallel, unit='frames/s')
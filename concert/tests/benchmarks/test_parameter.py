@@ -0,0 +1,64 @@
+import time
+from concert.base import register_names
+from concert.quantities import q
+from concert.devices.motors.dummy import LinearMotor
+from concert.tests import TestCase, benchmark
+from concert.tests.util.benchmark import rate, report
+
+
+NUM_SETS = 2000
+
+
+class Holder(object):
+
+    """Keeps a motor which is not visible in any namespace."""
+
+    def __init__(self):
+        self.motor = LinearMotor()
+
+
+class TestParameterSet(TestCase):
+
+    def set_position(self, motor):
+        def func(i):
+            motor.position = (i % 10) * q.mm
+
+        return rate(func, num_calls=NUM_SETS)
+
+    @benchmark
+    def test_named_vs_anonymous(self):
+        motor = LinearMotor()
+        register_names(locals())
+        named = self.set_position(motor)
+        anonymous = self.set_position(Holder().motor)
+        report('named motor sets', named)
+        report('anonymous motor sets', anonymous)
+
+        # Anonymous devices used to walk the stack on every set
+        self.assertGreater(anonymous, named / 2)
+
+
+class SlowMotor(LinearMotor):
+
+    """A motor with the latency of a network round trip on every read."""
+
+    def _get_position(self):
+        time.sleep(1e-3)
+        return super(SlowMotor, self)._get_position()
+
+
+class TestParameterGet(TestCase):
+
+    def get_position(self, motor):
+        return rate(lambda i: motor.position, num_calls=200)
+
+    @benchmark
+    def test_cached_vs_uncached(self):
+        motor = SlowMotor()
+        uncached = self.get_position(motor)
+        motor['position'].cache_ttl = 1 * q.s
+        cached = self.get_position(motor)
+        report('uncached position reads', uncached)
+        report('cached position reads', cached)
+
+        self.assertGreater(cached, 10 * uncached)
@@ -0,0 +1,68 @@
+import numpy as np
+from concert.base import Parameterizable, Quantity
+from concert.quantities import q
+from concert.devices.motors.dummy import LinearMotor
+from concert.tests import TestCase, benchmark
+from concert.tests.util.benchmark import rate, report
+
+
+NUM_CALLS = 2000
+
+
+class VectorDevice(Parameterizable):
+
+    value = Quantity(q.mm, lower=np.zeros(3) * q.mm, upper=np.ones(3) * q.m)
+
+    def __init__(self):
+        super(VectorDevice, self).__init__()
+        self._value = np.zeros(3) * q.mm
+
+    def _get_value(self):
+        return self._value
+
+    def _set_value(self, value):
+        self._value = value
+
+
+class TestQuantityThroughput(TestCase):
+
+    @benchmark
+    def test_conversion(self):
+        param = LinearMotor()['position']._parameter
+        value = 1 * q.m
+        fast = rate(lambda i: param.convert(value), num_calls=NUM_CALLS)
+        pint = rate(lambda i: value.to(param.unit), num_calls=NUM_CALLS)
+        report('quantity conversions', fast)
+        report('pint conversions', pint)
+
+        self.assertGreater(fast, pint)
+
+    @benchmark
+    def test_get(self):
+        motor = LinearMotor()
+        report('motor position gets', rate(lambda i: motor.position, num_calls=NUM_CALLS))
+
+    @benchmark
+    def test_set(self):
+        motor = LinearMotor()
+        motor['position'].lower = -1 * q.m
+        motor['position'].upper = 1 * q.m
+
+        def set_mm(i):
+            motor.position = (i % 10) * q.mm
+
+        def set_um(i):
+            motor.position = (i % 10) * q.um
+
+        report('motor position sets in mm', rate(set_mm, num_calls=NUM_CALLS))
+        report('motor position sets in um', rate(set_um, num_calls=NUM_CALLS))
+
+    @benchmark
+    def test_vector_set(self):
+        device = VectorDevice()
+        values = [np.random.random(3) * q.mm for i in range(10)]
+
+        def set_value(i):
+            device.value = values[i % 10]
+
+        report('vector sets', rate(set_value, num_calls=NUM_CALLS))
@@ -0,0 +1,77 @@
+import random
+import shutil
+import tempfile
+import time
+import numpy as np
+import os.path as op
+from concert.coroutines.base import inject
+from concert.readers import RawSequenceReader, TiffSequenceReader
+from concert.storage import write_images
+from concert.tests import TestCase, benchmark
+from concert.tests.util.benchmark import report
+from concert.writers import RawWriter
+
+
+NUM_FILES = 2000
+
+
+class TestReaders(TestCase):
+
+    def setUp(self):
+        super(TestReaders, self).setUp()
+        self.path = tempfile.mkdtemp()
+        coro = write_images(writer=RawWriter, prefix=op.join(self.path, 'image_{:>05}.npy'))
+        inject((np.ones((16, 16)) * i for i in range(NUM_FILES)), coro)
+        coro.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    @benchmark
+    def test_random_access(self):
+        index_file = op.join(self.path, 'index.json')
+
+        durations = []
+
+        for name in ('index built', 'index loaded'):
+            start = time.time()
+            with RawSequenceReader(self.path, index_file=index_file) as reader:
+                reader.num_images
+            durations.append(time.time() - start)
+            report(name, durations[-1], unit='s')
+
+        self.assertLess(durations[1], durations[0])
+
+        indices = [random.randrange(NUM_FILES) for i in range(10000)]
+        with RawSequenceReader(self.path, index_file=index_file) as reader:
+            start = time.time()
+            for index in indices:
+                self.assertEqual(reader.read(index)[0, 0], index)
+            report('random reads', len(indices) / (time.time() - start), unit='images/s')
+
+    @benchmark
+    def test_tiff_sequence(self):
+        frames = [np.ones((2048, 2048), dtype=np.uint16) * i for i in range(32)]
+        prefix = op.join(self.path, 'tiff', 'image_{:>05}.tif')
+        coro = write_images(prefix=prefix, bytes_per_file=2 ** 30)
+        inject(frames, coro)
+        coro.close()
+        num_bytes = sum(frame.nbytes for frame in frames)
+
+        def consume(images):
+            start = time.time()
+            for image in images:
+                # Touch the data like processing would
+                image.sum()
+
+            return num_bytes / 2. ** 20 / (time.time() - start)
+
+        for memmap in (False, True):
+            with TiffSequenceReader(op.dirname(prefix), memmap=memmap) as reader:
+                name = 'memory-mapped' if memmap else 'copied'
+                report(name, consume(reader.read(i) for i in range(len(frames))), unit='MB/s')
+
+        with TiffSequenceReader(op.dirname(prefix), memmap=True) as reader:
+            prefetcher = reader.prefetch(num_ahead=8)
+            report('prefetched', consume(prefetcher), unit='MB/s')
+            report('prefetcher read bandwidth', prefetcher.throughput, unit='MB/s')
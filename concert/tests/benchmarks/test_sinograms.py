@@ -0,0 +1,38 @@
+import time
+import numpy as np
+from concert.coroutines.base import coroutine, inject
+from concert.coroutines.filters import sinograms
+from concert.tests import TestCase, benchmark
+from concert.tests.util.benchmark import report
+
+
+SHAPE = (128, 128)
+NUM_RADIOGRAPHS = 512
+
+
+@coroutine
+def checksum():
+    """Touch all the data which comes, like a consumer processing the sinograms would."""
+    while True:
+        item = yield
+        data = item.rows if hasattr(item, 'rows') else item
+        data.sum()
+
+
+class TestSinograms(TestCase):
+
+    def run_sinograms(self, incremental):
+        radiographs = (np.ones(SHAPE, dtype=np.float32) for i in range(NUM_RADIOGRAPHS))
+        start = time.time()
+        inject(radiographs, sinograms(NUM_RADIOGRAPHS, checksum(), incremental=incremental))
+
+        return NUM_RADIOGRAPHS / (time.time() - start)
+
+    @benchmark
+    def test_incremental_vs_full(self):
+        full = self.run_sinograms(False)
+        incremental = self.run_sinograms(True)
+        report('sinograms sending the full volume', full, unit='radiographs/s')
+        report('sinograms sending updated rows', incremental, unit='radiographs/s')
+
+        self.assertGreater(incremental, full)
@@ -0,0 +1,60 @@
+import multiprocessing
+import shutil
+import tempfile
+import time
+import numpy as np
+import os.path as op
+from concert.coroutines.base import inject
+from concert.storage import ParallelImageWriter, write_images
+from concert.tests import TestCase, benchmark
+from concert.tests.util.benchmark import report
+from concert.writers import DirectRawWriter, RawWriter, TiffWriter
+
+
+SHAPE = (1024, 1024)
+NUM_FRAMES = 32
+
+
+class TestWriters(TestCase):
+
+    def setUp(self):
+        super(TestWriters, self).setUp()
+        self.path = tempfile.mkdtemp()
+        # Noisy but compressible frames like from a camera
+        frame = np.random.poisson(100, size=SHAPE).astype(np.uint16)
+        self.frames = [frame] * NUM_FRAMES
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def write(self, coro):
+        start = time.time()
+        inject(self.frames, coro)
+        coro.close()
+
+        return NUM_FRAMES * self.frames[0].nbytes / 2. ** 20 / (time.time() - start)
+
+    @benchmark
+    def test_parallel_compression(self):
+        single = self.write(write_images(prefix=op.join(self.path, 'single_{:>05}.tif'),
+                                         compression='zlib'))
+        writer = ParallelImageWriter(prefix=op.join(self.path, 'parallel_{:>05}.tif'),
+                                     compression='zlib', num_workers=4)
+        parallel = self.write(writer())
+        report('zlib, one writer', single, unit='MB/s')
+        report('zlib, 4 worker threads', parallel, unit='MB/s')
+        report('zlib, 4 worker threads, sustained', writer.throughput, unit='MB/s')
+
+        if multiprocessing.cpu_count() > 1:
+            self.assertGreater(parallel, single)
+
+    @benchmark
+    def test_raw(self):
+        self.frames = [np.ones((2048, 2048), dtype=np.uint16)] * NUM_FRAMES
+
+        for writer in (TiffWriter, RawWriter, DirectRawWriter):
+            prefix = op.join(self.path, writer.__name__ + '_{:>05}.npy')
+            throughput = self.write(write_images(writer=writer, prefix=prefix,
+                                                 bytes_per_file=2 ** 30))
+            # Buffered writers are limited by the page cache, O_DIRECT by the disk
+            report(writer.__name__, throughput, unit='MB/s')
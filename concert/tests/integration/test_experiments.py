@@ -10,7 +10,8 @@ from time import sleep
 from concert.quantities import q
 from concert.coroutines.base import coroutine, inject
 from concert.coroutines.sinks import Accumulate
-from concert.experiments.base import Acquisition, Experiment, ExperimentError
+from concert.experiments.base import (Acquisition, ConsumerQueue, Experiment,
+                                     ExperimentError)
 from concert.experiments.imaging import (tomo_angular_step, tomo_max_speed,
                                          tomo_projections_number, frames)
 from concert.experiments.addons import Addon, Consumer, ImageWriter, Accumulator
@@ -120,6 +121,79 @@ class TestAcquisition(TestCase):
             self.item = yield
 
 
+class TestFanOut(TestCase):
+
+    def setUp(self):
+        super(TestFanOut, self).setUp()
+        self.fast = []
+        self.slow = []
+
+    def produce(self):
+        for i in range(10):
+            yield i
+
+    @coroutine
+    def consume_fast(self):
+        while True:
+            self.fast.append((yield))
+
+    @coroutine
+    def consume_slow(self):
+        while True:
+            item = yield
+            sleep(0.01)
+            self.slow.append(item)
+
+    def test_all_items(self):
+        acquisition = Acquisition('foo', self.produce,
+                                  consumers=[self.consume_fast, self.consume_slow],
+                                  fan_out=True, queue_size=2)
+        acquisition.connect()
+        self.assertEqual(self.fast, list(range(10)))
+        self.assertEqual(self.slow, list(range(10)))
+        self.assertEqual([queue.num_dropped for queue in acquisition.queues], [0, 0])
+        self.assertEqual([queue.num_queued for queue in acquisition.queues], [10, 10])
+        self.assertTrue(acquisition.queues[1].max_depth <= 2)
+
+    def test_drop_newest(self):
+        acquisition = Acquisition('foo', self.produce,
+                                  consumers=[self.consume_fast, self.consume_slow],
+                                  fan_out=True)
+        acquisition.set_overflow(self.consume_slow, queue_size=1, policy='drop-newest')
+        acquisition.connect()
+        self.assertEqual(self.fast, list(range(10)))
+        slow = acquisition.queues[1]
+        self.assertTrue(slow.num_dropped > 0)
+        self.assertEqual(slow.num_dropped + slow.num_queued, 10)
+        self.assertEqual(self.slow[0], 0)
+
+    def test_drop_oldest(self):
+        acquisition = Acquisition('foo', self.produce, consumers=[self.consume_slow],
+                                  fan_out=True, queue_size=1, policy='drop-oldest')
+        acquisition.connect()
+        self.assertTrue(acquisition.queues[0].num_dropped > 0)
+        # The newest item is never dropped
+        self.assertEqual(self.slow[-1], 9)
+
+    def test_consumer_error(self):
+        @coroutine
+        def consume():
+            yield
+            raise ValueError
+
+        acquisition = Acquisition('foo', self.produce, consumers=[consume], fan_out=True)
+
+        with self.assertRaises(ValueError):
+            acquisition.connect()
+
+    def test_wrong_policy(self):
+        with self.assertRaises(ValueError):
+            Acquisition('foo', self.produce, fan_out=True, policy='foo')
+
+        with self.assertRaises(ValueError):
+            ConsumerQueue(self.consume_fast, maxsize=0)
+
+
 class TestExperimentBase(TestCase):
 
     def setUp(self):
@@ -1,10 +1,15 @@
+import shutil
+import tempfile
 from datetime import datetime
 import numpy as np
+import os.path as op
+from concert.buffers import BufferPool, is_pooled, release
 from concert.tests import TestCase
 from concert.coroutines.base import coroutine
 from concert.quantities import q
-from concert.devices.cameras.dummy import Camera, BufferedCamera
+from concert.devices.cameras.dummy import Camera, BufferedCamera, FileCamera
 from concert.devices.cameras.pco import Timestamp, TimestampError
+from concert.storage import write_tiff
 
 
 class TestDummyCamera(TestCase):
@@ -18,6 +23,19 @@ class TestDummyCamera(TestCase):
         frame = self.camera.grab()
         self.assertIsNotNone(frame)
 
+    def test_grab_into_buffers(self):
+        self.camera.buffers = BufferPool(self.background.shape, dtype=np.uint16, size=1)
+        frame = self.camera.grab()
+        self.assertTrue(is_pooled(frame))
+        release(frame)
+        self.assertTrue(self.camera.grab() is frame)
+
+        # Converted frames which are new arrays release the buffer immediately
+        release(frame)
+        self.camera.convert = lambda frame: frame.astype(np.float32)
+        self.assertFalse(is_pooled(self.camera.grab()))
+        self.assertEqual(self.camera.buffers.num_free, 1)
+
     def test_grab_async(self):
         frame = self.camera.grab_async().result()
         self.assertIsNotNone(frame)
@@ -79,6 +97,49 @@ class TestDummyCamera(TestCase):
         np.testing.assert_equal(self.background, camera.grab())
 
 
+class TestFileCamera(TestCase):
+
+    def setUp(self):
+        super(TestFileCamera, self).setUp()
+        self.path = tempfile.mkdtemp()
+        self.images = [np.ones((4, 4), dtype=np.uint16) * i for i in range(5)]
+        for i, image in enumerate(self.images):
+            write_tiff(op.join(self.path, 'image_{}.tif'.format(i)), image)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def check(self, camera, indices):
+        with camera.recording():
+            for i in indices:
+                np.testing.assert_equal(camera.grab(), self.images[i])
+            self.assertIsNone(camera.grab())
+
+    def test_grab(self):
+        self.check(FileCamera(self.path, start_index=1), range(1, 5))
+
+    def test_prefetch(self):
+        camera = FileCamera(self.path, start_index=1, prefetch=2)
+        self.check(camera, range(1, 5))
+        # Reading starts again from the first file when recording restarts
+        self.check(camera, range(1, 5))
+        self.assertEqual(camera.prefetcher.num_images, 5)
+
+    def test_grab_into_buffers(self):
+        camera = FileCamera(self.path)
+        camera.buffers = BufferPool((4, 4), dtype=np.uint16, size=1)
+
+        with camera.recording():
+            for image in self.images:
+                frame = camera.grab()
+                self.assertTrue(is_pooled(frame))
+                np.testing.assert_equal(frame, image)
+                release(frame)
+            self.assertIsNone(camera.grab())
+
+        self.assertEqual(camera.buffers.num_free, 1)
+
+
 class TestPCOTimeStamp(TestCase):
     def test_valid(self):
         image = np.empty((1, 14), dtype=np.uint16)
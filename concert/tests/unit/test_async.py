@@ -1,8 +1,11 @@
 import time
 import random
+import unittest
 import concert.config
+from concert.quantities import q
 from concert.devices.dummy import DummyDevice
-from concert.async import async, wait, resolve, KillException, HAVE_GEVENT
+from concert.async import (async, wait, resolve, busy_wait, in_loop, KillException,
+                           HAVE_ASYNCIO, HAVE_GEVENT, Notifier, WaitError, WorkQueue)
 from concert.tests import TestCase, VisitChecker
 
 
@@ -83,3 +86,201 @@ class TestAsync(TestCase):
         f.cancel_operation = check.visit
         f.cancel()
         self.assertTrue(check.visited)
+
+
+class TestNotifier(TestCase):
+
+    def setUp(self):
+        super(TestNotifier, self).setUp()
+        self.notifier = Notifier()
+
+    def test_wait(self):
+        count = self.notifier.count
+        self.assertFalse(self.notifier.wait(count, timeout=1e-3))
+        self.notifier.notify()
+        self.assertTrue(self.notifier.wait(count, timeout=1e-3))
+
+    def test_busy_wait(self):
+        d = {'done': False}
+
+        @async
+        def notify_later():
+            time.sleep(0.01)
+            d['done'] = True
+            self.notifier.notify()
+
+        start = time.time()
+        future = notify_later()
+        busy_wait(lambda: d['done'], sleep_time=10 * q.s, timeout=5 * q.s, notifier=self.notifier)
+        future.join()
+        self.assertLess(time.time() - start, 1)
+
+        with self.assertRaises(WaitError):
+            busy_wait(lambda: False, timeout=1e-2 * q.s, notifier=self.notifier)
+
+
+class TestWorkQueue(TestCase):
+
+    def setUp(self):
+        super(TestWorkQueue, self).setUp()
+        self.work_queue = WorkQueue()
+        self.order = []
+
+    def append(self, i):
+        time.sleep(random.random() / 500.)
+        self.order.append(i)
+        return i
+
+    def test_order(self):
+        futures = [self.work_queue.submit(self.append, i) for i in range(10)]
+        wait(futures)
+        self.assertEqual(self.order, range(10))
+        self.assertEqual([future.result() for future in futures], range(10))
+
+    @unittest.skipIf(HAVE_GEVENT and concert.config.ENABLE_GEVENT, 'greenlets are not limited')
+    def test_few_threads(self):
+        import concert.async
+        from concurrent.futures import ThreadPoolExecutor
+        from concert.devices.motors.dummy import LinearMotor
+
+        # Batched parameter access runs its parameter items within one thread per device
+        old_executor = concert.async.EXECUTOR
+        executor = ThreadPoolExecutor(max_workers=2)
+        concert.async.EXECUTOR = executor
+        concert.async._spawn = executor.submit
+        try:
+            motors = [LinearMotor() for i in range(4)]
+            futures = [motor.stash() for motor in motors]
+            for future in futures:
+                future.result(timeout=5)
+            futures = [motor.restore() for motor in motors]
+            for future in futures:
+                future.result(timeout=5)
+        finally:
+            concert.async.EXECUTOR = old_executor
+            concert.async._spawn = old_executor.submit
+            executor.shutdown(wait=False)
+
+    def test_nonblocking_order(self):
+        # Runs in the event loop with asyncio, in threads otherwise
+        work_queue = WorkQueue(blocking=False)
+        futures = [work_queue.submit(self.order.append, i) for i in range(10)]
+        wait(futures)
+        self.assertEqual(self.order, list(range(10)))
+        self.assertEqual(work_queue.num_done, 10)
+
+    def test_exceptions(self):
+        def bad_func():
+            raise RuntimeError
+
+        with self.assertRaises(RuntimeError):
+            self.work_queue.submit(bad_func).join()
+
+        # The queue still works
+        self.assertEqual(self.work_queue.submit(self.append, 1).result(), 1)
+
+    def test_reentrancy(self):
+        def nested():
+            return self.work_queue.submit(self.append, 1).result() + 1
+
+        future = self.work_queue.submit(nested)
+        self.assertEqual(future.result(timeout=1), 2)
+
+    def test_statistics(self):
+        wait([self.work_queue.submit(self.append, i) for i in range(5)])
+        self.assertEqual(self.work_queue.num_done, 5)
+        self.assertEqual(self.work_queue.depth, 0)
+        self.assertGreaterEqual(self.work_queue.max_depth, 1)
+        self.assertGreater(self.work_queue.run_time, 0 * q.s)
+        self.assertGreaterEqual(self.work_queue.max_run_time, self.work_queue.mean_run_time)
+        self.assertGreaterEqual(self.work_queue.max_wait_time, self.work_queue.mean_wait_time)
+
+        self.work_queue.reset_statistics()
+        self.assertEqual(self.work_queue.num_done, 0)
+
+    def test_device_parameters(self):
+        device = DummyDevice()
+        wait([device.set_value(i) for i in range(10)])
+        self.assertEqual(device.value, 9)
+
+        if concert.config.ENABLE_ASYNC and not (HAVE_GEVENT and concert.config.ENABLE_GEVENT):
+            self.assertEqual(device.work_queue.num_done, 10)
+
+
+@unittest.skipIf(not HAVE_ASYNCIO, 'asyncio backend is not enabled, use --enable-asyncio')
+class TestAsyncio(TestCase):
+
+    def test_await(self):
+        import asyncio
+        from concert.async import LOOP
+
+        awaited = asyncio.run_coroutine_threadsafe(asyncio.wait_for(identity(2), 1), LOOP)
+        self.assertEqual(awaited.result(), (2, 4))
+
+    def test_coroutine(self):
+        import asyncio
+
+        @async
+        @asyncio.coroutine
+        def loop_identity(x):
+            return identity(x)
+
+        self.assertEqual(loop_identity(3).result(), (3, 9))
+
+    def test_kill(self):
+        import asyncio
+
+        @async
+        @asyncio.coroutine
+        def sleep():
+            return asyncio.sleep(10)
+
+        future = sleep()
+        time.sleep(0.01)
+        self.assertTrue(future.cancel())
+        with self.assertRaises(KillException):
+            future.result(timeout=1)
+        self.assertFalse(future.cancel())
+
+    def test_kill_before_start(self):
+        import asyncio
+        from concert.async import LOOP
+
+        started = []
+
+        @async
+        @asyncio.coroutine
+        def start():
+            started.append(True)
+
+        # Keep the loop busy, so that the coroutine is cancelled before it is started
+        LOOP.call_soon_threadsafe(time.sleep, 0.05)
+        future = start()
+        self.assertTrue(future.cancel())
+        with self.assertRaises(KillException):
+            future.result(timeout=1)
+        self.assertEqual(started, [])
+
+    def test_nonblocking_queue(self):
+        work_queue = WorkQueue(blocking=False)
+        self.assertTrue(work_queue.submit(in_loop).result())
+
+        # Items which wait for futures are run by threads
+        @async
+        def wait_a_bit():
+            time.sleep(0.01)
+
+        def check(wait_on=None):
+            wait_on.join()
+            return in_loop()
+
+        self.assertFalse(work_queue.submit(check, wait_on=wait_a_bit()).result())
+
+    def test_nonblocking_device(self):
+        from concert.devices.motors.dummy import LinearMotor
+
+        motor = LinearMotor()
+        motor.work_queue.submit(time.sleep, 0.01)
+        self.assertTrue(motor.work_queue.submit(in_loop).result())
+        motor.set_position(1 * q.mm).join()
+        self.assertEqual(motor.position, 1 * q.mm)
@@ -0,0 +1,126 @@
+import time
+import numpy as np
+from concert.buffers import BufferPool, is_pooled, release, retain
+from concert.coroutines.base import coroutine, inject
+from concert.coroutines.filters import QueueStatistics, downsize, queue
+from concert.coroutines.sinks import Accumulate, Result
+from concert.tests import TestCase
+
+
+class TestBufferPool(TestCase):
+
+    def setUp(self):
+        super(TestBufferPool, self).setUp()
+        self.pool = BufferPool((4, 4), dtype=np.uint16, size=2)
+
+    def test_reuse(self):
+        first = self.pool.get()
+        self.assertEqual(first.shape, (4, 4))
+        self.assertEqual(first.dtype, np.uint16)
+        self.assertEqual(self.pool.num_free, 1)
+        release(first)
+        self.assertEqual(self.pool.num_free, 2)
+        self.assertTrue(self.pool.get() is first)
+
+    def test_references(self):
+        frame = self.pool.get()
+        self.assertTrue(retain(frame))
+        self.assertEqual(self.pool.references(frame), 2)
+        release(frame)
+        self.assertEqual(self.pool.num_free, 1)
+        release(frame)
+        self.assertEqual(self.pool.num_free, 2)
+
+        with self.assertRaises(ValueError):
+            release(frame)
+
+    def test_views(self):
+        frame = self.pool.get()
+        view = frame[1:3, ::2]
+        self.assertTrue(is_pooled(view))
+        retain(view)
+        self.assertEqual(self.pool.references(frame), 2)
+        self.assertFalse(is_pooled(np.copy(view)))
+        self.assertFalse(retain(np.copy(view)))
+
+    def test_exhausted(self):
+        self.pool.get()
+        self.pool.get()
+        frame = self.pool.get()
+        self.assertFalse(is_pooled(frame))
+        self.assertEqual(self.pool.num_misses, 1)
+
+    def test_pipeline(self):
+        self.pool = BufferPool((4, 4), dtype=np.uint16, size=16)
+
+        def produce():
+            for i in range(10):
+                frame = self.pool.get()
+                frame.fill(i)
+                yield frame
+                release(frame)
+
+        accumulate = Accumulate()
+        result = Result()
+
+        @coroutine
+        def both():
+            first = accumulate()
+            second = result()
+            while True:
+                item = yield
+                first.send(item)
+                second.send(item)
+
+        inject(produce(), queue(downsize(both(), x_slice=(0, 2, 1)), block=True))
+
+        self.assertEqual([item[0, 0] for item in accumulate.items], list(range(10)))
+        self.assertEqual(result.result[0, 0], 9)
+        # No copies have been made, the accumulated buffers are in use
+        self.assertTrue(all(is_pooled(item) for item in accumulate.items))
+        self.assertEqual(self.pool.num_free, 6)
+
+        # Result still holds the last one
+        accumulate().close()
+        self.assertEqual(self.pool.num_free, 15)
+
+    def test_queue_discard(self):
+        self.pool = BufferPool((4, 4), dtype=np.uint16, size=16)
+
+        @coroutine
+        def slow():
+            while True:
+                yield
+                time.sleep(0.01)
+
+        def produce():
+            for i in range(10):
+                frame = self.pool.get()
+                yield frame
+                release(frame)
+
+        for policy in ('block', 'drop-oldest', 'drop-newest', 'spill'):
+            statistics = QueueStatistics()
+            inject(produce(), queue(slow(), process_all=False, maxsize=4, policy=policy,
+                                    statistics=statistics))
+            # Queued frames are discarded after the producer finishes
+            start = time.time()
+            while self.pool.num_free < 16 and time.time() - start < 1:
+                time.sleep(0.01)
+            self.assertGreater(statistics.num_dropped, 0, msg=policy)
+            self.assertEqual(self.pool.num_free, 16, msg=policy)
+
+        # A failing producer does not leave the frames in the queue
+        statistics = QueueStatistics()
+        consumer = queue(slow(), maxsize=4, statistics=statistics)
+        for i in range(5):
+            frame = self.pool.get()
+            consumer.send(frame)
+            release(frame)
+        with self.assertRaises(ValueError):
+            consumer.throw(ValueError)
+        self.assertGreater(statistics.num_dropped, 0)
+        start = time.time()
+        while self.pool.num_free < 16 and time.time() - start < 1:
+            time.sleep(0.01)
+        self.assertEqual(self.pool.num_free, 16)
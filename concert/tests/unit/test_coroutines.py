@@ -1,9 +1,18 @@
+import json
+import os
+import tempfile
+import threading
+import time
 import numpy as np
 from concert.coroutines.base import coroutine, broadcast, inject
 from concert.coroutines.filters import (absorptivity, backproject, flat_correct, average_images,
                                         queue, sinograms, downsize, stall, PickSlice, Timer,
-                                        process)
-from concert.coroutines.sinks import null, Result, Accumulate
+                                        process, QueueStatistics, parallel_process, batch,
+                                        unbatch)
+from concert.coroutines.sinks import (null, Result, Accumulate, RunningStatistics,
+                                      SinogramWriter)
+from concert.coroutines.profiling import Profiler
+from concert.quantities import q
 from concert.tests import assert_almost_equal, TestCase
 
 
@@ -12,6 +21,19 @@ def generator():
         yield i
 
 
+def wait_for(condition):
+    while not condition():
+        time.sleep(1e-3)
+
+
+def square(item):
+    return item ** 2
+
+
+def fail(item):
+    raise ValueError('foo')
+
+
 def frame_producer(consumer, num_frames=3, shape=(2, 2)):
     for i in range(num_frames):
         consumer.send(np.ones(shape=shape) * (i + 1))
@@ -76,6 +98,15 @@ class TestCoroutines(TestCase):
         truth = np.ones((2, 2)) * 2
         np.testing.assert_almost_equal(self.data, truth)
 
+        frames = [np.ones((2, 2)) * i for i in range(3)]
+        fresh = Accumulate()
+        inject(frames, average_images(fresh()))
+        np.testing.assert_almost_equal([item[0, 0] for item in fresh.items], [0, 0.5, 1])
+
+        shared = Accumulate()
+        inject(frames, average_images(shared(), in_place=True))
+        self.assertTrue(all(item is shared.items[0] for item in shared.items))
+
     def test_flat_correct(self):
         shape = (2, 2)
         dark = np.ones(shape)
@@ -148,6 +179,226 @@ class TestCoroutines(TestCase):
     def test_queue(self):
         frame_producer(queue(null()))
 
+    def test_bounded_queue(self):
+        def run(policy, **kwargs):
+            stats = QueueStatistics()
+            gate = threading.Event()
+            result = Accumulate()
+            consumer = result()
+
+            @coroutine
+            def gated():
+                while True:
+                    item = yield
+                    gate.wait()
+                    consumer.send(item)
+
+            coro = queue(gated(), policy=policy, statistics=stats, **kwargs)
+            # First item is taken by the waiting consumer, the others stay in the queue
+            coro.send(0)
+            wait_for(lambda: stats.num_dequeued)
+            for i in range(1, 6):
+                coro.send(i)
+            depth = stats.depth
+            gate.set()
+            coro.close()
+            wait_for(lambda: len(result.items) + stats.num_dropped == 6)
+
+            return (result, stats, depth)
+
+        result, stats, depth = run('drop-newest', maxsize=2)
+        self.assertEqual(stats.num_dropped, 3)
+        self.assertEqual(result.items, [0, 1, 2])
+        self.assertEqual(depth, 2)
+
+        result, stats, depth = run('drop-oldest', maxsize=2)
+        self.assertEqual(stats.num_dropped, 3)
+        self.assertEqual(result.items, [0, 4, 5])
+
+        directory = tempfile.mkdtemp()
+        result, stats, depth = run('spill', maxsize=2, spill_directory=directory)
+        self.assertEqual(result.items, range(6))
+        self.assertEqual(stats.num_spilled, 3)
+        self.assertEqual(depth, 5)
+        self.assertEqual(stats.max_depth, 5)
+        self.assertEqual(stats.num_enqueued, 6)
+        self.assertEqual(os.listdir(directory), [])
+        os.rmdir(directory)
+
+    def test_queue_max_bytes(self):
+        stats = QueueStatistics()
+        gate = threading.Event()
+
+        @coroutine
+        def gated():
+            while True:
+                yield
+                gate.wait()
+
+        coro = queue(gated(), max_bytes=32, policy='drop-newest', statistics=stats)
+        coro.send(np.ones(2))
+        wait_for(lambda: stats.num_dequeued)
+        for i in range(3):
+            coro.send(np.ones(2))
+        # The first item is being consumed, the second and third fit into 32 bytes
+        self.assertEqual(stats.bytes, 32)
+        self.assertEqual(stats.num_dropped, 1)
+        gate.set()
+
+    def test_queue_block(self):
+        stats = QueueStatistics()
+        result = Accumulate()
+        coro = queue(result(), maxsize=1, block=True, statistics=stats)
+        for i in range(10):
+            coro.send(i)
+        coro.close()
+        self.assertEqual(result.items, range(10))
+        self.assertEqual(stats.max_depth, 1)
+        self.assertEqual(stats.depth, 0)
+        self.assertTrue(stats.dequeue_rate.magnitude > 0)
+
+    def test_queue_arguments(self):
+        self.assertRaises(ValueError, queue, null(), policy='foo')
+        self.assertRaises(ValueError, queue, null(), maxsize=0)
+
+    def test_parallel_process(self):
+        frames = [np.ones((4, 4)) * i for i in range(10)]
+        result = Accumulate()
+        inject(frames, parallel_process(square, result(), workers=2))
+        np.testing.assert_equal(result.items, [frame ** 2 for frame in frames])
+
+        # Unordered, bigger arrays and other items are pickled
+        items = frames + [np.ones((8, 8)), 3]
+        result = Accumulate()
+        inject(items, parallel_process(square, result(), workers=2, ordered=False))
+        self.assertEqual(sorted(np.sum(item) for item in result.items),
+                         sorted(np.sum(item ** 2) for item in items))
+
+    def test_parallel_process_failure(self):
+        with self.assertRaises(RuntimeError):
+            inject(range(3), parallel_process(fail, null(), workers=1))
+        self.assertRaises(ValueError, parallel_process, square, null(), workers=0)
+
+    def test_batch(self):
+        frames = [np.ones((2, 3)) * i for i in range(7)]
+        result = Accumulate()
+        inject(frames, batch(3, result()))
+        self.assertEqual([len(stack) for stack in result.items], [3, 3, 1])
+        self.assertEqual(result.items[0].shape, (3, 2, 3))
+
+        result = Accumulate()
+        inject(frames, batch(3, unbatch(result())))
+        np.testing.assert_equal(result.items, frames)
+
+        self.assertRaises(ValueError, batch, 0, null())
+
+    def test_batched_filters(self):
+        frames = [np.random.random((10, 10)) for i in range(10)]
+
+        def compare(make_filter, size=4, last=False):
+            single = Accumulate()
+            batched = Accumulate()
+            inject(frames, make_filter(single(), False))
+            inject(frames, batch(size, make_filter(batched(), True)))
+            if last:
+                np.testing.assert_almost_equal(single.items[-1], batched.items[-1])
+            else:
+                np.testing.assert_almost_equal(single.items, np.concatenate(batched.items))
+
+        flat = np.ones((10, 10)) * 2
+        compare(lambda consumer, batched: flat_correct(flat, consumer, dark=flat / 2))
+        compare(lambda consumer, batched: absorptivity(consumer))
+        compare(lambda consumer, batched: average_images(consumer, batched=batched), last=True)
+        compare(lambda consumer, batched: downsize(consumer, x_slice=(2, 6, 2),
+                                                   y_slice=(3, 10, 3), z_slice=(2, 8, 3),
+                                                   batched=batched))
+        compare(lambda consumer, batched: downsize(consumer, z_slice=(1, None, 2),
+                                                   batched=batched), size=3)
+
+    def test_batched_sinograms(self):
+        frames = [np.random.random((10, 10)) for i in range(10)]
+        single = Result()
+        batched = Result()
+        inject(frames, sinograms(4, single()))
+        inject(frames, batch(3, sinograms(4, batched(), batched=True)))
+        np.testing.assert_almost_equal(single.result, batched.result)
+
+    def test_running_statistics(self):
+        data = np.random.RandomState(0).normal(5, 2, (500, 4, 4))
+        statistics = RunningStatistics(dtype=np.float64, median=True)
+        inject(data, statistics())
+        mean = statistics.mean
+
+        self.assertEqual(statistics.count, 500)
+        np.testing.assert_almost_equal(statistics.mean, data.mean(axis=0))
+        np.testing.assert_almost_equal(statistics.variance, data.var(axis=0, ddof=1))
+        np.testing.assert_almost_equal(statistics.std, data.std(axis=0, ddof=1))
+        np.testing.assert_equal(statistics.minimum, data.min(axis=0))
+        np.testing.assert_equal(statistics.maximum, data.max(axis=0))
+        self.assertLess(np.abs(statistics.median - np.median(data, axis=0)).max(), 0.5)
+
+        # New accumulation reuses the arrays
+        inject(data[:2], statistics())
+        self.assertEqual(statistics.count, 2)
+        self.assertTrue(statistics.mean is mean)
+        np.testing.assert_almost_equal(statistics.mean, data[:2].mean(axis=0))
+        self.assertTrue(RunningStatistics().median is None)
+
+    def test_incremental_sinograms(self):
+        frames = np.random.random((10, 3, 4))
+        result = Accumulate()
+        inject(frames, sinograms(4, result(), incremental=True))
+        self.assertEqual([(rows.start, rows.stop) for rows in result.items],
+                         [(i % 4, i % 4 + 1) for i in range(10)])
+        np.testing.assert_almost_equal(result.items[-1].rows[:, 0], frames[-1])
+
+        result = Accumulate()
+        inject(frames, batch(3, sinograms(4, result(), batched=True, incremental=True)))
+        self.assertEqual([(rows.start, rows.stop) for rows in result.items],
+                         [(0, 3), (3, 4), (0, 2), (2, 4), (0, 1), (1, 2)])
+        single = Result()
+        inject(frames, sinograms(4, single()))
+        np.testing.assert_almost_equal(result.items[-1].volume, single.result)
+
+    def test_sinogram_writer(self):
+        frames = np.random.random((10, 3, 4)).astype(np.float32)
+        single = Result()
+        inject(frames, sinograms(4, single()))
+        handle, filename = tempfile.mkstemp(suffix='.npy')
+        os.close(handle)
+
+        try:
+            writer = SinogramWriter(filename, 4, block_size=3)
+            coro = writer()
+            inject(frames, coro)
+            coro.close()
+            volume = np.load(filename, mmap_mode='r')
+            self.assertEqual(volume.dtype, np.float32)
+            np.testing.assert_almost_equal(volume, single.result)
+
+            # Flushing in between and another run
+            coro = writer()
+            inject(frames[:2], coro)
+            writer.flush()
+            np.testing.assert_almost_equal(np.load(filename)[:, :2], frames[:2].transpose(1, 0, 2))
+            coro.close()
+
+            # Other radiographs and their number create the file again
+            writer.num_radiographs = 2
+            inject(frames[:, :2], writer())
+            self.assertEqual(np.load(filename).shape, (2, 2, 4))
+            np.testing.assert_almost_equal(np.load(filename), frames[-2:, :2].transpose(1, 0, 2))
+            # The old volume is still readable
+            self.assertEqual(volume.shape, (3, 4, 4))
+
+            coro = writer()
+            coro.send(frames[0, :2])
+            with self.assertRaises(ValueError):
+                coro.send(frames[0])
+            del volume, writer, coro
+        finally:
+            os.remove(filename)
+
     def test_backproject(self):
         frame_producer(backproject(1, null()))
 
@@ -192,3 +443,55 @@ class TestTimer(TestCase):
     def test_reset(self):
         self.timer.reset()
         self.assertEqual(len(self.timer.durations), 0)
+
+
+class TestProfiler(TestCase):
+
+    def test_stages(self):
+        def sleep(item):
+            time.sleep(1e-3)
+            return item
+
+        profiler = Profiler()
+        result = Result()
+
+        with profiler:
+            pipeline = broadcast(process(sleep, null()), result())
+        consumer = absorptivity(null())
+
+        inject(np.ones((5, 2, 2)), pipeline)
+        inject(np.ones((5, 2, 2)), profiler.wrap(consumer, 'process'))
+
+        names = [stage.name for stage in profiler.stages]
+        self.assertEqual(names, ['null', 'process', 'Result', 'broadcast', 'process-2'])
+
+        null_stats, process_stats, result_stats, broadcast_stats = profiler.stages[:4]
+        self.assertEqual(broadcast_stats.num_items, 5)
+        self.assertEqual(broadcast_stats.num_bytes, 5 * 4 * 8)
+        self.assertGreaterEqual(process_stats.self_time.to(q.s).magnitude, 5e-3)
+        self.assertAlmostEqual(broadcast_stats.downstream,
+                               process_stats.total + result_stats.total)
+        self.assertTrue(broadcast_stats.self_time < process_stats.self_time)
+        self.assertTrue(broadcast_stats.item_rate.magnitude > 0)
+
+        report = json.loads(profiler.dump())['stages']
+        self.assertEqual(report[3]['items'], 5)
+        self.assertTrue('Stage' in str(profiler))
+
+        profiler.reset()
+        self.assertEqual(broadcast_stats.num_items, 0)
+
+    def test_queue_wait(self):
+        profiler = Profiler()
+
+        @coroutine
+        def slow():
+            while True:
+                yield
+                time.sleep(1e-3)
+
+        with profiler:
+            pipeline = queue(slow(), maxsize=1)
+        inject(range(10), pipeline)
+
+        self.assertGreater(profiler.stages[1].wait, 0)
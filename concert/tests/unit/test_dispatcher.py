@@ -24,3 +24,92 @@ class TestDispatcher(TestCase):
         self.dispatcher.send(self, 'foo')
         time.sleep(SLEEP_TIME)
         self.assertFalse(self.checker.visited)
+
+    def test_order(self):
+        received = []
+        self.dispatcher.subscribe(self, 'foo', lambda sender: received.append(len(received)))
+        for i in range(10):
+            self.dispatcher.send(self, 'foo')
+        time.sleep(SLEEP_TIME)
+        self.assertEqual(received, range(10))
+
+    def test_slow_subscriber(self):
+        def slow(sender):
+            time.sleep(10 * SLEEP_TIME)
+
+        self.dispatcher.subscribe(self, 'slow', slow)
+        self.dispatcher.subscribe(self, 'foo', self.checker.visit)
+        self.dispatcher.send(self, 'slow')
+        self.dispatcher.send(self, 'foo')
+        time.sleep(SLEEP_TIME)
+        self.assertTrue(self.checker.visited)
+
+    def test_limit(self):
+        def slow(sender):
+            time.sleep(SLEEP_TIME / 10)
+
+        self.dispatcher.subscribe(self, 'drop', slow)
+        self.dispatcher.subscribe(self, 'coalesce', slow)
+        self.dispatcher.limit(self, 'drop', 1)
+        self.dispatcher.limit(self, 'coalesce', 1, policy='coalesce')
+
+        for i in range(5):
+            self.dispatcher.send(self, 'drop')
+            self.dispatcher.send(self, 'coalesce')
+        time.sleep(SLEEP_TIME)
+
+        drop = self.dispatcher.topic(self, 'drop')
+        coalesce = self.dispatcher.topic(self, 'coalesce')
+        self.assertEqual(drop.num_sent, 5)
+        self.assertGreater(drop.num_dropped, 0)
+        self.assertEqual(drop.num_delivered + drop.num_dropped, 5)
+        self.assertGreater(coalesce.num_coalesced, 0)
+        self.assertEqual(coalesce.num_delivered + coalesce.num_coalesced, 5)
+
+        with self.assertRaises(ValueError):
+            self.dispatcher.limit(self, 'foo', 1, policy='foo')
+
+    def test_coalesce(self):
+        def slow(sender):
+            time.sleep(2 * SLEEP_TIME)
+
+        for policy in ('drop', 'coalesce'):
+            self.dispatcher.subscribe(self, policy, slow)
+            self.dispatcher.limit(self, policy, 1, policy=policy)
+            self.dispatcher.send(self, policy)
+
+        # First ones are being delivered, the second ones wait
+        time.sleep(SLEEP_TIME / 5)
+        for policy in ('drop', 'coalesce'):
+            self.dispatcher.send(self, policy)
+
+        time.sleep(1.5 * SLEEP_TIME)
+        for policy in ('drop', 'coalesce'):
+            self.dispatcher.send(self, policy)
+        time.sleep(4 * SLEEP_TIME)
+
+        drop = self.dispatcher.topic(self, 'drop')
+        coalesce = self.dispatcher.topic(self, 'coalesce')
+        self.assertEqual(coalesce.num_delivered, 2)
+        self.assertEqual(coalesce.num_coalesced, 1)
+        # The waiting delivery was refreshed by the last send
+        self.assertLess(coalesce.max_latency, drop.max_latency)
+
+    def test_block(self):
+        received = []
+        self.dispatcher.subscribe(self, 'foo', lambda sender: received.append(sender))
+        self.dispatcher.limit(self, 'foo', 1, policy='block')
+        for i in range(5):
+            self.dispatcher.send(self, 'foo')
+        time.sleep(SLEEP_TIME)
+        self.assertEqual(len(received), 5)
+
+    def test_statistics(self):
+        self.dispatcher.subscribe(self, 'foo', self.checker.visit)
+        self.dispatcher.send(self, 'foo')
+        time.sleep(SLEEP_TIME)
+        topic = self.dispatcher.topic(self, 'foo')
+        self.assertEqual(topic.num_delivered, 1)
+        self.assertEqual(topic.depth, 0)
+        self.assertEqual(self.dispatcher.num_delivered, 1)
+        self.assertGreaterEqual(self.dispatcher.max_latency, self.dispatcher.mean_latency)
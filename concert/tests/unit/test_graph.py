@@ -0,0 +1,121 @@
+import numpy as np
+from concert.coroutines.base import inject
+from concert.coroutines.filters import absorptivity, batch, flat_correct, process
+from concert.coroutines.graph import Graph, GraphError
+from concert.coroutines.sinks import Accumulate, Result
+from concert.tests import TestCase
+
+
+class TestGraph(TestCase):
+
+    def setUp(self):
+        super(TestGraph, self).setUp()
+        self.calls = 0
+        self.graph = Graph()
+        self.first = Accumulate()
+        self.second = Accumulate()
+
+    def count(self, item):
+        self.calls += 1
+        return item * 2
+
+    def test_chain(self):
+        self.graph.add_filter('double', process, self.count)
+        self.graph.add_filter('absorptivity', absorptivity)
+        self.graph.add_sink('result', self.first)
+        self.graph.chain('double', 'absorptivity', 'result')
+
+        inject(np.ones((3, 2)), self.graph())
+        np.testing.assert_almost_equal(self.first.items, -np.log(2 * np.ones((3, 2))))
+
+    def test_branches(self):
+        self.graph.add_filter('double', process, self.count)
+        self.graph.add_sink('first', self.first)
+        self.graph.add_sink('second', self.second)
+        self.graph.connect('double', 'first')
+        self.graph.connect('double', 'second')
+        self.graph.add_sink('raw', Result())
+
+        inject(range(3), self.graph())
+        self.assertEqual(self.first.items, [0, 2, 4])
+        self.assertEqual(self.second.items, [0, 2, 4])
+        self.assertEqual(self.calls, 3)
+
+    def test_fusion(self):
+        flat = np.ones((2, 2)) * 2
+        self.graph.add_filter('flat-1', flat_correct, flat)
+        self.graph.add_filter('flat-2', flat_correct, flat)
+        self.graph.add_filter('flat-3', flat_correct, np.ones((2, 2)))
+        self.graph.add_filter('double-1', process, self.count)
+        self.graph.add_filter('double-2', process, self.count)
+        self.graph.add_sink('first', self.first)
+        self.graph.add_sink('second', self.second)
+        self.graph.add_sink('third', Result())
+        self.graph.chain('flat-1', 'double-1', 'first')
+        self.graph.chain('flat-2', 'double-2', 'second')
+        self.graph.connect('flat-3', 'third')
+
+        self.assertEqual(sorted(map(sorted, self.graph.fused)),
+                         [['double-1', 'double-2'], ['flat-1', 'flat-2']])
+        inject(np.ones((3, 2, 2)), self.graph())
+        self.assertEqual(self.calls, 3)
+        np.testing.assert_almost_equal(self.first.items, np.ones((3, 2, 2)))
+        np.testing.assert_almost_equal(self.second.items, np.ones((3, 2, 2)))
+
+    def test_taps(self):
+        self.graph.add_filter('double', process, self.count)
+        self.graph.add_tap('preview')
+        self.graph.add_sink('first', self.first)
+        self.graph.connect('double', 'first')
+        self.graph.connect('double', 'preview')
+
+        inject(range(2), self.graph())
+        self.assertEqual(self.first.items, [0, 2])
+
+        # Reuse with an attached consumer
+        self.graph.attach('preview', self.second)
+        inject(range(2), self.graph())
+        self.assertEqual(self.second.items, [0, 2])
+
+        self.graph.detach('preview', self.second)
+        inject(range(1), self.graph())
+        self.assertEqual(self.second.items, [0, 2])
+
+        # Filters feeding only unused taps are left out
+        self.graph.add_filter('unused', process, self.count)
+        self.graph.connect('unused', 'preview')
+        self.calls = 0
+        inject(range(2), self.graph())
+        self.assertEqual(self.calls, 2)
+
+    def test_close(self):
+        self.graph.add_filter('batch', batch, 2)
+        self.graph.add_sink('first', self.first)
+        self.graph.connect('batch', 'first')
+
+        running = self.graph()
+        inject(np.ones((3, 2)), running)
+        self.assertEqual(len(self.first.items), 1)
+        running.close()
+        self.assertEqual([len(item) for item in self.first.items], [2, 1])
+
+    def test_errors(self):
+        self.graph.add_filter('double', process, self.count)
+        self.graph.add_sink('first', self.first)
+        self.graph.add_tap('tap')
+
+        self.assertRaises(GraphError, self.graph.add_sink, 'first', self.first)
+        self.assertRaises(GraphError, self.graph.connect, 'double', 'foo')
+        self.assertRaises(GraphError, self.graph.connect, 'first', 'double')
+        self.assertRaises(GraphError, self.graph.connect, 'double', 'double')
+        self.assertRaises(GraphError, self.graph.attach, 'double', self.second)
+        self.assertRaises(GraphError, self.graph)
+
+        self.graph.connect('double', 'tap')
+        self.graph.connect('tap', 'first')
+        self.assertRaises(GraphError, self.graph.connect, 'first', 'tap')
+        self.assertRaises(GraphError, self.graph.connect, 'tap', 'double')
+        self.assertRaises(GraphError, self.graph.connect, 'double', 'tap')
+
+        self.graph.remove('first')
+        self.assertEqual(self.graph.edges, [('double', 'tap')])
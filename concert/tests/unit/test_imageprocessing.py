@@ -1,7 +1,8 @@
 import numpy as np
 from concert.quantities import q
-from concert.imageprocessing import compute_rotation_axis, normalize
+from concert.imageprocessing import Backprojector, compute_rotation_axis, normalize
 from concert.tests import suppressed_logging, slow, assert_almost_equal
+from concert.tests.util.phantom import disks_sinogram
 
 
 @slow
@@ -58,3 +59,58 @@ def test_rescale():
 
     run_test(0, 1)
     run_test(-10, 47.5)
+
+
+def test_backprojector():
+    disks = [(20, -10, 8), (-15, 5, 12)]
+    sinogram = disks_sinogram(128, 100, 50, disks)
+    backprojector = Backprojector(128, 100, 50, block_size=7)
+    reco = backprojector(sinogram)
+    inside = reco > reco.max() / 2
+
+    assert reco.shape == (100, 100)
+    assert reco.dtype == np.float32
+    for x, y, radius in disks:
+        disk = (np.mgrid[-50:50, -50:50] - np.array([y, x])[:, None, None]) ** 2
+        disk = disk.sum(axis=0) < radius ** 2
+        assert inside[disk].mean() > 0.95
+        inside[disk] = False
+    assert inside.sum() == 0
+
+    # Uncached interpolation tables and slice parallelism give the same result
+    import concert.imageprocessing
+    cache_size = concert.imageprocessing.BACKPROJECTION_CACHE_SIZE
+    concert.imageprocessing.BACKPROJECTION_CACHE_SIZE = 0
+    try:
+        uncached = Backprojector(128, 100, 50, block_size=5, num_threads=2)
+        np.testing.assert_almost_equal(uncached(sinogram), reco, decimal=3)
+        precise = Backprojector(128, 100, 50, dtype=np.float64)(sinogram)
+        assert precise.dtype == np.float64
+        assert np.abs(precise - reco).max() < 1e-2 * reco.max()
+        slices = uncached.reconstruct(np.array([sinogram, 2 * sinogram]))
+        np.testing.assert_almost_equal(slices[1], 2 * slices[0])
+        # The threads are reused
+        np.testing.assert_almost_equal(uncached.reconstruct(np.array([sinogram])), slices[:1])
+        uncached.close()
+    finally:
+        concert.imageprocessing.BACKPROJECTION_CACHE_SIZE = cache_size
+
+    # Least recently used tables are dropped when they take too many bytes
+    tables = concert.imageprocessing._BACKPROJECTION_TABLES
+    tables.clear()
+    nbytes = concert.imageprocessing._nbytes(Backprojector(16, 20, 10, block_size=1)._tables)
+    concert.imageprocessing.BACKPROJECTION_CACHE_SIZE = 2 * nbytes
+    try:
+        first, second, third = [Backprojector(16, 20, 10, block_size=size) for size in (2, 4, 8)]
+        assert [key[3] for key in tables] == [4, 8]
+        Backprojector(16, 20, 10, block_size=4)
+        Backprojector(16, 20, 10, block_size=2)
+        assert [key[3] for key in tables] == [4, 2]
+        assert sum(size for (cached, size) in tables.values()) <= 2 * nbytes
+    finally:
+        concert.imageprocessing.BACKPROJECTION_CACHE_SIZE = cache_size
+        tables.clear()
+
+    # Off-center rotation axis
+    assert Backprojector(128, 100, 30).size == 60
+    np.testing.assert_raises(ValueError, Backprojector, 128, 100, 100)
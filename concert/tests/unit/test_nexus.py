@@ -0,0 +1,60 @@
+import os.path as op
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from concert.tests import TestCase
+
+try:
+    import h5py
+except ImportError:
+    h5py = None
+
+
+@unittest.skipIf(h5py is None, 'h5py is not installed')
+class TestHdf5Walker(TestCase):
+
+    def setUp(self):
+        super(TestHdf5Walker, self).setUp()
+        self.path = tempfile.mkdtemp()
+        self.file = h5py.File(op.join(self.path, 'frames.h5'), 'w')
+        self.frames = [np.ones((3, 4), dtype=np.uint16) * i for i in range(11)]
+
+    def tearDown(self):
+        self.file.close()
+        shutil.rmtree(self.path)
+
+    def walker(self, **kwargs):
+        from concert.ext.nexus import Hdf5Walker
+
+        return Hdf5Walker(self.file, **kwargs)
+
+    def test_preallocation(self):
+        coro = self.walker(num_images=20, block_size=4).write(dsetname='preallocated')
+        coro.send(self.frames[0])
+        self.assertEqual(self.file['preallocated'].shape, (20, 3, 4))
+
+        for frame in self.frames[1:]:
+            coro.send(frame)
+        coro.close()
+        # Truncated to the frames with the partial last block
+        np.testing.assert_equal(self.file['preallocated'][:], self.frames)
+
+    def test_growth(self):
+        coro = self.walker(block_size=2).write(dsetname='growing')
+        shapes = []
+        for frame in self.frames:
+            coro.send(frame)
+            shapes.append(self.file['growing'].shape[0])
+        coro.close()
+
+        # The data set doubles when a block does not fit
+        self.assertEqual(sorted(set(shapes)), [2, 4, 8, 16])
+        np.testing.assert_equal(self.file['growing'][:], self.frames)
+
+    def test_shape_mismatch(self):
+        coro = self.walker(block_size=4).write(dsetname='mismatch')
+        coro.send(self.frames[0])
+        with self.assertRaises(ValueError):
+            coro.send(self.frames[1][:2])
+        np.testing.assert_equal(self.file['mismatch'][:], self.frames[:1])
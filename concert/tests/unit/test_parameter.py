@@ -1,12 +1,12 @@
 import time
 import numpy as np
 from concert.quantities import q
-from concert.tests import TestCase
+from concert.tests import TestCase, VisitChecker
 from concert.base import (Parameterizable, Parameter, Quantity, State, transition, check,
                           SoftLimitError, LockError, ParameterError, UnitError,
-                          WriteAccessError)
+                          WriteAccessError, register_names)
 from concert.devices.dummy import SelectionDevice
-from concert.async import WaitError
+from concert.async import async, dispatcher, WaitError
 
 
 class BaseDevice(Parameterizable):
@@ -154,6 +154,35 @@ class AccessorCheckDevice(Parameterizable):
         return self._value
 
 
+class BatchDevice(BaseDevice):
+
+    foo = Quantity(q.mm, lower=-10 * q.mm, upper=10 * q.mm)
+    bar = Quantity(q.mm)
+
+    def __init__(self):
+        super(BatchDevice, self).__init__()
+        self.values = {'foo': 0 * q.mm, 'bar': 0 * q.mm}
+        self.num_calls = 0
+
+    def _get_foo(self):
+        return self.values['foo']
+
+    def _get_bar(self):
+        return self.values['bar']
+
+    def _set_foo(self, value):
+        self.values['foo'] = value
+
+    def _get_many(self, names):
+        self.num_calls += 1
+        # Values in other units are converted, missing ones are read one by one
+        return dict((name, self.values[name].to(q.m)) for name in names if name != 'bar')
+
+    def _set_many(self, values):
+        self.num_calls += 1
+        self.values.update(values)
+
+
 class TestDescriptor(TestCase):
 
     def setUp(self):
@@ -179,6 +208,30 @@ class TestDescriptor(TestCase):
         with self.assertRaises(WaitError):
             self.foo1['foo'].wait(0 * q.m, timeout=1e-5 * q.s)
 
+        with self.assertRaises(WaitError):
+            self.foo1['foo'].wait(2 * q.m, eps=1e-3 * q.m, timeout=1e-2 * q.s)
+
+    def test_wait_notification(self):
+        @async
+        def set_later():
+            time.sleep(0.05)
+            self.foo1.foo = 3 * q.m
+
+        start = time.time()
+        future = set_later()
+        # Waiting must not take the whole sleep time
+        self.foo1['foo'].wait(3 * q.m, sleep_time=10 * q.s, timeout=5 * q.s)
+        future.join()
+        self.assertLess(time.time() - start, 1)
+
+    def test_changed_message(self):
+        checker = VisitChecker()
+        dispatcher.subscribe(self.foo1['foo'], 'changed', checker.visit)
+        self.foo1.foo = 2 * q.m
+        time.sleep(0.05)
+        dispatcher.unsubscribe(self.foo1['foo'], 'changed', checker.visit)
+        self.assertTrue(checker.visited)
+
 
 class TestParameterizable(TestCase):
 
@@ -212,6 +265,81 @@ class TestParameterizable(TestCase):
         self.device.restore().join()
         self.assertEqual(self.device.foo, 1 * q.mm)
 
+    def test_restore_locked(self):
+        self.device.foo = 1 * q.mm
+        self.device.param = 15
+        self.device.stash().join()
+        self.device.foo = 2 * q.mm
+        self.device.param = 16
+        self.device['param'].lock()
+
+        # The unlocked parameters are restored one by one
+        with self.assertRaises(LockError):
+            self.device.restore().join()
+        self.assertEqual(self.device.foo, 1 * q.mm)
+        self.assertEqual(self.device.param, 16)
+
+        # The value of the locked one is kept for later
+        self.device['param'].unlock()
+        self.device['param'].restore().join()
+        self.assertEqual(self.device.param, 15)
+
+    def test_get_many(self):
+        self.device.foo = 1 * q.mm
+        self.device.param = 15
+        values = self.device.get_many(['foo', 'param']).result()
+        self.assertEqual(values, {'foo': 1 * q.mm, 'param': 15})
+
+        with self.assertRaises(ParameterError):
+            self.device.get_many(['foo', 'baz']).result()
+
+    def test_set_many(self):
+        self.device.set_many({'foo': 1 * q.mm, 'param': 15}).join()
+        self.assertEqual(self.device.foo, 1 * q.mm)
+        self.assertEqual(self.device.param, 15)
+
+        with self.assertRaises(UnitError):
+            self.device.set_many({'foo': 1 * q.s}).join()
+
+        self.device['param'].lock()
+
+        with self.assertRaises(LockError):
+            self.device.set_many({'foo': 2 * q.mm, 'param': 16}).join()
+
+        # Nothing is written if any of the values is invalid
+        self.assertEqual(self.device.foo, 1 * q.mm)
+
+    def test_native_get_many(self):
+        device = BatchDevice()
+        device.values['foo'] = 2 * q.mm
+        device.values['bar'] = 3 * q.mm
+        self.assertEqual(device.get_many().result(), {'foo': 2 * q.mm, 'bar': 3 * q.mm})
+        self.assertEqual(device.num_calls, 1)
+
+    def test_native_set_many(self):
+        device = BatchDevice()
+        changed = []
+        dispatcher.subscribe(device['foo'], 'changed', lambda sender: changed.append(sender))
+        device.set_many({'foo': 1 * q.mm, 'bar': 2 * q.m}).join()
+        self.assertEqual(device.num_calls, 1)
+        self.assertEqual(device.values, {'foo': 1 * q.mm, 'bar': 2000 * q.mm})
+
+        with self.assertRaises(SoftLimitError):
+            device.set_many({'foo': 20 * q.mm}).join()
+
+        self.assertEqual(device.num_calls, 1)
+        time.sleep(0.01)
+        self.assertEqual(changed, [device['foo']])
+
+    def test_native_saving(self):
+        device = BatchDevice()
+        device.foo = 1 * q.mm
+        device.stash().join()
+        device.foo = 2 * q.mm
+        device.restore().join()
+        self.assertEqual(device.foo, 1 * q.mm)
+        self.assertEqual(device.num_calls, 2)
+
     def test_manual_lock(self):
         self.device['foo'].lock()
         self.assertTrue(self.device['foo'].locked)
@@ -322,8 +450,93 @@ class TestParameter(TestCase):
     def test_name_for_log(self):
         device = FooDevice(0 * q.mm)
         device.foo = 1 * q.mm
+        # Setting a parameter does not guess the name anymore
+        self.assertEqual(device.name_for_log, None)
+
+        self.assertEqual(register_names(locals()), ['device'])
         self.assertEqual(device.name_for_log, 'device')
 
+        # Explicit names are kept
+        other = FooDevice(0 * q.mm)
+        other.name_for_log = 'explicit'
+        self.assertEqual(register_names(locals()), [])
+        self.assertEqual(other.name_for_log, 'explicit')
+
+
+class TestCache(TestCase):
+
+    def setUp(self):
+        super(TestCache, self).setUp()
+        self.num_reads = 0
+        self.device = FooDevice(0 * q.mm)
+        self.device['foo'].cache_ttl = 1 * q.s
+        original = self.device._get_foo
+
+        def read():
+            self.num_reads += 1
+            return original()
+
+        self.device._get_foo = read
+
+    def test_disabled(self):
+        self.device['foo'].cache_ttl = None
+        self.device.foo
+        self.device.foo
+        self.assertEqual(self.num_reads, 2)
+        self.assertEqual(self.device['foo'].cache_hits, 0)
+
+    def test_hits(self):
+        self.assertEqual(self.device.foo, 0 * q.mm)
+        self.assertEqual(self.device.foo, 0 * q.mm)
+        self.assertEqual(self.device['foo'].get().result(), 0 * q.mm)
+        self.assertEqual(self.num_reads, 1)
+        self.assertEqual(self.device['foo'].cache_hits, 2)
+        self.assertEqual(self.device['foo'].cache_misses, 1)
+
+    def test_expiration(self):
+        self.device['foo'].cache_ttl = 1 * q.ms
+        self.device.foo
+        time.sleep(0.01)
+        self.device.foo
+        self.assertEqual(self.num_reads, 2)
+
+    def test_get_expiration(self):
+        self.device['foo'].cache_ttl = 1 * q.ms
+        self.assertEqual(self.device['foo'].get().result(), 0 * q.mm)
+        time.sleep(0.01)
+        self.device._value = 1 * q.mm
+        self.assertEqual(self.device['foo'].get().result(), 1 * q.mm)
+        self.assertEqual(self.num_reads, 2)
+        self.assertEqual(self.device['foo'].cache_hits, 0)
+
+    def test_invalidation(self):
+        self.device.foo
+        self.device.foo = 1 * q.mm
+        self.assertEqual(self.device.foo, 1 * q.mm)
+        self.assertEqual(self.num_reads, 2)
+
+        self.device._value = 2 * q.mm
+        self.device['foo'].notify()
+        self.assertEqual(self.device.foo, 2 * q.mm)
+
+        self.device['foo'].invalidate()
+        self.device.foo
+        self.assertEqual(self.num_reads, 4)
+
+    def test_external_limits(self):
+        calls = []
+
+        def get_lower():
+            calls.append(None)
+            return -5 * q.mm
+
+        device = ExternalLimitDevice(0 * q.mm)
+        device['foo']._external_lower_getter = get_lower
+        device['foo'].cache_ttl = 1 * q.s
+        device['foo'].lower
+        device['foo'].lower
+        self.assertEqual(len(calls), 1)
+
 
 class TestQuantity(TestCase):
 
@@ -0,0 +1,271 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+import traceback
+import numpy as np
+import os.path as op
+from concert.coroutines.base import inject
+from concert.readers import (Prefetcher, RawSequenceReader, SequenceReaderError,
+                             TiffSequenceReader)
+from concert.storage import DirectoryWalker, write_images
+from concert.tests import TestCase
+from concert.writers import ALIGNMENT, DirectRawWriter, RawWriter
+
+
+class CountingReader(TiffSequenceReader):
+
+    def __init__(self, *args, **kwargs):
+        self.opened = []
+        self.closed = 0
+        super(CountingReader, self).__init__(*args, **kwargs)
+
+    def _open_real(self, filename):
+        self.opened.append(op.basename(filename))
+        return super(CountingReader, self)._open_real(filename)
+
+    def _close_real(self):
+        self.closed += 1
+        super(CountingReader, self)._close_real()
+
+
+class TestFileSequenceReader(TestCase):
+
+    def setUp(self):
+        super(TestFileSequenceReader, self).setUp()
+        self.path = tempfile.mkdtemp()
+        self.images = [np.ones((4, 4), dtype=np.uint16) * i for i in range(10)]
+        # Files with 3, 3, 3 and 1 images
+        coro = write_images(prefix=op.join(self.path, 'image_{:>03}.tif'), bytes_per_file=3 * 32)
+        inject(self.images, coro)
+        coro.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_read(self):
+        with CountingReader(self.path) as reader:
+            np.testing.assert_equal(reader.read(7), self.images[7])
+            # Index is built only up to the needed file
+            self.assertEqual(reader.opened, ['image_000.tif', 'image_001.tif', 'image_002.tif'])
+            np.testing.assert_equal(reader.read(1), self.images[1])
+            self.assertEqual(len(reader.opened), 3)
+            np.testing.assert_equal(reader.read(-1), self.images[-1])
+            self.assertEqual(reader.num_images, 10)
+            for i in range(10):
+                np.testing.assert_equal(reader.read(i), self.images[i])
+
+            with self.assertRaises(SequenceReaderError):
+                reader.read(10)
+            with self.assertRaises(SequenceReaderError):
+                reader.read(-11)
+
+    def test_max_open(self):
+        reader = CountingReader(self.path, max_open=2)
+        for i in (0, 3, 0, 6, 0, 3):
+            reader.read(i)
+        # The file of image 3 was the least recently used one when image 6 was read
+        self.assertEqual(reader.opened, ['image_000.tif', 'image_001.tif', 'image_002.tif',
+                                         'image_001.tif'])
+        self.assertEqual(reader.closed, 2)
+        reader.close()
+        self.assertEqual(reader.closed, 4)
+
+    def test_read_range(self):
+        with TiffSequenceReader(self.path) as reader:
+            np.testing.assert_equal(reader.read_range(), self.images)
+            np.testing.assert_equal(reader.read_range(2, 9, 3), self.images[2:9:3])
+            np.testing.assert_equal(reader.read_range(-2), self.images[-2:])
+            with self.assertRaises(SequenceReaderError):
+                reader.read_range(5, 5)
+
+    def test_index_file(self):
+        index_file = op.join(self.path, 'index.json')
+        with CountingReader(self.path, index_file=index_file) as reader:
+            self.assertEqual(reader.num_images, 10)
+        self.assertTrue(op.exists(index_file))
+
+        with CountingReader(self.path, index_file=index_file) as reader:
+            self.assertEqual(reader.num_images, 10)
+            self.assertEqual(reader.opened, [])
+            np.testing.assert_equal(reader.read(9), self.images[9])
+            self.assertEqual(reader.opened, ['image_003.tif'])
+
+        # Changed files are counted again, the two images are appended
+        coro = write_images(prefix=op.join(self.path, 'image_003.tif'))
+        inject(self.images[:2], coro)
+        coro.close()
+        with CountingReader(self.path, index_file=index_file) as reader:
+            self.assertEqual(reader.num_images, 12)
+            self.assertEqual(reader.opened, ['image_003.tif'])
+
+    def test_memmap(self):
+        with TiffSequenceReader(self.path, memmap=True) as reader:
+            image = reader.read(4)
+            self.assertTrue(isinstance(image, np.memmap))
+            np.testing.assert_equal(image, self.images[4])
+
+        compressed = op.join(self.path, 'compressed')
+        coro = write_images(prefix=op.join(compressed, 'image_{:>03}.tif'), compression='zlib')
+        inject(self.images[:2], coro)
+        coro.close()
+        with TiffSequenceReader(compressed, memmap=True) as reader:
+            image = reader.read(1)
+            self.assertFalse(isinstance(image, np.memmap))
+            np.testing.assert_equal(image, self.images[1])
+
+    def test_prefetch(self):
+        with TiffSequenceReader(self.path, memmap=True) as reader:
+            prefetcher = reader.prefetch(1, 9, 2, num_ahead=2)
+            images = list(prefetcher)
+
+        np.testing.assert_equal(images, self.images[1:9:2])
+        self.assertFalse(isinstance(images[0], np.memmap))
+        self.assertEqual(prefetcher.num_images, 4)
+        self.assertEqual(prefetcher.num_bytes, 4 * 32)
+        self.assertGreater(prefetcher.throughput, 0)
+
+
+class TestPrefetcher(TestCase):
+
+    def test_order(self):
+        prefetcher = Prefetcher(lambda index: np.ones(3) * index, range(20), num_ahead=3)
+        np.testing.assert_equal([image[0] for image in prefetcher], range(20))
+
+    def test_stop_early(self):
+        read = []
+
+        def record(index):
+            read.append(index)
+            return np.ones(1)
+
+        iterator = iter(Prefetcher(record, range(100), num_ahead=2))
+        next(iterator)
+        iterator.close()
+        # The first image, the queued ones and at most one waiting to be queued
+        self.assertLessEqual(len(read), 4)
+
+    def test_throughput(self):
+        def read(index):
+            time.sleep(1e-2)
+            return np.ones(2 ** 17, dtype=np.uint8)
+
+        prefetcher = Prefetcher(read, range(4), num_ahead=1)
+        for image in prefetcher:
+            # A slow consumer does not lower the read bandwidth
+            time.sleep(5e-2)
+
+        self.assertGreater(prefetcher.throughput, 5)
+        self.assertLess(prefetcher.read_time, 0.2)
+
+    def test_error(self):
+        def fail(index):
+            if index == 2:
+                raise RuntimeError('broken file')
+            return np.ones(1)
+
+        try:
+            list(Prefetcher(fail, range(5)))
+            self.fail('RuntimeError not raised')
+        except RuntimeError:
+            # The traceback leads to the failing read
+            names = [entry[2] for entry in traceback.extract_tb(sys.exc_info()[2])]
+            self.assertIn('fail', names)
+
+        with self.assertRaises(ValueError):
+            Prefetcher(fail, range(5), num_ahead=0)
+
+
+class TestRawFiles(TestCase):
+
+    def setUp(self):
+        super(TestRawFiles, self).setUp()
+        self.path = tempfile.mkdtemp()
+        self.images = [np.arange(i, i + 15, dtype=np.uint16).reshape(3, 5) for i in range(10)]
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def write(self, writer, images=None, **kwargs):
+        coro = write_images(writer=writer, prefix=op.join(self.path, 'image_{:>03}.npy'),
+                            **kwargs)
+        inject(self.images if images is None else images, coro)
+        coro.close()
+
+    def check(self, images=None):
+        images = self.images if images is None else images
+        with RawSequenceReader(self.path) as reader:
+            self.assertEqual(reader.num_images, len(images))
+            for i, image in enumerate(images):
+                np.testing.assert_equal(reader.read(i), image)
+
+    def test_write(self):
+        self.write(RawWriter, bytes_per_file=4 * 30)
+        self.assertEqual(len(os.listdir(self.path)), 3)
+        self.assertEqual(op.getsize(op.join(self.path, 'image_000.npy')), ALIGNMENT + 4 * 30)
+        np.testing.assert_equal(np.load(op.join(self.path, 'image_002.npy')), self.images[8:])
+        self.check()
+
+    def test_direct(self):
+        # Images which do not fill whole blocks and more data than fits into the buffer
+        images = [np.ones((1000, 1001), dtype=np.float32) * i for i in range(5)]
+        self.write(DirectRawWriter, images=images, bytes_per_file=10 * images[0].nbytes)
+        self.check(images=images)
+
+    def test_append(self):
+        filename = op.join(self.path, 'images.npy')
+        for images in (self.images[:3], self.images[3:]):
+            writer = RawWriter(filename, 0, append=True)
+            for image in images:
+                writer.write(image)
+            writer.close()
+
+        self.check()
+
+    def test_unclosed(self):
+        # Count every image, the rest of the preallocated file is not read
+        size = self.images[0].nbytes
+        for writer_class in (RawWriter, DirectRawWriter):
+            filename = op.join(self.path, 'images.npy')
+            writer = writer_class(filename, 10 * size, buffer_size=size)
+            for image in self.images[:3]:
+                writer.write(image)
+
+            # The direct writer has the last images still in its buffer
+            num_images = 3 if writer_class is RawWriter else 0
+            self.check(images=self.images[:num_images])
+            writer.close()
+            writer.close()
+            self.check(images=self.images[:3])
+            os.remove(filename)
+
+        # Only the images counted in the header are appended to
+        writer = RawWriter(filename, 10 * size, buffer_size=2 * size)
+        for image in self.images[:3]:
+            writer.write(image)
+        RawWriter(filename, 0, append=True).close()
+        self.check(images=self.images[:2])
+        writer.close()
+
+    def test_walker(self):
+        walker = DirectoryWalker(writer=RawWriter, dsetname='frame_{:>06}.npy', root=self.path)
+        walker.write(self.images[:2])
+        self.check(images=self.images[:2])
+
+    def test_errors(self):
+        writer = RawWriter(op.join(self.path, 'images.npy'), 0)
+        writer.write(self.images[0])
+        with self.assertRaises(ValueError):
+            writer.write(self.images[0].astype(np.float32))
+        with self.assertRaises(ValueError):
+            writer.write(self.images[0][:2])
+        writer.close()
+
+        with self.assertRaises(ValueError):
+            RawWriter(op.join(self.path, 'images.npy'), 0, compression='zlib')
+
+        with open(op.join(self.path, 'images.npy'), 'w') as f:
+            f.write('foo')
+        with self.assertRaises(SequenceReaderError):
+            RawSequenceReader(self.path).read(0)
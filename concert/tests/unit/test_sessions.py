@@ -1,8 +1,13 @@
 """Test sessions."""
+import os
+import shutil
+import tempfile
 import time
 from concert.quantities import q
+from concert.devices.base import Device
+from concert.session import management
 from concert.session.utils import check_emergency_stop
-from concert.tests import suppressed_logging, slow
+from concert.tests import TestCase, suppressed_logging, slow
 
 
 @slow
@@ -35,3 +40,65 @@ def test_check_emergency_stop():
 
     # We aborted and cleared, thus are ready to abort again.
     assert clb.abort
+
+
+SESSION = '''"""Test session"""
+from concert.devices.base import LazyDevice
+from concert.devices.motors.dummy import LinearMotor
+
+motor = LinearMotor()
+lazy = LazyDevice(LinearMotor)
+'''
+
+
+class TestLoad(TestCase):
+
+    def setUp(self):
+        super(TestLoad, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'session.py')
+        self.cached_path = management._CACHED_PATH
+        management._CACHED_PATH = self.directory
+
+        with open(self.filename, 'w') as session_file:
+            session_file.write(SESSION)
+
+    def tearDown(self):
+        management._CACHED_PATH = self.cached_path
+        shutil.rmtree(self.directory)
+
+    def test_load(self):
+        module = management.load(self.filename, from_file=True)
+        self.assertEqual(module.__doc__, 'Test session')
+        self.assertEqual(module.motor.name_for_log, 'motor')
+        self.assertEqual([names for (names, duration) in module._device_times], ['motor'])
+        self.assertTrue(os.path.exists(management.cache_path(self.filename)))
+
+        # Cached code is used
+        module = management.load(self.filename, from_file=True)
+        self.assertTrue(isinstance(module.motor, Device))
+
+    def test_lazy_device(self):
+        module = management.load(self.filename, from_file=True)
+        lazy = module.lazy
+        self.assertFalse(lazy.constructed)
+        self.assertFalse(isinstance(lazy, Device))
+        self.assertEqual(lazy.name_for_log, 'lazy')
+
+        lazy.position = 1 * q.mm
+        self.assertTrue(lazy.constructed)
+        self.assertTrue(isinstance(lazy, Device))
+        self.assertEqual(lazy.device.name_for_log, 'lazy')
+        self.assertEqual(lazy['position'].get().result(), 1 * q.mm)
+        self.assertIsNotNone(lazy.construction_time)
+
+    def test_remove_cache(self):
+        management.load(self.filename, from_file=True)
+        management.move('session', 'moved')
+        self.assertFalse(os.path.exists(management.cache_path(self.filename)))
+
+        moved = management.path('moved')
+        management.load(moved, from_file=True)
+        management.remove('moved')
+        self.assertFalse(os.path.exists(moved))
+        self.assertFalse(os.path.exists(management.cache_path(moved)))
@@ -1,5 +1,8 @@
-from concert.base import State, StateError
+import threading
+import time
+from concert.base import State, StateError, transition
 from concert.devices.base import Device
+from concert.quantities import q
 from concert.tests import TestCase
 
 
@@ -12,6 +15,10 @@ class ImplicitSoftwareDevice(Device):
 
     state = State(default='standby')
 
+    @transition(target='moved')
+    def move(self):
+        pass
+
 
 class CustomizedDevice(Device):
 
@@ -55,3 +62,27 @@ class TestState(TestCase):
     def test_customized(self):
         device = CustomizedDevice()
         self.assertEqual(device.state, 'custom')
+
+    def test_transition_notifies(self):
+        device = ImplicitSoftwareDevice()
+        notifier = device['state'].notifier
+        count = notifier.count
+        woken = []
+
+        # Waiting on the notifier does not poll, only the transition can wake it up
+        waiter = threading.Thread(target=lambda: woken.append(notifier.wait(count, timeout=5)))
+        waiter.start()
+        time.sleep(0.01)
+        start = time.time()
+        device.move()
+        waiter.join()
+        self.assertEqual(woken, [True])
+        self.assertLess(time.time() - start, 1)
+        device['state'].wait('moved', timeout=1 * q.s)
+
+    def test_transition_invalidates_cache(self):
+        device = ImplicitSoftwareDevice()
+        device['state'].cache_ttl = 10 * q.s
+        self.assertEqual(device['state'].get().result(), 'standby')
+        device.move()
+        self.assertEqual(device['state'].get().result(), 'moved')
@@ -2,8 +2,11 @@ import tempfile
 import shutil
 import numpy as np
 import os.path as op
+from concert.buffers import BufferPool
 from concert.coroutines.base import inject
-from concert.storage import DummyWalker, DirectoryWalker, StorageError
+from concert.storage import (DummyWalker, DirectoryWalker, ParallelImageWriter, StorageError,
+                             read_tiff)
+from concert.writers import LibTiffWriter, RawWriter, TiffWriter
 from concert.tests import TestCase
 
 
@@ -92,3 +95,119 @@ class TestDirectoryWalker(TestCase):
         test_raises('bar-}')
         test_raises('bar-}{')
         test_raises('bar-}{{}')
+
+    def test_parallel_write(self):
+        walker = DirectoryWalker(root=self.path, num_workers=2, compression='zlib')
+        walker.write([self.data * i for i in range(5)])
+
+        for i in range(5):
+            image = read_tiff(op.join(self.path, 'frame_{:>06}.tif'.format(i)))
+            np.testing.assert_equal(image, self.data * i)
+
+
+class TestParallelImageWriter(TestCase):
+
+    def setUp(self):
+        super(TestParallelImageWriter, self).setUp()
+        self.path = tempfile.mkdtemp()
+        self.prefix = op.join(self.path, 'image_{:>03}.tif')
+        self.images = [np.ones((4, 4), dtype=np.uint16) * i for i in range(10)]
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def write(self, writer, images):
+        coro = writer()
+        inject(images, coro)
+        coro.close()
+
+    def test_order(self):
+        writer = ParallelImageWriter(prefix=self.prefix, start_index=5, num_workers=3)
+        self.write(writer, self.images)
+
+        self.assertEqual(writer.num_images, 10)
+        self.assertEqual(writer.num_files, 10)
+        self.assertEqual(writer.num_bytes, 10 * 32)
+        self.assertGreater(writer.throughput, 0)
+        for i, image in enumerate(self.images):
+            np.testing.assert_equal(read_tiff(self.prefix.format(i + 5)), image)
+
+    def test_chunks(self):
+        writer = ParallelImageWriter(prefix=self.prefix, bytes_per_file=4 * 32)
+        self.write(writer, self.images)
+
+        self.assertEqual(writer.num_files, 3)
+        np.testing.assert_equal(read_tiff(self.prefix.format(0)), self.images[:4])
+        np.testing.assert_equal(read_tiff(self.prefix.format(1)), self.images[4:8])
+        np.testing.assert_equal(read_tiff(self.prefix.format(2)), self.images[8:])
+
+    def test_compression(self):
+        images = [np.zeros((64, 64), dtype=np.uint16)] * 2
+        uncompressed = op.join(self.path, 'raw_{}.tif')
+        self.write(ParallelImageWriter(prefix=self.prefix, compression='zlib'), images)
+        self.write(ParallelImageWriter(prefix=uncompressed), images)
+
+        self.assertLess(op.getsize(self.prefix.format(0)), op.getsize(uncompressed.format(0)))
+        np.testing.assert_equal(read_tiff(self.prefix.format(0)), images[0])
+
+    def test_unavailable_compression(self):
+        for compression in ('lzw', ('foo', None)):
+            with self.assertRaises(ValueError):
+                ParallelImageWriter(prefix=self.prefix, compression=compression)
+            with self.assertRaises(ValueError):
+                TiffWriter(self.prefix.format(0), 0, compression=compression)
+        with self.assertRaises(ValueError):
+            DirectoryWalker(root=self.path, writer=RawWriter, compression='zlib')
+
+        # zlib without a level uses the default one
+        self.write(ParallelImageWriter(prefix=self.prefix, compression=('zlib', None)),
+                   [np.zeros((64, 64), dtype=np.uint16)])
+        self.assertLess(op.getsize(self.prefix.format(0)), 64 * 64 * 2)
+
+        # Unicode names from Python 2 callers
+        TiffWriter.check_compression(u'zlib')
+
+        # pylibtiff cannot set the level
+        with self.assertRaises(ValueError):
+            ParallelImageWriter(writer=LibTiffWriter, prefix=self.prefix,
+                                compression=('deflate', 9))
+
+    def test_reused_array(self):
+        image = np.zeros((4, 4), dtype=np.uint16)
+        writer = ParallelImageWriter(prefix=self.prefix)
+        coro = writer()
+        for i in range(4):
+            image[:] = i
+            coro.send(image)
+        coro.close()
+
+        for i in range(4):
+            np.testing.assert_equal(read_tiff(self.prefix.format(i)), i)
+
+    def test_pooled_buffers(self):
+        pool = BufferPool((4, 4), dtype=np.uint16, size=2, block=True)
+        writer = ParallelImageWriter(prefix=self.prefix)
+        coro = writer()
+        for i in range(4):
+            buf = pool.get()
+            buf[:] = i
+            coro.send(buf)
+            pool.release(buf)
+        coro.close()
+
+        self.assertEqual(pool.num_free, 2)
+        for i in range(4):
+            np.testing.assert_equal(read_tiff(self.prefix.format(i)), i)
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            ParallelImageWriter(prefix='image.tif')
+
+        class BrokenWriter(TiffWriter):
+            def write(self, image):
+                raise RuntimeError('disk full')
+
+        coro = ParallelImageWriter(writer=BrokenWriter, prefix=self.prefix)()
+        coro.send(self.images[0])
+        with self.assertRaises(RuntimeError):
+            coro.close()
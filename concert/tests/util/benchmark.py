@@ -0,0 +1,64 @@
+"""Benchmarking helpers."""
+import json
+import subprocess
+import sys
+import time
+
+
+def rate(func, num_calls=1000):
+    """Call *func* *num_calls* times with the iteration index as the only argument and return the
+    number of calls per second.
+    """
+    start = time.time()
+    for i in range(num_calls):
+        func(i)
+
+    return num_calls / (time.time() - start)
+
+
+def report(name, value, unit='1/s'):
+    """Print benchmark result *value* in *unit* identified by *name*. Run the benchmarks with the
+    ``-s`` nose flag to see the output.
+    """
+    print("{}: {:.2f} {}".format(name, value, unit))
+
+
+_IMPORT_TIMER = """
+import json
+import sys
+import time
+try:
+    import __builtin__ as builtins
+except ImportError:
+    import builtins
+
+times = {}
+original = builtins.__import__
+
+
+def timed_import(name, *args, **kwargs):
+    start = time.time()
+    try:
+        return original(name, *args, **kwargs)
+    finally:
+        times[name] = max(times.get(name, 0), time.time() - start)
+
+
+builtins.__import__ = timed_import
+start = time.time()
+import %s
+times['total'] = time.time() - start
+builtins.__import__ = original
+sys.stdout.write(json.dumps({'times': times, 'modules': list(sys.modules)}))
+"""
+
+
+def import_times(module):
+    """Import *module* in a fresh interpreter and return a tuple (times, modules), where *times*
+    maps imported module names to the cumulative import time in seconds (the whole import is
+    stored under ``total``) and *modules* is the list of all modules loaded by the import.
+    """
+    output = subprocess.check_output([sys.executable, '-c', _IMPORT_TIMER % module])
+    result = json.loads(output.decode())
+
+    return result['times'], result['modules']
@@ -0,0 +1,19 @@
+"""Synthetic tomographic data."""
+import numpy as np
+
+
+def disks_sinogram(num_projections, width, center, disks):
+    """Return the sinogram of *num_projections* rows of *width* pixels of *disks*, which is a
+    list of (x, y, radius) tuples in pixels relative to the rotation axis at *center*. The slice
+    geometry is the one of :class:`concert.imageprocessing.Backprojector`.
+    """
+    angles = np.arange(num_projections) * np.pi / num_projections
+    positions = np.arange(width) - center
+    sinogram = np.zeros((num_projections, width))
+
+    for x, y, radius in disks:
+        offsets = np.sin(angles) * x + np.cos(angles) * y
+        chords = radius ** 2 - (positions[np.newaxis, :] - offsets[:, np.newaxis]) ** 2
+        sinogram += 2 * np.sqrt(np.clip(chords, 0, None))
+
+    return sinogram
@@ -1,10 +1,39 @@
-"""Image writers for uniform acces by :func:`.storage.write_images`"""
+"""Image writers for uniform acces by :func:`.storage.write_images`. Writers accept an optional
+lossless *compression*, either its name or a tuple (name, level).
+"""
+import io
+import logging
+import mmap
+import os
+import struct
+import numpy as np
+
+
+LOG = logging.getLogger(__name__)
+
+# Size of the header of raw files and the alignment of O_DIRECT writes
+ALIGNMENT = 4096
+
+try:
+    _STRING_TYPES = basestring
+except NameError:
+    _STRING_TYPES = str
+
+# (name, level) -> True if tifffile can write it, see _tiff_compression
+_TIFF_COMPRESSIONS = {}
 
 
 class ImageWriter(object):
-    def __init__(self, filename, bytes_per_file, append=False):
+    def __init__(self, filename, bytes_per_file, append=False, compression=None):
         self._writer = None
 
+    @classmethod
+    def check_compression(cls, compression):
+        """Raise ValueError if *compression* cannot be written, writers which create files
+        lazily call this in advance.
+        """
+        pass
+
     def write(self, image):
         raise NotImplementedError
 
@@ -12,23 +41,272 @@ class ImageWriter(object):
         self._writer.close()
 
 
+def _tiff_compression(compression):
+    """Return *compression* as the ``compress`` argument of :meth:`tifffile.TiffWriter.save`, raise
+    ValueError if tifffile cannot write it.
+    """
+    if not compression:
+        return 0
+    if isinstance(compression, int):
+        # Deflate level
+        return compression
+
+    name, level = (compression, None) if isinstance(compression, _STRING_TYPES) else compression
+    if name == 'zlib':
+        return 6 if level is None else level
+    if name == 'lzw':
+        raise ValueError("tifffile cannot write LZW compression, use LibTiffWriter")
+
+    if (name, level) not in _TIFF_COMPRESSIONS:
+        import tifffile
+        try:
+            with tifffile.TiffWriter(io.BytesIO()) as writer:
+                writer.save(np.zeros((1, 1), dtype=np.uint8), compress=(name, level))
+            _TIFF_COMPRESSIONS[(name, level)] = True
+        except Exception:
+            _TIFF_COMPRESSIONS[(name, level)] = False
+
+    if not _TIFF_COMPRESSIONS[(name, level)]:
+        raise ValueError("Compression `{}' is not available, it may require a newer tifffile "
+                         "and the imagecodecs package".format(name))
+
+    return (name, level)
+
+
 class TiffWriter(ImageWriter):
-    def __init__(self, filename, bytes_per_file, append=False):
+
+    """Writer based on :py:mod:`tifffile`. ``'zlib'`` compression is always available (level 6
+    by default), others like ``'zstd'`` or ``'lzma'`` depend on the :py:mod:`tifffile` version
+    and the :py:mod:`imagecodecs` package, ValueError is raised if they are not available. LZW
+    compression can be written by :class:`LibTiffWriter`.
+    """
+
+    def __init__(self, filename, bytes_per_file, append=False, compression=None):
         import tifffile
+        self._compress = _tiff_compression(compression)
         self._writer = tifffile.TiffWriter(filename, append=append,
                                            bigtiff=bytes_per_file >= 2 ** 31)
 
+    @classmethod
+    def check_compression(cls, compression):
+        _tiff_compression(compression)
+
     def write(self, image):
-        self._writer.save(image)
+        self._writer.save(image, compress=self._compress)
 
 
 class LibTiffWriter(ImageWriter):
-    def __init__(self, filename, bytes_per_file, append=False):
+
+    """Writer based on pylibtiff, which supports e.g. ``'lzw'`` and ``'deflate'`` compression.
+    Compression levels are not supported, ValueError is raised if one is given.
+    """
+
+    def __init__(self, filename, bytes_per_file, append=False, compression=None):
+        self.check_compression(compression)
         from libtiff import TIFF
         mode = 'a' if append else 'w'
         if bytes_per_file >= 2 ** 31:
             mode += '8'
         self._writer = TIFF.open(filename, mode)
+        self._compression = compression[0] if isinstance(compression, tuple) else compression
+
+    @classmethod
+    def check_compression(cls, compression):
+        if isinstance(compression, tuple) and compression[1] is not None:
+            raise ValueError("LibTiffWriter cannot set the compression level")
 
     def write(self, image):
-        self._writer.write_image(image)
+        if self._compression:
+            self._writer.write_image(image, compression=self._compression)
+        else:
+            self._writer.write_image(image)
+
+
+class RawWriter(ImageWriter):
+
+    """
+    Writer of uncompressed images stored one after another behind a header, so that the files can
+    be written at the disk bandwidth. The header is padded to :data:`ALIGNMENT` bytes and makes the
+    files valid NumPy ``.npy`` files, they can be read by :class:`.readers.RawSequenceReader` or
+    :func:`numpy.load`. All images in a file must have the same shape and data type.
+
+    If *direct* is True, the data are written with O_DIRECT, which bypasses the page cache, through
+    a page aligned buffer of *buffer_size* bytes. If the platform or the file system do not
+    support it or when appending, normal writes are used. If *preallocate* is True and the platform
+    supports it, *bytes_per_file* are allocated in advance to prevent fragmentation. The number of
+    images in the header is updated whenever another *buffer_size* bytes are in the file and on
+    :meth:`close`, so that a file which is being written or was not closed is read only up to the
+    last counted image. Compression is not supported.
+    """
+
+    def __init__(self, filename, bytes_per_file, append=False, compression=None, direct=False,
+                 preallocate=True, buffer_size=2 ** 22):
+        self.check_compression(compression)
+
+        self._filename = filename
+        self._dtype = None
+        self._shape = None
+        self._num_images = 0
+        self._direct = False
+        self._buffer = None
+        self._header_buffer = None
+        self._buffered = 0
+        # Bytes in the file and the number of images in its header
+        self._num_bytes = 0
+        self._num_counted = 0
+        self._count_interval = max(1, buffer_size)
+
+        if append and os.path.exists(filename) and os.path.getsize(filename):
+            self._open_existing()
+        else:
+            flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+            self._fd = None
+            if direct:
+                try:
+                    self._fd = os.open(filename, flags | os.O_DIRECT)
+                    self._direct = True
+                except (AttributeError, OSError):
+                    LOG.debug("O_DIRECT not available for `{}'".format(filename))
+            if self._fd is None:
+                self._fd = os.open(filename, flags)
+            if preallocate and bytes_per_file and hasattr(os, 'posix_fallocate'):
+                try:
+                    os.posix_fallocate(self._fd, 0, ALIGNMENT + bytes_per_file)
+                except OSError:
+                    LOG.debug("Cannot preallocate `{}'".format(filename))
+
+        if self._direct:
+            buffer_size = max(ALIGNMENT, buffer_size // ALIGNMENT * ALIGNMENT)
+            # Anonymous memory maps are page aligned
+            self._buffer = mmap.mmap(-1, buffer_size)
+            self._staging = np.frombuffer(self._buffer, dtype=np.uint8)
+            self._header_buffer = mmap.mmap(-1, ALIGNMENT)
+
+    @classmethod
+    def check_compression(cls, compression):
+        if compression:
+            raise ValueError('Raw files cannot be compressed')
+
+    def _open_existing(self):
+        with open(self._filename, 'rb') as f:
+            if np.lib.format.read_magic(f) != (1, 0):
+                raise ValueError("`{}' is not a raw file".format(self._filename))
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            if f.tell() != ALIGNMENT or fortran_order:
+                raise ValueError("`{}' is not a raw file".format(self._filename))
+
+        self._dtype = dtype
+        self._shape = shape[1:]
+        # Images behind the counted ones might be unwritten preallocated space
+        self._num_images = self._num_counted = shape[0]
+        self._num_bytes = self._file_size
+        self._fd = os.open(self._filename, os.O_WRONLY)
+        os.ftruncate(self._fd, self._file_size)
+        os.lseek(self._fd, 0, os.SEEK_END)
+
+    @property
+    def _image_size(self):
+        return self._dtype.itemsize * int(np.prod(self._shape))
+
+    @property
+    def _file_size(self):
+        return ALIGNMENT + self._num_images * self._image_size
+
+    def _header(self, num_images=0):
+        header = "{{'descr': {!r}, 'fortran_order': False, 'shape': {!r}, }}".format(
+            np.lib.format.dtype_to_descr(self._dtype),
+            tuple(int(dim) for dim in (num_images,) + self._shape))
+        magic = np.lib.format.magic(1, 0)
+        length = ALIGNMENT - len(magic) - 2
+
+        header = (header.ljust(length - 1) + '\n').encode('latin1')
+
+        return magic + struct.pack('<H', length) + header
+
+    def write(self, image):
+        image = np.ascontiguousarray(image)
+
+        if self._dtype is None:
+            self._dtype = image.dtype
+            self._shape = image.shape
+            self._write_bytes(np.frombuffer(self._header(), dtype=np.uint8))
+        elif image.dtype != self._dtype or image.shape != self._shape:
+            raise ValueError("Images in `{}' must have shape {} and data type {}".format(
+                             self._filename, self._shape, self._dtype))
+
+        self._write_bytes(image.reshape(-1).view(np.uint8))
+        self._num_images += 1
+
+        num_written = (self._num_bytes - ALIGNMENT) // self._image_size
+        if (num_written - self._num_counted) * self._image_size >= self._count_interval:
+            position = os.lseek(self._fd, 0, os.SEEK_CUR)
+            self._write_header(num_written)
+            os.lseek(self._fd, position, os.SEEK_SET)
+
+    def _write_header(self, num_images):
+        """Write the header with *num_images* at the beginning of the file."""
+        os.lseek(self._fd, 0, os.SEEK_SET)
+        header = np.frombuffer(self._header(num_images), dtype=np.uint8)
+        if self._direct:
+            # O_DIRECT needs aligned memory
+            header_buffer = np.frombuffer(self._header_buffer, dtype=np.uint8)
+            header_buffer[:] = header
+            header = header_buffer
+        self._write_all(header)
+        self._num_counted = num_images
+
+    def _write_bytes(self, data):
+        if not self._direct:
+            self._write_all(data)
+            self._num_bytes += len(data)
+            return
+
+        while len(data):
+            num = min(len(data), len(self._staging) - self._buffered)
+            self._staging[self._buffered:self._buffered + num] = data[:num]
+            self._buffered += num
+            data = data[num:]
+            if self._buffered == len(self._staging):
+                self._write_all(self._staging)
+                self._num_bytes += self._buffered
+                self._buffered = 0
+
+    def _write_all(self, data):
+        while len(data):
+            data = data[os.write(self._fd, data):]
+
+    def close(self):
+        if self._fd is None:
+            return
+
+        try:
+            if self._direct and self._buffered:
+                # O_DIRECT writes whole blocks, the padding is truncated below
+                size = -(-self._buffered // ALIGNMENT) * ALIGNMENT
+                self._staging[self._buffered:size] = 0
+                self._write_all(self._staging[:size])
+            if self._dtype is None:
+                os.ftruncate(self._fd, 0)
+            else:
+                os.ftruncate(self._fd, self._file_size)
+                self._write_header(self._num_images)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+            if self._buffer is not None:
+                self._staging = None
+                self._buffer.close()
+                self._buffer = None
+                self._header_buffer.close()
+                self._header_buffer = None
+
+
+class DirectRawWriter(RawWriter):
+
+    """:class:`RawWriter` which writes with O_DIRECT if possible."""
+
+    def __init__(self, filename, bytes_per_file, append=False, compression=None,
+                 preallocate=True, buffer_size=2 ** 22):
+        super(DirectRawWriter, self).__init__(filename, bytes_per_file, append=append,
+                                              compression=compression, direct=True,
+                                              preallocate=preallocate, buffer_size=buffer_size)